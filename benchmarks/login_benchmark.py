@@ -0,0 +1,116 @@
+# benchmarks/login_benchmark.py
+#
+# Login throughput benchmark for POST /tokens/ (bcrypt on the hashing pool).
+#
+#   python benchmarks/login_benchmark.py --rounds 12 --logins 200 --concurrency 32
+#   python benchmarks/login_benchmark.py --rounds 10 > bench_output.txt
+#
+# Uses a throw-away SQLite database; the application database is not touched.
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Measure logins/sec for POST /tokens/")
+    parser.add_argument("--rounds", type=int, default=int(os.getenv("BCRYPT_ROUNDS", 12)), help="bcrypt cost factor")
+    parser.add_argument("--workers", type=int, default=None, help="hashing pool size (HASH_WORKERS)")
+    parser.add_argument("--users", type=int, default=20, help="distinct accounts to log in with")
+    parser.add_argument("--logins", type=int, default=200, help="total login requests")
+    parser.add_argument("--concurrency", type=int, default=32, help="requests in flight")
+    return parser.parse_args()
+
+
+async def run_logins(app, users: int, logins: int, concurrency: int):
+    import httpx
+
+    semaphore = asyncio.Semaphore(concurrency)
+    statuses = []
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def login(index: int):
+            async with semaphore:
+                response = await client.post("/tokens/", data={"username": f"bench{index % users}", "password": "bench-password"})
+                statuses.append(response.status_code)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(login(index) for index in range(logins)))
+        elapsed = time.perf_counter() - started
+
+    return elapsed, statuses
+
+
+def main():
+    args = parse_args()
+
+    # ✅ Ayarlar modüller import edilmeden önce verilmeli
+    os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+    if args.workers:
+        os.environ["HASH_WORKERS"] = str(args.workers)
+    os.environ.setdefault("HASH_MAX_PENDING", str(args.concurrency * 2))
+    # ✅ Tüm istekler tek IP'den gelir: giriş limitleri ölçümü 429'a çevirmesin
+    os.environ["RATE_LIMIT_BACKEND"] = "memory"
+    os.environ["LOGIN_RATE_PER_IP"] = f"{args.logins}/60"
+    os.environ["LOGIN_RATE_PER_USERNAME"] = f"{args.logins}/60"
+
+    from fastapi import FastAPI
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from db.database import Base, get_db
+    from db.models import User
+    from routes import tokens
+    from utils import hashing
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(engine)
+        BenchSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        db = BenchSession()
+        password_hash = hashing.hash_password("bench-password")
+        db.add_all([
+            User(username=f"bench{index}", email=f"bench{index}@example.com", password=password_hash, full_name="Bench User")
+            for index in range(args.users)
+        ])
+        db.commit()
+        db.close()
+
+        def get_bench_db():
+            session = BenchSession()
+            try:
+                yield session
+            finally:
+                session.close()
+
+        app = FastAPI()
+        app.include_router(tokens.router)
+        app.dependency_overrides[get_db] = get_bench_db
+
+        elapsed, statuses = asyncio.run(run_logins(app, args.users, args.logins, args.concurrency))
+        engine.dispose()
+
+    ok = statuses.count(200)
+    if ok != len(statuses):  # Başarısız girişler ölçümü geçersiz kılar
+        sys.exit(f"benchmark invalid, non-200 responses: {dict(Counter(statuses))}")
+    cores = min(hashing.HASH_WORKERS, os.cpu_count() or 1)
+    rate = ok / elapsed if elapsed else 0.0
+
+    print(f"bcrypt rounds     : {args.rounds}")
+    print(f"hash workers      : {hashing.HASH_WORKERS} (cores used: {cores})")
+    print(f"logins            : {len(statuses)} ({ok} ok, {len(statuses) - ok} failed)")
+    print(f"concurrency       : {args.concurrency}")
+    print(f"elapsed           : {elapsed:.2f} s")
+    print(f"logins/sec        : {rate:.1f}")
+    print(f"logins/sec/core   : {rate / cores:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# benchmarks/startup_benchmark.py
+#
+# Cold-start benchmark: spawns fresh interpreters and measures `import main`, the
+# startup hooks and the first request (what a new worker / autoscaled pod pays).
+#
+#   python benchmarks/startup_benchmark.py --runs 5
+#   python benchmarks/startup_benchmark.py --runs 5 --degraded   # no Twilio / SendGrid / Stripe env vars
+#
+# Every run uses a throw-away working directory (SQLite DB, JWT keys, indexes); the
+# application database is not touched.
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROVIDER_ENV = ("TWILIO_ACCOUNT_SID", "TWILIO_AUTH_TOKEN", "TWILIO_PHONE_NUMBER", "SENDGRID_API_KEY", "SENDER_EMAIL", "STRIPE_SECRET_KEY")
+
+# ✅ Ölçüm, her seferinde yeni bir Python sürecinde çalışır
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+sys.path.insert(0, {root!r})
+import main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    booted = time.perf_counter()
+    status = client.get("/health").json()
+    first_request = time.perf_counter()
+print(json.dumps({{
+    "import": imported - started,
+    "startup": booted - imported,
+    "first_request": first_request - booted,
+    "modules": len(sys.modules),
+    "providers": status.get("providers", {{}}),
+}}))
+"""
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Measure application cold-start time")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters to start")
+    parser.add_argument("--degraded", action="store_true", help="unset provider env vars (SMS / email / Stripe disabled)")
+    return parser.parse_args()
+
+
+def run_once(degraded: bool) -> dict:
+    env = dict(os.environ)
+    if degraded:
+        for key in PROVIDER_ENV:
+            env.pop(key, None)
+    else:
+        env.setdefault("TWILIO_ACCOUNT_SID", "ACbenchmark")
+        env.setdefault("TWILIO_AUTH_TOKEN", "benchmark")
+        env.setdefault("SENDGRID_API_KEY", "benchmark")
+        env.setdefault("SENDER_EMAIL", "bench@example.com")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        result = subprocess.run(
+            [sys.executable, "-c", CHILD.format(root=ROOT)],
+            cwd=tmp, env=env, capture_output=True, text=True, check=True,
+        )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    args = parse_args()
+    runs = [run_once(args.degraded) for _ in range(args.runs)]
+
+    def summary(field: str) -> str:
+        values = [run[field] * 1000 for run in runs]
+        return f"median {statistics.median(values):7.1f} ms | min {min(values):7.1f} ms"
+
+    print(f"runs              : {args.runs} ({'degraded, no provider env' if args.degraded else 'providers configured'})")
+    print(f"import main       : {summary('import')}")
+    print(f"startup hooks     : {summary('startup')}")
+    print(f"first request     : {summary('first_request')}")
+    print(f"modules loaded    : {runs[-1]['modules']}")
+    print(f"providers         : {runs[-1]['providers']}")
+
+
+if __name__ == "__main__":
+    main()
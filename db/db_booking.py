@@ -1,6 +1,10 @@
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from db.models import Booking, Ride, User, Payment
+from db.db_reminder import reminder_scheduler
+from db.db_notification import notify_ride_driver
+from utils.ride_events import publish_ride
+from db.enums import NotificationTopic
 from schemas import BookingCreate, BookingCancel
 from datetime import datetime, timedelta
 from fastapi import HTTPException
@@ -60,6 +64,9 @@ def create_booking(db: Session, booking_data: BookingCreate):
     try:
         db.commit()
         db.refresh(new_booking)
+        publish_ride(ride)
+        reminder_scheduler.schedule_ride(ride.id, ride.departure_time)  # ✅ 24s / 1s kalkış hatırlatmaları
+        notify_ride_driver(db, ride, NotificationTopic.BOOKING_CREATED, f"{passenger.full_name} booked {booking_data.seats_booked} seat(s)")
         return new_booking
     except IntegrityError:
         db.rollback()
@@ -143,6 +150,9 @@ def cancel_booking(db: Session, booking_id: int):
     booking.refund_amount = refund_amount
 
     db.commit()
+    publish_ride(ride)
+    reminder_scheduler.refresh_ride(db, booking.ride_id)
+    notify_ride_driver(db, ride, NotificationTopic.BOOKING_CANCELLED, f"{passenger.full_name} cancelled {booking.seats_booked} seat(s)")
 
     return {"message": "Booking cancelled", "refund": refund_amount}
 
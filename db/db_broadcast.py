@@ -0,0 +1,351 @@
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from db.database import SessionLocal
+from db.enums import BroadcastStatus
+from db.models import Broadcast, NotificationPreference, User
+from utils.notification_dispatcher import EMAIL, SMS, Notification, dispatcher
+from utils.scheduler import PeriodicJob
+from utils.templates import render
+
+# ✅ Toplu bildirim ayarları (Çevre değişkenlerinden)
+BROADCAST_CHUNK_SIZE = int(os.getenv("BROADCAST_CHUNK_SIZE", 500))  # Tek sorguda okunan kullanıcı
+BROADCAST_WINDOW = int(os.getenv("BROADCAST_WINDOW", 2000))  # Yayın başına gönderilmeyi bekleyen en fazla mesaj
+BROADCAST_RATE = float(os.getenv("BROADCAST_RATE", 0))  # mesaj/saniye üst sınırı (0 => yalnızca pencere)
+BROADCAST_POLL_INTERVAL = float(os.getenv("BROADCAST_POLL_INTERVAL", 2))  # saniye, duraklatılmış yayın durumu kontrolü
+BROADCAST_LEASE_SECONDS = float(os.getenv("BROADCAST_LEASE_SECONDS", 60))  # Sahibi ölen yayın bu süreden sonra devralınır
+BROADCAST_DRAIN_TIMEOUT = float(os.getenv("BROADCAST_DRAIN_TIMEOUT", 300))  # saniye, son mesajların gönderilmesi
+
+DEFAULT_BROADCAST_MESSAGE = "🚀 System update: New features added to goCARgo!"
+
+
+# ------------------------ 📋 Broadcast records ------------------------ #
+
+def create_broadcast(db: Session, message: str, created_by: Optional[int] = None) -> Broadcast:
+    """
+    Records a broadcast to every user that isn't banned and starts sending it.
+    """
+    total = db.query(User.id).filter(_not_banned()).count()
+    broadcast = Broadcast(message=message, created_by=created_by, status=BroadcastStatus.RUNNING, total=total)
+    db.add(broadcast)
+    db.commit()
+    db.refresh(broadcast)
+    broadcast_runner.launch(broadcast.id)
+    return broadcast
+
+
+def get_broadcast(db: Session, broadcast_id: int) -> Broadcast:
+    broadcast = db.query(Broadcast).filter(Broadcast.id == broadcast_id).first()
+    if not broadcast:
+        raise HTTPException(status_code=404, detail="Broadcast not found")
+    return broadcast
+
+
+def set_broadcast_status(db: Session, broadcast_id: int, status: BroadcastStatus) -> Broadcast:
+    """
+    Pause / resume / cancel. Only the status changes here; the process running the
+    broadcast picks it up before its next chunk (works across workers).
+    """
+    broadcast = get_broadcast(db, broadcast_id)
+    allowed = {
+        BroadcastStatus.PAUSED: {BroadcastStatus.RUNNING},
+        BroadcastStatus.RUNNING: {BroadcastStatus.PAUSED},
+        BroadcastStatus.CANCELLED: {BroadcastStatus.RUNNING, BroadcastStatus.PAUSED},
+    }
+    if broadcast.status not in allowed[status]:
+        raise HTTPException(status_code=409, detail=f"Broadcast is {broadcast.status.value}")
+    broadcast.status = status
+    if status == BroadcastStatus.CANCELLED:
+        broadcast.finished_at = datetime.now()
+    db.commit()
+    db.refresh(broadcast)
+    if status == BroadcastStatus.RUNNING:
+        broadcast_runner.launch(broadcast.id)  # Sahibi yoksa (örn. yeniden başlatma) bu işlem devralır
+    return broadcast
+
+
+def _not_banned():
+    return or_(User.is_banned.is_(False), User.is_banned.is_(None))
+
+
+def _next_recipients(db: Session, after_user_id: int, limit: int) -> List:
+    """
+    Next chunk of users by id (keyset: the cost of a chunk doesn't grow with the
+    offset). Users without a preferences row get the defaults (email on, SMS off).
+    """
+    return (
+        db.query(
+            User.id, User.email,
+            NotificationPreference.email_enabled, NotificationPreference.sms_enabled,
+            NotificationPreference.phone_number, NotificationPreference.locale,
+        )
+        .outerjoin(NotificationPreference, NotificationPreference.user_id == User.id)
+        .filter(User.id > after_user_id, _not_banned())
+        .order_by(User.id)
+        .limit(limit)
+        .all()
+    )
+
+
+# ------------------------ 📡 Runner ------------------------ #
+
+class _Progress:
+    """
+    Counters of one running broadcast; `sent` / `failed` are updated from the
+    dispatcher thread, the window semaphore bounds the messages in flight.
+    """
+
+    def __init__(self, broadcast: Broadcast, window: int):
+        self.window = threading.Semaphore(window)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.cursor = broadcast.cursor  # Son tamamen işlenen kullanıcı
+        self.renewed_at = time.monotonic()  # Son lease yenilemesi
+        self.counts = {field: getattr(broadcast, field) for field in ("processed", "skipped", "queued", "sent", "failed")}
+
+    def add(self, field: str, amount: int = 1):
+        with self.lock:
+            self.counts[field] += amount
+
+    def advance(self, user_id: int):
+        with self.lock:
+            self.counts["processed"] += 1
+            self.cursor = user_id
+
+    def done(self, delivered: bool):
+        with self.lock:
+            self.counts["sent" if delivered else "failed"] += 1
+            self.in_flight -= 1
+        self.window.release()
+
+    def snapshot(self) -> Dict[str, int]:
+        with self.lock:
+            return dict(self.counts, cursor=self.cursor)
+
+
+class BroadcastRunner:
+    """
+    Sends broadcasts from background threads, one per broadcast: users are read in
+    keyset chunks, messages are rendered once per locale and handed to the pooled
+    dispatcher, and at most BROADCAST_WINDOW messages per broadcast are waiting to be
+    sent. A broadcast is owned through a lease, so if its process dies another worker
+    continues from the cursor. Ownership is re-checked (and progress saved) before every
+    chunk, and the lease is renewed at least every lease/3 while waiting (rate limit,
+    full window), so a live owner never looks orphaned.
+    """
+
+    def __init__(self, chunk_size: int = BROADCAST_CHUNK_SIZE, window: int = BROADCAST_WINDOW, rate: float = BROADCAST_RATE):
+        self.chunk_size = chunk_size
+        self.window = window
+        self.rate = rate
+        self.owner = uuid.uuid4().hex
+        self._threads: Dict[int, threading.Thread] = {}
+        self.stop_timeout = 5.0
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    # ------------------------ 🔑 Ownership ------------------------ #
+
+    def _claim(self, db: Session, broadcast_id: int) -> bool:
+        now = datetime.now()
+        claimed = db.query(Broadcast).filter(
+            Broadcast.id == broadcast_id,
+            Broadcast.status.in_([BroadcastStatus.RUNNING, BroadcastStatus.PAUSED]),
+            or_(Broadcast.owner.is_(None), Broadcast.owner == self.owner, Broadcast.lease_until < now),
+        ).update({
+            Broadcast.owner: self.owner, Broadcast.lease_until: now + timedelta(seconds=BROADCAST_LEASE_SECONDS),
+        }, synchronize_session=False)
+        db.commit()
+        return claimed == 1
+
+    def launch(self, broadcast_id: int) -> bool:
+        """
+        Starts sending a broadcast in this process unless another process owns it.
+        """
+        with self._lock:
+            thread = self._threads.get(broadcast_id)
+            if thread is not None and thread.is_alive():
+                return True
+            db = SessionLocal()
+            try:
+                if not self._claim(db, broadcast_id):
+                    return False
+            finally:
+                db.close()
+            thread = threading.Thread(target=self._run, args=(broadcast_id,), name=f"broadcast-{broadcast_id}", daemon=True)
+            self._threads[broadcast_id] = thread
+            thread.start()
+            return True
+
+    def adopt_orphans(self):
+        """
+        Picks up running / paused broadcasts whose owner stopped renewing its lease
+        (periodic job; also run at startup).
+        """
+        db = SessionLocal()
+        try:
+            orphans = [row.id for row in db.query(Broadcast.id).filter(
+                Broadcast.status.in_([BroadcastStatus.RUNNING, BroadcastStatus.PAUSED]),
+                or_(Broadcast.lease_until.is_(None), Broadcast.lease_until < datetime.now()),
+            )]
+        finally:
+            db.close()
+        for broadcast_id in orphans:
+            self.launch(broadcast_id)
+
+    # ------------------------ 📤 Sending ------------------------ #
+
+    def _run(self, broadcast_id: int):
+        db = SessionLocal()
+        progress = None
+        try:
+            broadcast = db.query(Broadcast).filter(Broadcast.id == broadcast_id).first()
+            progress = _Progress(broadcast, self.window)
+            while not self._stopping.is_set():
+                status = db.query(Broadcast.status).filter(Broadcast.id == broadcast_id).scalar()
+                if status == BroadcastStatus.PAUSED:
+                    if not self._renew_if_due(db, broadcast_id, progress):
+                        break
+                    self._stopping.wait(BROADCAST_POLL_INTERVAL)
+                    continue
+                if status != BroadcastStatus.RUNNING:
+                    break  # İptal edildi
+
+                # ✅ Gönderimden önce sahiplik + kayıt: lease başka işleme geçtiyse bu parça gönderilmez
+                if not self._save(db, broadcast_id, progress):
+                    break
+                recipients = _next_recipients(db, progress.cursor, self.chunk_size)
+                if not recipients:
+                    self._drain(progress, BROADCAST_DRAIN_TIMEOUT, renew=lambda: self._renew_if_due(db, broadcast_id, progress))
+                    self._save(db, broadcast_id, progress, finished=True)
+                    break
+                started = time.monotonic()
+                sent = self._send_chunk(db, broadcast_id, broadcast.message, recipients, progress)
+                if sent is None:
+                    break  # Durduruluyor / lease kaybedildi; kalan alıcılar bir sonraki sahipte
+                if self.rate > 0:  # Sağlayıcı kotası: mesaj/saniye
+                    if not self._pause(db, broadcast_id, progress, sent / self.rate - (time.monotonic() - started)):
+                        break
+        finally:
+            if progress is not None and self._stopping.is_set():
+                # Kapanış: gönderilmekte olanların sonucu kaydedilir, lease bırakılır
+                self._drain(progress, self.stop_timeout)
+                self._save(db, broadcast_id, progress)
+                self._release(db, broadcast_id)
+            db.close()
+            with self._lock:
+                if self._threads.get(broadcast_id) is threading.current_thread():
+                    del self._threads[broadcast_id]
+
+    def _renew_if_due(self, db: Session, broadcast_id: int, progress: _Progress) -> bool:
+        """
+        Renews the lease (saving progress) once a third of it has passed. False if it was lost.
+        """
+        if time.monotonic() - progress.renewed_at < BROADCAST_LEASE_SECONDS / 3:
+            return True
+        return self._save(db, broadcast_id, progress)
+
+    def _pause(self, db: Session, broadcast_id: int, progress: _Progress, seconds: float) -> bool:
+        """
+        Sleeps in slices of at most lease/3, renewing the lease in between.
+        False if stopping or the lease was lost.
+        """
+        deadline = time.monotonic() + seconds
+        while (remaining := deadline - time.monotonic()) > 0:
+            if self._stopping.wait(min(remaining, BROADCAST_LEASE_SECONDS / 3)):
+                return False
+            if not self._renew_if_due(db, broadcast_id, progress):
+                return False
+        return True
+
+    def _send_chunk(self, db: Session, broadcast_id: int, message: str, recipients: List, progress: _Progress) -> Optional[int]:
+        rendered = {}
+        queued = 0
+        for recipient in recipients:
+            channels = []
+            if recipient.email and recipient.email_enabled is not False:
+                channels.append(EMAIL)
+            if recipient.sms_enabled and recipient.phone_number:
+                channels.append(SMS)
+            if not channels:
+                progress.add("skipped")
+                progress.advance(recipient.id)
+                continue
+
+            locale = recipient.locale
+            if locale not in rendered:  # Dil başına bir kez (render önbelleği de aynı nesneyi döndürür)
+                rendered[locale] = render("system_notification", locale, message=message)
+            content = rendered[locale]
+            for channel in channels:
+                while not progress.window.acquire(timeout=1.0):  # Pencere dolu: göndericiyi bekle (lease yenilenir)
+                    if self._stopping.is_set() or not self._renew_if_due(db, broadcast_id, progress):
+                        return None
+                with progress.lock:
+                    progress.in_flight += 1
+                if channel == EMAIL:
+                    notification = Notification(channel=EMAIL, to=recipient.email, subject=content.subject,
+                                                body=content.html, text=content.text, on_done=progress.done)
+                else:
+                    notification = Notification(channel=SMS, to=recipient.phone_number, body=content.text, on_done=progress.done)
+                if dispatcher.submit(notification):
+                    progress.add("queued")
+                    queued += 1
+                else:
+                    progress.done(False)  # Sağlayıcı kapalı / kuyruk dolu
+            progress.advance(recipient.id)
+        return queued
+
+    @staticmethod
+    def _drain(progress: _Progress, timeout: float, renew: Optional[Callable[[], bool]] = None):
+        deadline = time.monotonic() + timeout
+        while progress.in_flight > 0 and time.monotonic() < deadline:
+            if renew is not None and not renew():
+                return  # Lease kaybedildi
+            time.sleep(0.1)
+
+    def _save(self, db: Session, broadcast_id: int, progress: _Progress, finished: bool = False) -> bool:
+        values = {getattr(Broadcast, field): value for field, value in progress.snapshot().items()}
+        values[Broadcast.lease_until] = datetime.now() + timedelta(seconds=BROADCAST_LEASE_SECONDS)
+        owned = db.query(Broadcast).filter(Broadcast.id == broadcast_id, Broadcast.owner == self.owner)
+        saved = owned.update(values, synchronize_session=False)
+        progress.renewed_at = time.monotonic()
+        if finished and saved:  # Arada duraklatıldı / iptal edildiyse durum korunur
+            owned.filter(Broadcast.status == BroadcastStatus.RUNNING).update(
+                {Broadcast.status: BroadcastStatus.COMPLETED, Broadcast.finished_at: datetime.now()}, synchronize_session=False
+            )
+        db.commit()
+        return saved == 1
+
+    def _release(self, db: Session, broadcast_id: int):
+        # Kapanışta: lease hemen bırakılır, başka bir worker beklemeden devralır
+        db.query(Broadcast).filter(Broadcast.id == broadcast_id, Broadcast.owner == self.owner).update(
+            {Broadcast.owner: None, Broadcast.lease_until: None}, synchronize_session=False
+        )
+        db.commit()
+
+    # ------------------------ ⏱️ Lifecycle ------------------------ #
+
+    def start(self):
+        self._stopping.clear()
+        self.adopt_orphans()
+        broadcast_adopt_job.start()
+
+    def stop(self, timeout: float = 5.0):
+        broadcast_adopt_job.stop()
+        self.stop_timeout = timeout
+        self._stopping.set()
+        for thread in list(self._threads.values()):
+            thread.join(timeout + 1)
+
+
+# ✅ Uygulama genelinde tek yayın yürütücüsü (uygulama başlarken yarım kalan yayınlar devralınır)
+broadcast_runner = BroadcastRunner()
+broadcast_adopt_job = PeriodicJob("broadcast-adopt", BROADCAST_LEASE_SECONDS / 2, broadcast_runner.adopt_orphans)
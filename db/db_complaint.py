@@ -0,0 +1,294 @@
+import base64
+import json
+import math
+import os
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+
+from db import db_review, db_token
+from db.database import SessionLocal
+from db.enums import ComplaintStatus
+from db.models import Complaint, Review, User
+from schemas import ComplaintCreate
+from utils.principal_cache import invalidate_principal
+from utils.scheduler import PeriodicJob
+from utils.sentiment_analysis import analyze_many
+
+# ✅ Triaj ayarları (Çevre değişkenlerinden)
+TRIAGE_INTERVAL = float(os.getenv("COMPLAINT_TRIAGE_INTERVAL", 10))  # saniye, 0 => kapalı
+TRIAGE_BATCH_SIZE = int(os.getenv("COMPLAINT_TRIAGE_BATCH_SIZE", 200))
+AUTO_HIDE_PRIORITY = float(os.getenv("COMPLAINT_AUTO_HIDE_PRIORITY", 5.0))  # Bu önceliğin üstünde yorum gizlenir
+AUTO_BAN_OFFENCES = int(os.getenv("COMPLAINT_AUTO_BAN_OFFENCES", 5))  # Bu kadar farklı raportörde kullanıcı banlanır
+MIN_REPORTER_TRUST = float(os.getenv("COMPLAINT_MIN_REPORTER_TRUST", 0.6))  # Altındaki raportörler sadece admin onayıyla sayılır
+MIN_REPORTER_REVIEWS = int(os.getenv("COMPLAINT_MIN_REPORTER_REVIEWS", 3))  # Yeni / yorumsuz hesaplar otomatik saymaz
+AUTO_HIDE_REPORTERS = int(os.getenv("COMPLAINT_AUTO_HIDE_REPORTERS", 2))  # Otomatik gizleme için gereken farklı güvenilir raportör
+
+# ✅ Öncelik ağırlıkları
+_REPORTER_WEIGHT = 2.0
+_REPEAT_WEIGHT = 1.5
+_SENTIMENT_WEIGHT = 2.0
+
+
+def create_complaint(db: Session, reporter: User, complaint_data: ComplaintCreate):
+    """
+    Stores a new complaint. Scoring and auto-actions happen later in the triage worker.
+
+    Args:
+        db (Session): The database session.
+        reporter (User): The user filing the complaint.
+        complaint_data (ComplaintCreate): Complaint creation schema.
+
+    Returns:
+        Complaint: The created complaint object.
+    """
+    if complaint_data.reported_user_id == reporter.id:
+        raise HTTPException(status_code=400, detail="You cannot file a complaint against yourself.")
+
+    if not db.query(User.id).filter(User.id == complaint_data.reported_user_id).first():
+        raise HTTPException(status_code=404, detail="Reported user not found")
+
+    if complaint_data.review_id is not None:
+        review = db.query(Review.reviewer_id).filter(Review.id == complaint_data.review_id).first()
+        if not review:
+            raise HTTPException(status_code=404, detail="Review not found")
+        if review.reviewer_id != complaint_data.reported_user_id:
+            raise HTTPException(status_code=400, detail="The review was not written by the reported user.")
+
+    # ✅ Aynı raportör aynı kullanıcı / yorum için tek açık şikayet
+    duplicate = db.query(Complaint.id).filter(
+        Complaint.reporter_user_id == reporter.id,
+        Complaint.reported_user_id == complaint_data.reported_user_id,
+        Complaint.review_id.is_(None) if complaint_data.review_id is None else Complaint.review_id == complaint_data.review_id,
+        Complaint.status == ComplaintStatus.PENDING,
+    ).first()
+    if duplicate:
+        raise HTTPException(status_code=409, detail="You already have an open complaint about this.")
+
+    complaint = Complaint(
+        reported_user_id=complaint_data.reported_user_id,
+        reporter_user_id=reporter.id,
+        review_id=complaint_data.review_id,
+        reason=complaint_data.reason
+    )
+    db.add(complaint)
+    db.commit()
+    db.refresh(complaint)
+    return complaint
+
+
+def _reporter_trust(reporter: Optional[User]) -> float:
+    """
+    0..1 reputation of the reporter: their own rating (neutral 0.5 without reviews),
+    damped by the complaints they received themselves. Banned reporters count as 0.
+    """
+    if reporter is None or reporter.is_banned:
+        return 0.0
+    rating_part = (reporter.rating / 5.0) if reporter.rating_count else 0.5
+    return rating_part / (1 + (reporter.offence_count or 0))
+
+
+def _is_trusted_reporter(reporter: Optional[User]) -> bool:
+    return (
+        reporter is not None
+        and (reporter.rating_count or 0) >= MIN_REPORTER_REVIEWS
+        and _reporter_trust(reporter) >= MIN_REPORTER_TRUST
+    )
+
+
+def _count_offence(db: Session, complaint: Complaint, reported: Optional[User]) -> bool:
+    """
+    Adds the complaint to the reported user's offence_count unless the same reporter
+    already contributed one (so one account can never ban anybody on its own), then
+    bans past AUTO_BAN_OFFENCES. Returns True if the user was banned.
+    """
+    db.flush()  # Aynı partide az önce sayılanlar da görünsün (autoflush kapalı)
+    already_counted = db.query(Complaint.id).filter(
+        Complaint.reporter_user_id == complaint.reporter_user_id,
+        Complaint.reported_user_id == complaint.reported_user_id,
+        Complaint.counts_offence.is_(True),
+    ).first()
+    if already_counted:
+        return False
+
+    complaint.counts_offence = True
+    db.query(User).filter(User.id == complaint.reported_user_id).update(
+        {User.offence_count: User.offence_count + 1}, synchronize_session=False
+    )
+    # ✅ Güncel değer veritabanından okunur; Python'da atanırsa flush başka işçinin artışını ezer
+    offences, is_banned = db.query(User.offence_count, User.is_banned).filter(User.id == complaint.reported_user_id).one()
+    if reported is not None:
+        db.expire(reported, ["offence_count", "is_banned"])
+
+    if offences >= AUTO_BAN_OFFENCES and not is_banned:
+        db.query(User).filter(User.id == complaint.reported_user_id).update({User.is_banned: True}, synchronize_session=False)
+        db_token.revoke_user_tokens(db, complaint.reported_user_id)
+        return True
+    return False
+
+
+def _trusted_review_reporters(db: Session, review_id: int) -> int:
+    """
+    Number of distinct trusted reporters with a triaged, not dismissed complaint about the review.
+    """
+    reporters = db.query(User).filter(User.id.in_(
+        db.query(Complaint.reporter_user_id).filter(
+            Complaint.review_id == review_id,
+            Complaint.priority.isnot(None),
+            Complaint.status != ComplaintStatus.DISMISSED,
+        )
+    )).all()
+    return sum(1 for reporter in reporters if _is_trusted_reporter(reporter))
+
+
+def triage_pending(db: Session, batch_size: int = TRIAGE_BATCH_SIZE) -> int:
+    """
+    Scores one batch of untriaged complaints and applies auto-actions past the thresholds.
+    Only complaints from trusted reporters (enough reviews and trust >= MIN_REPORTER_TRUST)
+    act automatically: they count as offences (at most one per reporter, ban past
+    AUTO_BAN_OFFENCES) and hide a review once AUTO_HIDE_REPORTERS distinct trusted
+    reporters flagged it. The others wait for an admin to resolve them.
+
+    priority = 1 + 2 * reporter_trust + 1.5 * ln(1 + offences) + 2 * review_negativity
+
+    Returns:
+        int: Number of complaints triaged.
+    """
+    complaints = (
+        db.query(Complaint)
+        .filter(Complaint.priority.is_(None))
+        .order_by(Complaint.id)
+        .limit(batch_size)
+        .all()
+    )
+    if not complaints:
+        return 0
+
+    user_ids = {c.reporter_user_id for c in complaints} | {c.reported_user_id for c in complaints}
+    users = {user.id: user for user in db.query(User).filter(User.id.in_(user_ids))}
+
+    review_ids = {c.review_id for c in complaints if c.review_id is not None}
+    reviews = {review.id: review for review in db.query(Review).filter(Review.id.in_(review_ids))} if review_ids else {}
+    review_list = list(reviews.values())
+    sentiments = dict(zip((r.id for r in review_list), analyze_many([r.review_text or "" for r in review_list]))) if review_list else {}
+
+    now = datetime.utcnow()
+    triaged = 0
+    banned = []
+    for complaint in complaints:
+        reported = users.get(complaint.reported_user_id)
+        offences = (reported.offence_count or 0) + 1 if reported else 1
+        negativity = max(0.0, -sentiments.get(complaint.review_id, 0.0))
+
+        priority = (
+            1.0
+            + _REPORTER_WEIGHT * _reporter_trust(users.get(complaint.reporter_user_id))
+            + _REPEAT_WEIGHT * math.log1p(offences)
+            + _SENTIMENT_WEIGHT * negativity
+        )
+
+        # ✅ Koşullu güncelleme: başka bir işçi aynı şikayeti aldıysa tekrar sayma
+        claimed = db.query(Complaint).filter(Complaint.id == complaint.id, Complaint.priority.is_(None)).update(
+            {Complaint.priority: round(priority, 4), Complaint.triaged_at: now}, synchronize_session=False
+        )
+        if not claimed:
+            continue
+        triaged += 1
+
+        # ✅ Otomatik aksiyonlar: sadece güvenilir raportörler; aksi halde şikayet admin kuyruğunda bekler
+        trusted = _is_trusted_reporter(users.get(complaint.reporter_user_id))
+        review = reviews.get(complaint.review_id)
+        if (
+            trusted and review is not None and priority >= AUTO_HIDE_PRIORITY
+            and _trusted_review_reporters(db, review.id) >= AUTO_HIDE_REPORTERS
+        ):
+            db.query(Review).filter(Review.id == review.id).update({Review.reported: True}, synchronize_session=False)
+            db_review.hide_review(db, review)
+        if trusted and _count_offence(db, complaint, reported):
+            banned.append(complaint.reported_user_id)
+
+    db.commit()
+    for user_id in banned:
+        invalidate_principal(user_id)
+    return triaged
+
+
+def _encode_cursor(complaint: Complaint) -> str:
+    raw = json.dumps([complaint.priority, complaint.id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def _decode_cursor(cursor: str):
+    try:
+        priority, last_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return float(priority), int(last_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def get_complaint_queue(db: Session, status: ComplaintStatus = ComplaintStatus.PENDING, limit: int = 50, cursor: Optional[str] = None):
+    """
+    Returns triaged complaints with the given status, highest priority first (keyset pagination).
+
+    Returns:
+        dict: {"items": [...], "next_cursor": str | None}
+    """
+    query = db.query(Complaint).filter(Complaint.status == status, Complaint.priority.isnot(None))
+
+    if cursor:
+        priority, last_id = _decode_cursor(cursor)
+        query = query.filter(tuple_(Complaint.priority, Complaint.id) < tuple_(priority, last_id))
+
+    rows = query.order_by(Complaint.priority.desc(), Complaint.id.desc()).limit(limit + 1).all()
+    items = rows[:limit]
+    return {"items": items, "next_cursor": _encode_cursor(items[-1]) if len(rows) > limit else None}
+
+
+def update_complaint_status(db: Session, complaint_id: int, new_status: ComplaintStatus):
+    """
+    Resolves or dismisses a complaint. Resolving counts the offence (once per reporter)
+    even for untrusted reporters; dismissing takes a counted offence back.
+    """
+    complaint = db.query(Complaint).filter(Complaint.id == complaint_id).first()
+    if not complaint:
+        raise HTTPException(status_code=404, detail="Complaint not found")
+
+    banned = False
+    if new_status == ComplaintStatus.DISMISSED and complaint.counts_offence:
+        db.query(User).filter(User.id == complaint.reported_user_id, User.offence_count > 0).update(
+            {User.offence_count: User.offence_count - 1}, synchronize_session=False
+        )
+        complaint.counts_offence = False
+    elif new_status == ComplaintStatus.RESOLVED and not complaint.counts_offence:
+        reported = db.query(User).filter(User.id == complaint.reported_user_id).first()
+        banned = _count_offence(db, complaint, reported)
+
+    complaint.status = new_status
+    db.commit()
+    if banned:
+        invalidate_principal(complaint.reported_user_id)
+    db.refresh(complaint)
+    return complaint
+
+
+def run_triage_job() -> int:
+    """
+    Drains all untriaged complaints with its own session (scheduler entry point).
+    """
+    db = SessionLocal()
+    try:
+        total = 0
+        while True:
+            triaged = triage_pending(db)
+            total += triaged
+            if triaged < TRIAGE_BATCH_SIZE:
+                return total
+    finally:
+        db.close()
+
+
+# ✅ Periyodik triaj işçisi (uygulama başlarken başlatılır)
+triage_job = PeriodicJob("complaint-triage", TRIAGE_INTERVAL, run_triage_job)
@@ -0,0 +1,59 @@
+import logging
+import os
+from typing import Set
+
+from sqlalchemy.orm import Session
+
+from db.database import SessionLocal
+from db.models import User
+from utils import avatars, media
+from utils.scheduler import PeriodicJob
+
+logger = logging.getLogger(__name__)
+
+# ✅ Yetim medya temizliği (Çevre değişkenlerinden)
+MEDIA_GC_INTERVAL = float(os.getenv("MEDIA_GC_INTERVAL", 3600))  # saniye, 0 => kapalı
+MEDIA_GC_BATCH_SIZE = int(os.getenv("MEDIA_GC_BATCH_SIZE", 1000))
+
+
+def referenced_keys(db: Session) -> Set[str]:
+    """
+    Every media key still referenced by a row (avatar manifests; car images go here too).
+    """
+    keys: Set[str] = set()
+    last_id = 0
+    while True:  # Keyset sayfalama: tüm kullanıcılar belleğe alınmaz
+        rows = (
+            db.query(User.id, User.avatar, User.profile_picture)
+            .filter(User.id > last_id)
+            .order_by(User.id)
+            .limit(MEDIA_GC_BATCH_SIZE)
+            .all()
+        )
+        if not rows:
+            return keys
+        for user_id, avatar, profile_picture in rows:
+            keys.update(avatars.manifest_keys(avatars.load_manifest(avatar)))
+            key = media.key_from_url(profile_picture)
+            if key:
+                keys.add(key)
+        last_id = rows[-1][0]
+
+
+def run_media_gc() -> int:
+    """
+    Removes unreferenced blobs from the media store (scheduler entry point).
+    """
+    db = SessionLocal()
+    try:
+        referenced = referenced_keys(db)
+    finally:
+        db.close()
+    removed = media.collect_garbage(referenced)
+    if removed:
+        logger.info("Media GC removed %d orphaned files", removed)
+    return removed
+
+
+# ✅ Periyodik yetim medya temizliği (uygulama başlarken başlatılır)
+media_gc_job = PeriodicJob("media-gc", MEDIA_GC_INTERVAL, run_media_gc)
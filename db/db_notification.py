@@ -0,0 +1,196 @@
+import os
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Hashable, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from db.database import SessionLocal
+from db.enums import DigestFrequency, NotificationTopic
+from db.models import NotificationEvent, NotificationPreference, Ride, User
+from schemas import NotificationPreferenceUpdate
+from utils.notifications import send_email, send_sms
+from utils.templates import NOTIFY_DEFAULT_LOCALE, SUPPORTED_LOCALES, SafeHtml, render, render_text
+from utils.timers import TimerQueue, local_epoch
+
+# ✅ Birleştirme / özet ayarları (Çevre değişkenlerinden)
+NOTIFY_COALESCE_WINDOW = float(os.getenv("NOTIFY_COALESCE_WINDOW", 120))  # saniye, "instant" kullanıcılar için
+NOTIFY_DIGEST_HOUR = int(os.getenv("NOTIFY_DIGEST_HOUR", 18))  # Günlük özetin gönderildiği saat (yerel)
+
+
+# ------------------------ ⚙️ Preferences ------------------------ #
+
+def get_preferences(db: Session, user_id: int) -> NotificationPreference:
+    """
+    Returns the user's preferences (defaults when the user never changed them).
+    """
+    preference = db.query(NotificationPreference).filter(NotificationPreference.user_id == user_id).first()
+    if preference is None:
+        preference = NotificationPreference(user_id=user_id, email_enabled=True, sms_enabled=False, digest=DigestFrequency.INSTANT,
+                                            locale=NOTIFY_DEFAULT_LOCALE)
+    return preference
+
+
+def update_preferences(db: Session, user_id: int, request: NotificationPreferenceUpdate) -> NotificationPreference:
+    preference = get_preferences(db, user_id)
+    for key, value in request.model_dump(exclude_unset=True).items():
+        setattr(preference, key, value)
+    if preference.sms_enabled and not preference.phone_number:
+        raise HTTPException(status_code=400, detail="A phone number is required for SMS notifications")
+    if preference.locale not in SUPPORTED_LOCALES:
+        raise HTTPException(status_code=400, detail=f"Supported languages: {', '.join(SUPPORTED_LOCALES)}")
+
+    db.merge(preference)
+    db.commit()
+    coalescer.reschedule_user(db, user_id)  # Bekleyen olaylar yeni özet sıklığına göre planlanır
+    return get_preferences(db, user_id)
+
+
+# ------------------------ 📨 Coalescing ------------------------ #
+
+def _flush_time(digest: DigestFrequency, first_event: datetime) -> datetime:
+    if digest == DigestFrequency.HOURLY:
+        return first_event.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+    if digest == DigestFrequency.DAILY:
+        flush_at = first_event.replace(hour=NOTIFY_DIGEST_HOUR, minute=0, second=0, microsecond=0)
+        return flush_at if flush_at > first_event else flush_at + timedelta(days=1)
+    return first_event + timedelta(seconds=NOTIFY_COALESCE_WINDOW)
+
+
+def _summary(topic: NotificationTopic, title: str, count: int, locale: str) -> str:
+    # Konu başına tekil / çoğul özet satırı (utils/templates.py: "<topic>_summary[_plural]")
+    name = f"{topic.value}_summary" if count == 1 else f"{topic.value}_summary_plural"
+    return render_text(name, locale, title=title, count=count)
+
+
+class NotificationCoalescer:
+    """
+    Groups notifications per recipient and topic within a window (or into hourly /
+    daily digests, per user preference) and sends one message per group:
+    "3 new bookings on your Friday ride". Pending events live in notification_events,
+    so a restart doesn't lose them; a flush claims its events with a conditional
+    update, so several workers never send the same event twice.
+    """
+
+    def __init__(self):
+        self.timers = TimerQueue("notification-coalescer", self.flush)
+
+    @staticmethod
+    def _bucket(user_id: int, digest: DigestFrequency, topic_key: str) -> Tuple[int, Optional[str]]:
+        # Özet kullanıcılarında tüm konular tek mesajda
+        return (user_id, topic_key if digest == DigestFrequency.INSTANT else None)
+
+    def notify(self, db: Session, user_id: int, topic: NotificationTopic, topic_key: str, title: str, line: str):
+        """
+        Records a notification; it goes out when its group's window closes. Commits.
+        """
+        preference = get_preferences(db, user_id)
+        if not (preference.email_enabled or preference.sms_enabled):
+            return
+        now = datetime.now()
+        db.add(NotificationEvent(user_id=user_id, topic=topic, topic_key=topic_key, title=title, line=line, created_at=now))
+        db.commit()
+
+        bucket = self._bucket(user_id, preference.digest, topic_key)
+        if bucket not in self.timers:  # Pencere ilk olaydan itibaren sayılır
+            self.timers.schedule(bucket, local_epoch(_flush_time(preference.digest, now)))
+
+    def reschedule_user(self, db: Session, user_id: int):
+        self._schedule_pending(db, NotificationEvent.user_id == user_id, replace=True)
+
+    def _schedule_pending(self, db: Session, *criteria, replace: bool = False):
+        rows = (
+            db.query(NotificationEvent.user_id, NotificationEvent.topic_key, func.min(NotificationEvent.created_at).label("first"),
+                     NotificationPreference.digest)
+            .outerjoin(NotificationPreference, NotificationPreference.user_id == NotificationEvent.user_id)
+            .filter(NotificationEvent.batch_id.is_(None), *criteria)
+            .group_by(NotificationEvent.user_id, NotificationEvent.topic_key, NotificationPreference.digest)
+            .all()
+        )
+        if replace:  # Eski sıklığa göre kurulmuş zamanlayıcılar
+            for row in rows:
+                self.timers.cancel((row.user_id, row.topic_key))
+                self.timers.cancel((row.user_id, None))
+        for row in rows:
+            digest = row.digest or DigestFrequency.INSTANT
+            bucket = self._bucket(row.user_id, digest, row.topic_key)
+            if bucket not in self.timers:
+                self.timers.schedule(bucket, local_epoch(_flush_time(digest, row.first)))
+        return len(rows)
+
+    def flush(self, due: List[Tuple[Hashable, object]]):
+        """
+        Timer callback: sends one message per due group.
+        """
+        db = SessionLocal()
+        try:
+            for (user_id, topic_key), _ in due:
+                self._deliver(db, user_id, topic_key)
+        finally:
+            db.close()
+
+    def _deliver(self, db: Session, user_id: int, topic_key: Optional[str]):
+        batch_id = uuid.uuid4().hex
+        query = db.query(NotificationEvent).filter(NotificationEvent.user_id == user_id, NotificationEvent.batch_id.is_(None))
+        if topic_key is not None:
+            query = query.filter(NotificationEvent.topic_key == topic_key)
+        claimed = query.update({NotificationEvent.batch_id: batch_id}, synchronize_session=False)
+        db.commit()
+        if not claimed:
+            return  # Başka bir işlem göndermiş
+
+        events = db.query(NotificationEvent).filter(NotificationEvent.batch_id == batch_id).order_by(NotificationEvent.id).all()
+        groups: "OrderedDict[tuple, List[NotificationEvent]]" = OrderedDict()
+        for event in events:
+            groups.setdefault((event.topic, event.topic_key), []).append(event)
+
+        preference = get_preferences(db, user_id)
+        locale = preference.locale
+        summaries = [_summary(topic, group[-1].title, len(group), locale) for (topic, _), group in groups.items()]
+        email = db.query(User.email).filter(User.id == user_id).scalar()
+
+        if preference.email_enabled and email:
+            sections = []
+            for summary, group in zip(summaries, groups.values()):
+                items = [render("digest_item", locale, line=event.line) for event in group]
+                sections.append(render(
+                    "digest_section", locale, summary=summary,
+                    items=SafeHtml("".join(item.html for item in items)), items_text="\n".join(item.text for item in items),
+                ))
+            message = render(
+                "digest", locale, count=len(events),
+                sections=SafeHtml("".join(section.html for section in sections)),
+                sections_text="\n\n".join(section.text for section in sections),
+            )
+            send_email(email, summaries[0] if len(summaries) == 1 else message.subject, message.html, message.text)
+        if preference.sms_enabled and preference.phone_number:
+            send_sms(preference.phone_number, " · ".join(summaries))
+
+        db.query(NotificationEvent).filter(NotificationEvent.batch_id == batch_id).delete(synchronize_session=False)
+        db.commit()
+
+    def start(self):
+        db = SessionLocal()
+        try:
+            self._schedule_pending(db)
+        finally:
+            db.close()
+        self.timers.start()
+
+    def stop(self):
+        self.timers.stop()
+
+
+# ✅ Uygulama genelinde tek birleştirici (uygulama başlarken bekleyen olaylar yüklenir)
+coalescer = NotificationCoalescer()
+
+
+def notify_ride_driver(db: Session, ride: Ride, topic: NotificationTopic, line: str):
+    """
+    Booking activity for the driver, coalesced per ride.
+    """
+    title = f"your {ride.departure_time:%A} ride {ride.start_location} → {ride.end_location}"
+    coalescer.notify(db, ride.driver_id, topic, f"ride:{ride.id}", title, line)
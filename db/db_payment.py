@@ -140,15 +140,52 @@ from sqlalchemy.orm import Session
 from db.models import Payment, User
 from db.enums import PaymentStatus, PaymentMethod
 from fastapi import HTTPException
-import stripe
+from datetime import datetime
+from typing import Optional
+from utils.providers import providers
 
-# ✅ Stripe API Anahtarı (Env Değişkenlerinden Al)
-stripe.api_key = "STRIPE_SECRET_KEY"
+# ✅ Stripe istemcisi ilk kart ödemesinde kurulur (STRIPE_SECRET_KEY, bkz. utils/providers.py)
 
 # ✅ Kullanıcının ödeme geçmişini getir
 def get_payments(db: Session, user_id: int):
     return db.query(Payment).filter(Payment.user_id == user_id).all()
 
+# ✅ Ekstre (statement) export'u için kolonlar
+STATEMENT_COLUMNS = (
+    "id",
+    "user_id",
+    "ride_id",
+    "amount",
+    "payment_status",
+    "payment_method",
+    "charge_id",
+    "payment_date",
+)
+
+# ✅ Ödemeleri sunucu taraflı cursor ile parça parça getir (export için)
+def iter_payments(
+    db: Session,
+    user_id: Optional[int] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    batch_size: int = 1000,
+):
+    """
+    Streams payment rows (as plain tuples in STATEMENT_COLUMNS order) without loading
+    the whole history into memory.
+    """
+    query = db.query(*(getattr(Payment, column) for column in STATEMENT_COLUMNS))
+
+    if user_id is not None:
+        query = query.filter(Payment.user_id == user_id)
+    if start is not None:
+        query = query.filter(Payment.payment_date >= start)
+    if end is not None:
+        query = query.filter(Payment.payment_date < end)
+
+    for row in query.order_by(Payment.payment_date, Payment.id).yield_per(batch_size):
+        yield tuple(row)
+
 # ✅ Tekil ödeme kaydını getir
 def get_payment_by_id(db: Session, payment_id: int):
     return db.query(Payment).filter(Payment.id == payment_id).first()
@@ -175,6 +212,7 @@ def make_payment(db: Session, user_id: int, ride_id: int, amount: float, payment
         if not token:
             raise HTTPException(status_code=400, detail="Credit card token is required for this payment method")
         
+        stripe = providers.get("stripe")
         try:
             charge = stripe.Charge.create(
                 amount=int(amount * 100),  # Stripe cent olarak kabul ediyor
@@ -251,6 +289,7 @@ def refund_payment(db: Session, payment_id: int):
         if not payment.charge_id:
             raise HTTPException(status_code=400, detail="Charge ID missing for refund")
         
+        stripe = providers.get("stripe")
         try:
             stripe.Refund.create(charge=payment.charge_id)
             payment.payment_status = PaymentStatus.REFUNDED
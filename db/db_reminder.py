@@ -0,0 +1,173 @@
+import os
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Hashable, Iterable, List, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from db.database import SessionLocal
+from db.enums import BookingStatus
+from db.models import Booking, Ride, RideReminder, User
+from utils.notifications import send_departure_reminders
+from utils.scheduler import PeriodicJob
+from utils.timers import TimerQueue, local_epoch
+
+# ✅ Kalkış hatırlatma ayarları (Çevre değişkenlerinden)
+REMINDER_OFFSETS_MINUTES = tuple(int(value) for value in os.getenv("REMINDER_OFFSETS_MINUTES", "1440,60").split(",") if value.strip())
+REMINDER_HORIZON_HOURS = float(os.getenv("REMINDER_HORIZON_HOURS", 48))  # Bellekte tutulan kalkış aralığı
+REMINDER_REFILL_INTERVAL = float(os.getenv("REMINDER_REFILL_INTERVAL", 900))  # saniye, ufku ileri kaydırma
+REMINDER_GRACE_MINUTES = float(os.getenv("REMINDER_GRACE_MINUTES", 10))  # Kaçırılan (örn. yeniden başlatma) hatırlatma bu kadar geç gidebilir
+
+# Not: departure_time yerel saat olarak saklanıyor (bkz. db_ride.create_ride: datetime.now())
+
+
+class ReminderScheduler:
+    """
+    Departure reminders (24h / 1h before by default) for rides with confirmed bookings.
+    Only rides departing within the horizon are held in the timer heap; a periodic
+    refill reads the next slice by departure time (indexed range query) instead of
+    polling the bookings table. Reminders that fire together are sent as one batch.
+    """
+
+    def __init__(self, offsets: Iterable[int] = REMINDER_OFFSETS_MINUTES, horizon_hours: float = REMINDER_HORIZON_HOURS):
+        self.offsets = tuple(sorted(set(offsets), reverse=True))
+        self.horizon = timedelta(hours=horizon_hours)
+        self.loaded_until = datetime.now()
+        self.timers = TimerQueue("ride-reminders", self.dispatch)
+
+    # ------------------------ 🗓️ Scheduling ------------------------ #
+
+    def schedule_ride(self, ride_id: int, departure_time: datetime):
+        """
+        (Re)schedules every reminder of a ride. Rides beyond the loaded horizon are
+        left to the refill.
+        """
+        if departure_time > self.loaded_until:
+            self.unschedule_ride(ride_id)
+            return
+        grace = time.time() - REMINDER_GRACE_MINUTES * 60
+        for offset in self.offsets:
+            when = local_epoch(departure_time - timedelta(minutes=offset))
+            if when >= grace:
+                self.timers.schedule((ride_id, offset), when, departure_time)
+            else:
+                self.timers.cancel((ride_id, offset))
+
+    def unschedule_ride(self, ride_id: int):
+        for offset in self.offsets:
+            self.timers.cancel((ride_id, offset))
+
+    def refresh_ride(self, db: Session, ride_id: int):
+        """
+        Re-reads one ride after a booking was created / cancelled or its departure
+        time changed: scheduled while it has confirmed bookings, removed otherwise.
+        """
+        ride = db.query(Ride.departure_time).filter(Ride.id == ride_id).first()
+        has_bookings = db.query(Booking.id).filter(
+            Booking.ride_id == ride_id, Booking.status == BookingStatus.CONFIRMED
+        ).first() is not None
+        if ride and has_bookings:
+            self.schedule_ride(ride_id, ride.departure_time)
+        else:
+            self.unschedule_ride(ride_id)
+
+    def load(self, db: Session, start: datetime, end: datetime) -> int:
+        """
+        Schedules the rides with confirmed bookings departing in (start, end].
+        """
+        self.loaded_until = max(self.loaded_until, end)
+        rows = (
+            db.query(Ride.id, Ride.departure_time)
+            .filter(Ride.departure_time > start, Ride.departure_time <= end)
+            .filter(Ride.bookings.any(Booking.status == BookingStatus.CONFIRMED))
+            .all()
+        )
+        for row in rows:
+            self.schedule_ride(row.id, row.departure_time)
+        return len(rows)
+
+    # ------------------------ 📤 Dispatch ------------------------ #
+
+    def dispatch(self, due: List[Tuple[Hashable, datetime]]):
+        """
+        Timer callback: sends every due reminder with two queries for the whole batch
+        (rides + recipients). Each reminder is claimed in ride_reminders first, so
+        several workers / a restart never send it twice.
+        """
+        db = SessionLocal()
+        try:
+            ride_ids = {ride_id for (ride_id, _), _ in due}
+            rides = {
+                row.id: row for row in db.query(
+                    Ride.id, Ride.departure_time, Ride.start_location, Ride.end_location, User.email.label("driver_email")
+                ).join(User, User.id == Ride.driver_id).filter(Ride.id.in_(ride_ids))
+            }
+            passengers = defaultdict(list)
+            for ride_id, email in (
+                db.query(Booking.ride_id, User.email)
+                .join(User, User.id == Booking.passenger_id)
+                .filter(Booking.ride_id.in_(ride_ids), Booking.status == BookingStatus.CONFIRMED)
+            ):
+                passengers[ride_id].append(email)
+
+            for (ride_id, offset), departure_time in due:
+                ride = rides.get(ride_id)
+                if ride is None or not passengers[ride_id]:
+                    continue
+                if ride.departure_time != departure_time:
+                    self.schedule_ride(ride_id, ride.departure_time)  # Başka işlemde saat değişmiş
+                    continue
+                if not self._claim(db, ride_id, offset, departure_time):
+                    continue
+                send_departure_reminders(
+                    [ride.driver_email] + passengers[ride_id], ride.start_location, ride.end_location, departure_time, offset
+                )
+        finally:
+            db.close()
+
+    @staticmethod
+    def _claim(db: Session, ride_id: int, offset: int, departure_time: datetime) -> bool:
+        try:
+            with db.begin_nested():
+                db.add(RideReminder(ride_id=ride_id, offset_minutes=offset, departure_time=departure_time))
+            db.commit()
+            return True
+        except IntegrityError:
+            db.rollback()
+            return False
+
+    # ------------------------ ⏱️ Lifecycle ------------------------ #
+
+    def refill(self):
+        """
+        Moves the horizon forward and drops claims of departed rides (periodic job).
+        """
+        db = SessionLocal()
+        try:
+            self.load(db, self.loaded_until, datetime.now() + self.horizon)
+            db.query(RideReminder).filter(RideReminder.departure_time < datetime.now() - timedelta(days=1)).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def start(self):
+        db = SessionLocal()
+        try:
+            now = datetime.now()
+            self.loaded_until = now
+            self.load(db, now, now + self.horizon)
+        finally:
+            db.close()
+        self.timers.start()
+        reminder_refill_job.start()
+
+    def stop(self):
+        reminder_refill_job.stop()
+        self.timers.stop()
+
+
+# ✅ Uygulama genelinde tek hatırlatma zamanlayıcısı (uygulama başlarken başlatılır)
+reminder_scheduler = ReminderScheduler()
+reminder_refill_job = PeriodicJob("ride-reminder-refill", REMINDER_REFILL_INTERVAL, reminder_scheduler.refill)
@@ -1,11 +1,19 @@
+import base64
+import json
+from typing import Iterable, Optional
+from sqlalchemy import String, func, insert, select, tuple_, type_coerce, update
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
-from db.models import Review, ReviewVote, User
+from db.models import Review, ReviewVote, User, UserRatingAggregate, REVIEW_FEED_VISIBLE
+from db.enums import ReviewCategory, ReviewStatus, ReviewVoteType, ReviewSort
 from schemas import ReviewCreate, ReviewUpdate
+from utils.vote_buffer import VOTE_BUFFER_ENABLED, vote_buffer
+from db.db_score import unscore_review
+from utils.near_duplicates import index_reviews, remove_review as remove_from_duplicate_index
 from fastapi import HTTPException
 from datetime import datetime, timedelta
 try:
-    from utils.sentiment_analysis import analyze_sentiment  # ✅ AI Sentiment Analysis for spam detection
+    from utils.sentiment_analysis import moderate_text, moderate_many  # ✅ AI Sentiment Analysis for spam detection
 except ImportError:
     raise ImportError("The module 'utils.sentiment_analysis' could not be resolved. Ensure it exists and is in the Python path.")
 
@@ -42,7 +50,7 @@ def create_review(db: Session, review_data: ReviewCreate):
         raise HTTPException(status_code=400, detail="You have already reviewed this ride/user.")
 
     # ✅ AI Sentiment Analysis Check (Blocks Fake or Abusive Reviews)
-    if analyze_sentiment(review_data.review_text):
+    if moderate_text(review_data.review_text):
         raise HTTPException(status_code=400, detail="Review contains abusive or spam content.")
 
     new_review = Review(
@@ -58,13 +66,12 @@ def create_review(db: Session, review_data: ReviewCreate):
 
     db.add(new_review)
 
+    # ✅ Update Reviewee's running rating aggregates in the same transaction
+    add_review_to_rating(db, new_review)
+
     try:
         db.commit()
         db.refresh(new_review)
-        
-        # ✅ Update Reviewee's Average Rating
-        update_user_rating(db, review_data.reviewee_id)
-        
         return new_review
     except IntegrityError:
         db.rollback()
@@ -104,6 +111,90 @@ def get_reviews_for_user(db: Session, user_id: int):
 
     return reviews
 
+# ✅ Sıralama modu -> (sıralama kolonu, azalan mı?)
+_FEED_ORDER = {
+    ReviewSort.NEWEST: (Review.created_at, True),
+    ReviewSort.MOST_HELPFUL: (Review.helpfulness, True),
+    ReviewSort.HIGHEST_RATING: (Review.star_rating, True),
+    ReviewSort.LOWEST_RATING: (Review.star_rating, False),
+}
+
+def _sort_key(sort: ReviewSort):
+    """
+    created_at is compared as the stored text: func.now() writes 'YYYY-MM-DD HH:MM:SS'
+    while Python-side datetimes bind as '...SS.ffffff', so a decoded datetime would sort
+    after every row of the same second. type_coerce adds no CAST (index still used).
+    """
+    column = _FEED_ORDER[sort][0]
+    return type_coerce(column, String) if sort == ReviewSort.NEWEST else column
+
+def _encode_cursor(value, last_id: int) -> str:
+    raw = json.dumps([value, last_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+def _decode_cursor(sort: ReviewSort, cursor: str):
+    try:
+        value, last_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        expected = str if sort == ReviewSort.NEWEST else (int, float)
+        if not isinstance(value, expected) or isinstance(value, bool):
+            raise ValueError(value)
+        return value, int(last_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def get_review_feed(
+    db: Session,
+    ride_id: Optional[int] = None,
+    reviewee_id: Optional[int] = None,
+    reviewer_id: Optional[int] = None,
+    sort: ReviewSort = ReviewSort.NEWEST,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+):
+    """
+    Returns one page of visible reviews using keyset pagination.
+
+    The query shape (reviewee_id = ?, visible, ORDER BY sort column, id) matches the
+    partial feed indexes, so a page costs O(limit) no matter how deep the client scrolls.
+
+    Args:
+        db (Session): The database session.
+        ride_id / reviewee_id / reviewer_id (int, optional): Filters.
+        sort (ReviewSort): newest, most_helpful, highest_rating or lowest_rating.
+        limit (int): Page size.
+        cursor (str, optional): next_cursor from the previous page.
+
+    Returns:
+        dict: {"items": [...], "next_cursor": str | None}
+    """
+    column, descending = _FEED_ORDER[sort]
+    sort_key = _sort_key(sort)
+
+    query = db.query(Review, sort_key).filter(REVIEW_FEED_VISIBLE)
+    if ride_id:
+        query = query.filter(Review.ride_id == ride_id)
+    if reviewee_id:
+        query = query.filter(Review.reviewee_id == reviewee_id)
+    if reviewer_id:
+        query = query.filter(Review.reviewer_id == reviewer_id)
+
+    if cursor:
+        value, last_id = _decode_cursor(sort, cursor)
+        position = tuple_(sort_key, Review.id)
+        query = query.filter(position < tuple_(value, last_id) if descending else position > tuple_(value, last_id))
+
+    if descending:
+        query = query.order_by(column.desc(), Review.id.desc())
+    else:
+        query = query.order_by(column.asc(), Review.id.asc())
+
+    # ✅ Bir fazla satır çek: sonraki sayfa var mı anlamak için
+    rows = query.limit(limit + 1).all()
+    items = [review for review, _ in rows[:limit]]
+    next_cursor = _encode_cursor(rows[limit - 1][1], items[-1].id) if len(rows) > limit else None
+
+    return {"items": items, "next_cursor": next_cursor}
+
 def update_review(db: Session, review_id: int, review_update_data: ReviewUpdate):
     """
     Updates a review's content.
@@ -121,7 +212,13 @@ def update_review(db: Session, review_id: int, review_update_data: ReviewUpdate)
     if not review:
         raise HTTPException(status_code=404, detail="Review not found")
 
-    for key, value in review_update_data.dict(exclude_unset=True).items():
+    update_data = review_update_data.dict(exclude_unset=True)
+
+    # ✅ Only the difference is applied to the aggregates
+    if update_data.get("star_rating") is not None:
+        change_review_rating(db, review, update_data["star_rating"])
+
+    for key, value in update_data.items():
         setattr(review, key, value)
 
     db.commit()
@@ -145,8 +242,10 @@ def delete_review(db: Session, review_id: int):
     if not review:
         raise HTTPException(status_code=404, detail="Review not found")
 
+    remove_review_from_rating(db, review)
     db.delete(review)
     db.commit()
+    remove_from_duplicate_index(review_id)  # Silinen metin yeni yorumları işaretlemesin
 
     return {"message": "Review deleted successfully"}
 
@@ -154,6 +253,10 @@ def vote_review(db: Session, review_id: int, voter_id: int, vote_type: str):
     """
     Allows a user to vote (like/dislike) on a review.
 
+    Duplicate votes are rejected by the (review_id, voter_id) unique constraint and the
+    counters are incremented in SQL (or buffered when VOTE_BUFFER_ENABLED is set), so
+    concurrent votes never lose updates.
+
     Args:
         db (Session): The database session.
         review_id (int): The ID of the review being voted on.
@@ -163,48 +266,311 @@ def vote_review(db: Session, review_id: int, voter_id: int, vote_type: str):
     Returns:
         dict: Confirmation message and updated vote counts.
     """
-    review = db.query(Review).filter(Review.id == review_id).first()
-    
-    if not review:
-        raise HTTPException(status_code=404, detail="Review not found")
+    vote_type = ReviewVoteType(vote_type)
 
-    # Prevent duplicate voting
-    existing_vote = db.query(ReviewVote).filter(
-        ReviewVote.review_id == review_id,
-        ReviewVote.voter_id == voter_id
-    ).first()
-
-    if existing_vote:
-        raise HTTPException(status_code=400, detail="You have already voted on this review.")
+    counts = db.query(Review.likes, Review.dislikes).filter(Review.id == review_id).first()
+    if not counts:
+        raise HTTPException(status_code=404, detail="Review not found")
+    like_count, dislike_count = counts.likes or 0, counts.dislikes or 0
 
-    # Add the vote
-    new_vote = ReviewVote(
+    # Add the vote (the unique constraint prevents duplicate voting)
+    db.add(ReviewVote(
         review_id=review_id,
         voter_id=voter_id,
         vote_type=vote_type,
         created_at=datetime.utcnow()
-    )
+    ))
+
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="You have already voted on this review.")
 
-    db.add(new_vote)
+    likes = 1 if vote_type == ReviewVoteType.LIKE else 0
+    dislikes = 1 if vote_type == ReviewVoteType.DISLIKE else 0
 
     # Update like/dislike count
-    if vote_type == "like":
-        review.likes += 1
-    elif vote_type == "dislike":
-        review.dislikes += 1
+    if VOTE_BUFFER_ENABLED:
+        db.commit()
+        vote_buffer.add(review_id, likes, dislikes)  # Sadece commit başarılıysa: geri alınan oy sayılmaz
+        pending_likes, pending_dislikes = vote_buffer.pending(review_id)
+        like_count, dislike_count = like_count + pending_likes, dislike_count + pending_dislikes
+    else:
+        like_count, dislike_count = db.execute(
+            update(Review)
+            .where(Review.id == review_id)
+            .values(
+                likes=Review.likes + likes,
+                dislikes=Review.dislikes + dislikes,
+                helpfulness=Review.helpfulness + (likes - dislikes),
+            )
+            .returning(Review.likes, Review.dislikes)
+        ).one()
+        db.commit()
+
+    return {
+        "message": f"Vote recorded successfully: {vote_type.value}",
+        "likes": like_count,
+        "dislikes": dislike_count
+    }
+
+def _apply_rating_delta(db: Session, user_id: int, category: ReviewCategory, sum_delta: float, count_delta: int):
+    """
+    Applies a delta to a user's running rating aggregates using SQL-side increments,
+    so concurrent writers never overwrite each other. Does not commit.
+
+    Args:
+        db (Session): The database session.
+        user_id (int): The ID of the reviewee.
+        category (ReviewCategory): Category of the review being added/removed.
+        sum_delta (float): Change in the star rating sum.
+        count_delta (int): Change in the review count (+1, -1 or 0).
+    """
+    new_sum = User.rating_sum + sum_delta
+    new_count = User.rating_count + count_delta
+
+    db.query(User).filter(User.id == user_id).update(
+        {
+            User.rating_sum: new_sum,
+            User.rating_count: new_count,
+            User.rating: func.coalesce(func.round(new_sum / func.nullif(new_count, 0), 2), 0.0),
+        },
+        synchronize_session=False
+    )
+
+    bucket_filter = (
+        UserRatingAggregate.user_id == user_id,
+        UserRatingAggregate.review_category == category,
+    )
+    increments = {
+        UserRatingAggregate.rating_sum: UserRatingAggregate.rating_sum + sum_delta,
+        UserRatingAggregate.rating_count: UserRatingAggregate.rating_count + count_delta,
+    }
+
+    updated = db.query(UserRatingAggregate).filter(*bucket_filter).update(increments, synchronize_session=False)
+    if updated or count_delta <= 0:
+        return
+
+    # ✅ First review in this category: create the bucket (another writer may race us)
+    try:
+        with db.begin_nested():
+            db.add(UserRatingAggregate(
+                user_id=user_id,
+                review_category=category,
+                rating_sum=sum_delta,
+                rating_count=count_delta
+            ))
+    except IntegrityError:
+        db.query(UserRatingAggregate).filter(*bucket_filter).update(increments, synchronize_session=False)
+
+def add_review_to_rating(db: Session, review: Review):
+    """
+    Adds a visible review's star rating to the reviewee's aggregates. Does not commit.
+    """
+    if review.hidden:
+        return
+    _apply_rating_delta(db, review.reviewee_id, review.review_category, review.star_rating, 1)
+
+def remove_review_from_rating(db: Session, review: Review):
+    """
+    Removes a visible review's star rating from the reviewee's aggregates and driver score. Does not commit.
+    """
+    if review.hidden:
+        return
+    _apply_rating_delta(db, review.reviewee_id, review.review_category, -review.star_rating, -1)
+    unscore_review(db, review)
+
+def change_review_rating(db: Session, review: Review, new_star_rating: float):
+    """
+    Applies only the difference of an edited star rating to the aggregates; the driver score
+    drops the old rating and picks up the new one on the next score run. Does not commit.
+    """
+    if review.hidden or new_star_rating == review.star_rating:
+        return
+    _apply_rating_delta(db, review.reviewee_id, review.review_category, new_star_rating - review.star_rating, 0)
+    unscore_review(db, review)
+
+def set_review_hidden(db: Session, review_id: int, hidden: bool):
+    """
+    Hides or unhides a review and moves its rating in or out of the reviewee's aggregates.
+
+    Args:
+        db (Session): The database session.
+        review_id (int): The ID of the review.
+        hidden (bool): True to hide, False to publish again.
+
+    Returns:
+        Review: The updated review object.
+    """
+    review = db.query(Review).filter(Review.id == review_id).first()
+    if not review:
+        raise HTTPException(status_code=404, detail="Review not found")
+
+    # ✅ Unhiding is an explicit approval, so it also publishes pending/rejected reviews
+    _flip_hidden(db, review, hidden, status=None if hidden else ReviewStatus.PUBLISHED)
 
     db.commit()
     db.refresh(review)
+    if not hidden:
+        index_reviews([(review.id, review.review_text)])  # Yayınlanan metin tekrar kopyaları işaretler
+    return review
 
-    return {
-        "message": f"Vote recorded successfully: {vote_type}",
-        "likes": review.likes,
-        "dislikes": review.dislikes
-    }
+def _flip_hidden(db: Session, review: Review, hidden: bool, status: Optional[ReviewStatus] = None) -> bool:
+    """
+    Flips the hidden flag with a conditional UPDATE; only the writer that actually flips it
+    moves the rating in or out of the aggregates. Does not commit.
+
+    Returns:
+        bool: True if this call changed the flag.
+    """
+    values = {Review.hidden: hidden}
+    if status is not None:
+        values[Review.status] = status
+
+    current_state = Review.hidden.is_(True) if not hidden else Review.hidden.isnot(True)
+    flipped = db.query(Review).filter(Review.id == review.id, current_state).update(
+        values, synchronize_session=False
+    )
+
+    if flipped:
+        direction = -1 if hidden else 1
+        _apply_rating_delta(db, review.reviewee_id, review.review_category, direction * review.star_rating, direction)
+        if hidden:
+            unscore_review(db, review)  # Tekrar görünür olursa bir sonraki skor işi geri ekler
+            remove_from_duplicate_index(review.id)  # Gizlenen metin yeni yorumları işaretlemesin
+    elif status is not None:
+        db.query(Review).filter(Review.id == review.id).update({Review.status: status}, synchronize_session=False)
+
+    return bool(flipped)
+
+def publish_review(db: Session, review: Review):
+    """
+    Publishes a moderated review and adds it to the reviewee's rating. Does not commit.
+    """
+    _flip_hidden(db, review, False, status=ReviewStatus.PUBLISHED)
+
+def hide_review(db: Session, review: Review):
+    """
+    Hides a review (keeps its moderation status) and removes it from the rating. Does not commit.
+    """
+    _flip_hidden(db, review, True)
+
+def reject_review(db: Session, review: Review):
+    """
+    Marks a moderated review as rejected; it stays hidden, never counts and leaves the
+    near-duplicate index. Does not commit.
+    """
+    _flip_hidden(db, review, True, status=ReviewStatus.REJECTED)
+    remove_from_duplicate_index(review.id)
+
+def get_pending_review_ids(db: Session):
+    """
+    Returns the IDs of reviews still waiting for moderation (used to refill the queue on startup).
+    """
+    rows = db.query(Review.id).filter(Review.status == ReviewStatus.PENDING).order_by(Review.id).all()
+    return [row.id for row in rows]
+
+def remoderate_reviews(db: Session, batch_size: int = 500) -> int:
+    """
+    Re-runs sentiment moderation over every visible review (e.g. after a threshold change)
+    and hides the ones that are now inappropriate. Texts are scored in batches on the
+    sentiment process pool.
+
+    Args:
+        db (Session): The database session.
+        batch_size (int): Number of reviews scored per batch.
+
+    Returns:
+        int: Number of reviews that were hidden.
+    """
+    hidden_count = 0
+    last_id = 0
+
+    while True:
+        batch = (
+            db.query(Review.id, Review.review_text)
+            .filter(Review.id > last_id, Review.hidden.isnot(True), Review.review_text.isnot(None))
+            .order_by(Review.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not batch:
+            break
+        last_id = batch[-1].id
+
+        flags = moderate_many([row.review_text for row in batch])
+        for row, flagged in zip(batch, flags):
+            if flagged:
+                set_review_hidden(db, row.id, True)
+                hidden_count += 1
+
+    return hidden_count
+
+def rebuild_user_ratings(db: Session, user_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Backfills / repairs the rating aggregates from the reviews table with set-based
+    statements (one pass per table, no per-review Python loop).
+
+    Args:
+        db (Session): The database session.
+        user_ids (Iterable[int], optional): Only repair these users. Defaults to all users.
+
+    Returns:
+        int: Number of users whose aggregates were rebuilt.
+    """
+    user_ids = list(user_ids) if user_ids is not None else None
+    visible = Review.hidden.isnot(True)
+
+    total_sum = (
+        select(func.coalesce(func.sum(Review.star_rating), 0.0))
+        .where(Review.reviewee_id == User.id, visible)
+        .scalar_subquery()
+    )
+    total_count = (
+        select(func.count(Review.id))
+        .where(Review.reviewee_id == User.id, visible)
+        .scalar_subquery()
+    )
+
+    users = db.query(User)
+    if user_ids is not None:
+        users = users.filter(User.id.in_(user_ids))
+    rebuilt = users.update(
+        {
+            User.rating_sum: total_sum,
+            User.rating_count: total_count,
+            User.rating: func.coalesce(func.round(total_sum / func.nullif(total_count, 0), 2), 0.0),
+        },
+        synchronize_session=False
+    )
+
+    # ✅ Kategori bazlı kırılımı sıfırdan oluştur
+    buckets = db.query(UserRatingAggregate)
+    if user_ids is not None:
+        buckets = buckets.filter(UserRatingAggregate.user_id.in_(user_ids))
+    buckets.delete(synchronize_session=False)
+
+    grouped = (
+        select(Review.reviewee_id, Review.review_category, func.sum(Review.star_rating), func.count(Review.id))
+        .where(visible)
+        .group_by(Review.reviewee_id, Review.review_category)
+    )
+    if user_ids is not None:
+        grouped = grouped.where(Review.reviewee_id.in_(user_ids))
+
+    db.execute(
+        insert(UserRatingAggregate).from_select(
+            ["user_id", "review_category", "rating_sum", "rating_count"], grouped
+        )
+    )
+
+    db.commit()
+    return rebuilt
 
 def update_user_rating(db: Session, user_id: int):
     """
-    Updates the average rating of a user based on received reviews.
+    Recomputes a single user's rating aggregates from scratch (repair path).
 
     Args:
         db (Session): The database session.
@@ -213,16 +579,19 @@ def update_user_rating(db: Session, user_id: int):
     Returns:
         None
     """
-    reviews = db.query(Review).filter(Review.reviewee_id == user_id).all()
-    if not reviews:
-        return
-
-    total_rating = sum(review.star_rating for review in reviews)
-    average_rating = total_rating / len(reviews)
+    rebuild_user_ratings(db, [user_id])
 
+def get_user_rating(db: Session, user_id: int):
+    """
+    Returns the precomputed overall rating and per-category breakdown of a user.
+    """
     user = db.query(User).filter(User.id == user_id).first()
-    if user:
-        user.rating = round(average_rating, 2)
-        user.rating_count = len(reviews)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
 
-    db.commit()
+    return {
+        "user_id": user.id,
+        "rating": user.rating or 0.0,
+        "rating_count": user.rating_count or 0,
+        "breakdown": user.rating_breakdown,
+    }
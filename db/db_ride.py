@@ -3,10 +3,12 @@ from fastapi import HTTPException, Response, status
 from sqlalchemy.orm.session import Session
 from sqlalchemy.sql.expression import collate
 from schemas import RideBase
-from db.models import Ride, User, Car
+from db.models import Ride, User, Car, UserScore
 from datetime import date, datetime
 from sqlalchemy import func
 from db.enums import RideStatus
+from db.db_reminder import reminder_scheduler
+from utils.ride_events import publish_ride, ride_events, ride_snapshot
 
 
 def create_ride(db: Session, request: RideBase):
@@ -100,6 +102,11 @@ def search_rides(
         ridesQuery = ridesQuery.filter(func.date(Ride.departure_time) == departure_date)
     if number_of_seats:
         ridesQuery = ridesQuery.filter(Ride.available_seats >= number_of_seats)
+
+    # ✅ Önce yüksek skorlu sürücüler (Bayesian + zamanla azalan skor, önceden hesaplanmış)
+    ridesQuery = ridesQuery.outerjoin(UserScore, UserScore.user_id == Ride.driver_id).order_by(
+        UserScore.score.desc().nullslast(), Ride.departure_time
+    )
        
     rides = ridesQuery.all()
     return rides
@@ -146,6 +153,8 @@ def update_ride(db: Session, ride_id: int, request: RideBase):
 
     db.commit()
     db.refresh(ride)
+    publish_ride(ride)  # ✅ Koltuk sayısı / kalkış saati canlı abonelere
+    reminder_scheduler.refresh_ride(db, ride.id)  # ✅ Kalkış saati değiştiyse hatırlatmalar yeniden planlanır
     return ride
 
 
@@ -160,7 +169,10 @@ def delete_ride(db: Session, driver_id: int,  ride_id: int):
     if ride.driver_id != driver_id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="This ride does not belong to the driver")
     
+    snapshot = ride_snapshot(ride, deleted=True)  # Silindikten sonra nesne okunamaz
     db.delete(ride)
     db.commit() 
+    ride_events.publish(ride_id, snapshot)
+    reminder_scheduler.unschedule_ride(ride_id)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
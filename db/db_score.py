@@ -0,0 +1,239 @@
+import logging
+import math
+import os
+import threading
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import bindparam, delete, func, select, update
+from sqlalchemy.orm import Session
+
+from db.database import SessionLocal
+from db.models import REVIEW_UNSCORED, Review, ScoreAdjustment, ScoreJobState, User, UserScore
+from utils.scheduler import PeriodicJob
+
+logger = logging.getLogger(__name__)
+
+# ✅ Skor parametreleri (Çevre değişkenlerinden)
+SCORE_HALF_LIFE_DAYS = float(os.getenv("SCORE_HALF_LIFE_DAYS", 180))  # Yorum ağırlığı bu sürede yarıya iner
+SCORE_PRIOR_WEIGHT = float(os.getenv("SCORE_PRIOR_WEIGHT", 5))  # Prior kaç "sanal yorum" değerinde
+SCORE_PRIOR_MEAN = os.getenv("SCORE_PRIOR_MEAN")  # Boşsa tüm yorumların ortalaması kullanılır
+SCORE_BATCH_SIZE = int(os.getenv("SCORE_BATCH_SIZE", 200000))
+SCORE_REFRESH_INTERVAL = float(os.getenv("SCORE_REFRESH_INTERVAL", 900))  # saniye, 0 => kapalı
+
+_DECAY_PER_DAY = math.log(2) / SCORE_HALF_LIFE_DAYS
+_SECONDS_PER_DAY = 86400.0
+_REBASE_AFTER_DAYS = 20 * SCORE_HALF_LIFE_DAYS  # e^{λΔ} büyüdükçe referans zamanı ileri al
+_refresh_lock = threading.Lock()  # Manuel yenileme + periyodik iş aynı süreçte üst üste binmesin
+
+
+def _days_since(times, reference: datetime) -> np.ndarray:
+    """
+    Vectorized (t - reference) in days for a sequence of naive UTC datetimes.
+    """
+    stamps = np.array(times, dtype="datetime64[s]")
+    return (stamps - np.datetime64(reference, "s")).astype(np.float64) / _SECONDS_PER_DAY
+
+
+def _prior_mean(db: Session) -> float:
+    """
+    Global mean star rating, read from the running user aggregates (no review scan).
+    """
+    if SCORE_PRIOR_MEAN:
+        return float(SCORE_PRIOR_MEAN)
+    total_sum, total_count = db.query(func.sum(User.rating_sum), func.sum(User.rating_count)).one()
+    return float(total_sum) / float(total_count) if total_count else 3.0
+
+
+def _score_expression(decay_sum, decay_weight, prior: float, decay_now: float):
+    return (SCORE_PRIOR_WEIGHT * prior + decay_now * decay_sum) / (SCORE_PRIOR_WEIGHT + decay_now * decay_weight)
+
+
+def _lock_state(db: Session, now: datetime) -> ScoreJobState:
+    """
+    Write-locks the state row for the rest of the transaction: score runs (any process)
+    are serialized here. Review mutations never touch this row.
+    """
+    locked = db.query(ScoreJobState).filter(ScoreJobState.id == 1).update(
+        {ScoreJobState.updated_at: now}, synchronize_session=False
+    )
+    if not locked:
+        db.add(ScoreJobState(id=1, last_review_id=0, reference_time=now, updated_at=now))
+        db.flush()
+    return db.query(ScoreJobState).filter(ScoreJobState.id == 1).populate_existing().one()
+
+
+def _claim_reviews(db: Session, last_review_id: int):
+    """
+    Marks the next batch of unscored visible reviews as scored and returns exactly the
+    rows it marked (a review hidden in the meantime no longer matches and is skipped).
+    """
+    batch_ids = (
+        select(Review.id)
+        .where(Review.id > last_review_id, REVIEW_UNSCORED)
+        .order_by(Review.id)
+        .limit(SCORE_BATCH_SIZE)
+        .scalar_subquery()
+    )
+    return db.execute(
+        update(Review)
+        .where(Review.id.in_(batch_ids), REVIEW_UNSCORED)
+        .values(scored_rating=Review.star_rating)
+        .returning(Review.id, Review.reviewee_id, Review.star_rating, Review.created_at)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+
+def _consume_adjustments(db: Session):
+    """
+    Deletes and returns the contributions recorded by unscore_review so far.
+    """
+    return db.execute(
+        delete(ScoreAdjustment)
+        .returning(ScoreAdjustment.user_id, ScoreAdjustment.scored_rating, ScoreAdjustment.review_created_at)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+
+def _weighted(rows, sign: float, reference: datetime):
+    user_ids = np.array([row[0] for row in rows], dtype=np.int64)
+    stars = np.array([row[1] for row in rows], dtype=np.float64)
+    review_weights = sign * np.exp(_DECAY_PER_DAY * _days_since([row[2] for row in rows], reference))
+    return user_ids, review_weights * stars, review_weights
+
+
+def refresh_user_scores(db: Session, full: bool = False, now: Optional[datetime] = None) -> int:
+    """
+    Folds visible reviews that aren't part of the scores yet (scored_rating IS NULL) into
+    every reviewee's decayed sums, takes out the contributions unscore_review recorded,
+    and recomputes all Bayesian scores:
+
+        score = (C * m + d * S) / (C + d * W),   d = e^{-λ (now - t0)}
+
+    S and W are sums of star ratings / weights with w_i = e^{λ (t_i - t0)}, so adding a
+    review never requires touching older ones; only d changes as time passes. Reviews
+    published late (moderation) are picked up by the next run, nothing waits for them.
+
+    Sums are changed with in-place SQL increments and reviews are claimed with a
+    conditional update, so hides/edits running alongside are never lost and never make
+    the run abort. Runs themselves are serialized on the state row.
+
+    Args:
+        db (Session): The database session.
+        full (bool): Forget the stored sums and rebuild from the first review.
+        now (datetime, optional): Scoring time (UTC). Defaults to utcnow().
+
+    Returns:
+        int: Number of user scores written.
+    """
+    now = now or datetime.utcnow()
+    state = _lock_state(db, now)
+
+    if full:
+        db.query(UserScore).delete(synchronize_session=False)
+        db.query(ScoreAdjustment).delete(synchronize_session=False)
+        db.query(Review).filter(Review.scored_rating.isnot(None)).update({Review.scored_rating: None}, synchronize_session=False)
+        state.reference_time = now
+        state.last_review_id = 0
+
+    # ✅ Referans zamanı çok geride kaldıysa yeniden ölçekle (taşmayı önler)
+    elapsed_days = (now - state.reference_time).total_seconds() / _SECONDS_PER_DAY
+    if elapsed_days > _REBASE_AFTER_DAYS:
+        scale = math.exp(-_DECAY_PER_DAY * elapsed_days)
+        db.query(UserScore).update(
+            {UserScore.decay_sum: UserScore.decay_sum * scale, UserScore.decay_weight: UserScore.decay_weight * scale},
+            synchronize_session=False,
+        )
+        state.reference_time = now
+        elapsed_days = 0.0
+    reference = state.reference_time
+
+    # ✅ Çıkarılan katkılar (negatif) + yeni yorumlar (pozitif)
+    parts = []
+    adjustments = _consume_adjustments(db)
+    if adjustments:
+        parts.append(_weighted(adjustments, -1.0, reference))
+
+    last_review_id = 0
+    while True:
+        batch = _claim_reviews(db, last_review_id)
+        if not batch:
+            break
+        last_review_id = max(row.id for row in batch)
+        parts.append(_weighted([(row.reviewee_id, row.star_rating, row.created_at) for row in batch], 1.0, reference))
+
+    # ✅ Kullanıcı bazında grupla ve topla (tek geçiş)
+    if parts:
+        user_ids, inverse = np.unique(np.concatenate([part[0] for part in parts]), return_inverse=True)
+        sums = np.bincount(inverse, weights=np.concatenate([part[1] for part in parts]), minlength=len(user_ids))
+        weights = np.bincount(inverse, weights=np.concatenate([part[2] for part in parts]), minlength=len(user_ids))
+
+        known = {row.user_id for row in db.query(UserScore.user_id)}
+        updates, inserts = [], []
+        for user_id, delta_sum, delta_weight in zip(user_ids.tolist(), sums.tolist(), weights.tolist()):
+            if user_id in known:
+                updates.append({"b_user_id": user_id, "b_sum": delta_sum, "b_weight": delta_weight})
+            else:
+                inserts.append({"user_id": user_id, "score": 0.0, "decay_sum": delta_sum, "decay_weight": delta_weight})
+
+        if updates:
+            table = UserScore.__table__
+            db.execute(
+                table.update()
+                .where(table.c.user_id == bindparam("b_user_id"))
+                .values(decay_sum=table.c.decay_sum + bindparam("b_sum"), decay_weight=table.c.decay_weight + bindparam("b_weight")),
+                updates,
+            )
+        if inserts:
+            db.bulk_insert_mappings(UserScore, inserts)
+
+    # ✅ Bayesian + zaman azalmalı skor (tek UPDATE)
+    prior = _prior_mean(db)
+    decay_now = math.exp(-_DECAY_PER_DAY * elapsed_days)
+    written = db.query(UserScore).update(
+        {
+            UserScore.score: func.round(_score_expression(UserScore.decay_sum, UserScore.decay_weight, prior, decay_now), 4),
+            UserScore.updated_at: now,
+        },
+        synchronize_session=False,
+    )
+
+    state.last_review_id = max(last_review_id, state.last_review_id)
+    state.prior_mean = prior
+    db.commit()
+
+    return written
+
+
+def unscore_review(db: Session, review: Review):
+    """
+    Takes a review out of the driver score (review hidden, rejected, deleted or its
+    rating edited): clears its scored_rating and records the contribution it had, which
+    the next run subtracts. Edited reviews are folded in again with the new rating by
+    the same run. Does not commit; the review row stays locked until the caller does.
+    """
+    # ✅ Önce satırı kilitle: işlem bitene kadar skor işi bu yorumu skora katamaz (gizleme/silme ile yarışmaz)
+    db.query(Review).filter(Review.id == review.id).update({Review.scored_rating: Review.scored_rating}, synchronize_session=False)
+    scored_rating = db.query(Review.scored_rating).filter(Review.id == review.id).scalar()
+    if scored_rating is None:
+        return  # Skora hiç katılmadı (ya da zaten çıkarıldı)
+    db.query(Review).filter(Review.id == review.id).update({Review.scored_rating: None}, synchronize_session=False)
+    db.add(ScoreAdjustment(user_id=review.reviewee_id, review_created_at=review.created_at, scored_rating=scored_rating))
+
+
+def run_score_job(full: bool = False) -> int:
+    """
+    Runs refresh_user_scores with its own session (background task / scheduler entry point).
+    Runs in this process wait here instead of on the database lock.
+    """
+    with _refresh_lock:
+        db = SessionLocal()
+        try:
+            return refresh_user_scores(db, full=full)
+        finally:
+            db.close()
+
+
+# ✅ Periyodik skor işi (uygulama başlarken başlatılır)
+score_job = PeriodicJob("user-score-refresh", SCORE_REFRESH_INTERVAL, run_score_job)
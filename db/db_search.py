@@ -0,0 +1,129 @@
+import re
+from fastapi import HTTPException
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from db.enums import ComplaintStatus, SearchScope
+
+# ✅ FTS5 sanal tabloları (external content: metin sadece ana tabloda tutulur)
+# Her kapsam: (fts tablosu, kaynak tablo, metin kolonu)
+FTS_TABLES = {
+    SearchScope.REVIEWS: ("reviews_fts", "reviews", "review_text"),
+    SearchScope.COMPLAINTS: ("complaints_fts", "complaints", "reason"),
+}
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def _fts_ddl(fts_table: str, source: str, column: str):
+    """
+    DDL for one external-content FTS5 table and the triggers that keep it in sync
+    with the source table on every INSERT / UPDATE / DELETE (ORM or raw SQL).
+    """
+    return [
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5(
+            {column}, content='{source}', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+        )""",
+        f"""CREATE TRIGGER IF NOT EXISTS {fts_table}_ai AFTER INSERT ON {source} BEGIN
+            INSERT INTO {fts_table}(rowid, {column}) VALUES (new.id, new.{column});
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {fts_table}_ad AFTER DELETE ON {source} BEGIN
+            INSERT INTO {fts_table}({fts_table}, rowid, {column}) VALUES ('delete', old.id, old.{column});
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {fts_table}_au AFTER UPDATE OF {column} ON {source} BEGIN
+            INSERT INTO {fts_table}({fts_table}, rowid, {column}) VALUES ('delete', old.id, old.{column});
+            INSERT INTO {fts_table}(rowid, {column}) VALUES (new.id, new.{column});
+        END""",
+    ]
+
+
+def setup_search(engine: Engine):
+    """
+    Creates the FTS5 tables and sync triggers (SQLite only). A table that didn't exist
+    before is rebuilt from its source table, so existing rows become searchable too.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+
+    existing = set(inspect(engine).get_table_names())
+    with engine.begin() as conn:
+        for fts_table, source, column in FTS_TABLES.values():
+            for statement in _fts_ddl(fts_table, source, column):
+                conn.execute(text(statement))
+            if fts_table not in existing:
+                conn.execute(text(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')"))
+
+
+def rebuild_search_index(db: Session):
+    """
+    Rebuilds every FTS index from its source table (repair path).
+    """
+    for fts_table, _, _ in FTS_TABLES.values():
+        db.execute(text(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')"))
+    db.commit()
+
+
+def to_match_query(keywords: str) -> str:
+    """
+    Turns free-text keywords into a safe FTS5 MATCH expression: every word is quoted
+    (so user input can't break the query syntax), words are AND-ed and the last one
+    is a prefix match.
+    """
+    tokens = _TOKEN.findall(keywords or "")
+    if not tokens:
+        raise HTTPException(status_code=400, detail="Search query must contain at least one word.")
+
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def search(db: Session, keywords: str, scope: SearchScope, page: int = 1, page_size: int = 20):
+    """
+    Ranked (bm25) keyword search with highlighted snippets.
+
+    Args:
+        db (Session): The database session.
+        keywords (str): Free-text keywords.
+        scope (SearchScope): reviews or complaints.
+        page (int): 1-based page number.
+        page_size (int): Results per page.
+
+    Returns:
+        dict: {"items": [...], "page": int, "page_size": int, "has_more": bool}
+    """
+    if db.get_bind().dialect.name != "sqlite":
+        raise HTTPException(status_code=501, detail="Full-text search requires SQLite FTS5.")
+
+    fts_table, source, column = FTS_TABLES[scope]
+    extra_columns = (
+        "s.reviewer_id, s.reviewee_id, s.hidden, s.reported"
+        if scope == SearchScope.REVIEWS
+        else "s.reporter_user_id, s.reported_user_id, s.review_id, s.status"
+    )
+
+    # ✅ ORDER BY rank: FTS5'in kendi bm25 sıralaması (top-N için optimize)
+    rows = db.execute(
+        text(f"""
+            SELECT s.id, s.created_at, {extra_columns}, f.rank AS rank,
+                   snippet({fts_table}, 0, '<mark>', '</mark>', '…', 16) AS snippet
+            FROM {fts_table} AS f
+            JOIN {source} AS s ON s.id = f.rowid
+            WHERE {fts_table} MATCH :query
+            ORDER BY f.rank
+            LIMIT :limit OFFSET :offset
+        """),
+        {"query": to_match_query(keywords), "limit": page_size + 1, "offset": (page - 1) * page_size},
+    ).mappings().all()
+
+    items = [dict(row) for row in rows[:page_size]]
+    if scope == SearchScope.COMPLAINTS:
+        for item in items:
+            item["status"] = ComplaintStatus[item["status"]]  # SQLEnum üye adını saklar
+
+    return {
+        "items": items,
+        "page": page,
+        "page_size": page_size,
+        "has_more": len(rows) > page_size,
+    }
@@ -0,0 +1,261 @@
+import hashlib
+import os
+import secrets
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from db.database import SessionLocal
+from db.models import RefreshToken, RevokedToken, User
+from utils.bloom import BloomFilter
+from utils.scheduler import PeriodicJob
+
+# ✅ Refresh token ve iptal listesi ayarları (Çevre değişkenlerinden)
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 30))
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
+REVOCATION_BLOOM_CAPACITY = int(os.getenv("REVOCATION_BLOOM_CAPACITY", 100000))
+REVOCATION_BLOOM_ERROR_RATE = float(os.getenv("REVOCATION_BLOOM_ERROR_RATE", 0.001))
+REVOCATION_SYNC_INTERVAL = float(os.getenv("REVOCATION_SYNC_INTERVAL", 5))  # saniye, diğer işlemlerin iptalleri
+REVOCATION_PRUNE_INTERVAL = float(os.getenv("REVOCATION_PRUNE_INTERVAL", 3600))  # saniye, süresi dolanları sil
+
+
+def _hash_token(raw_token: str) -> str:
+    return hashlib.sha256(raw_token.encode("utf-8")).hexdigest()
+
+
+def _user_key(user_id) -> str:
+    return f"user:{user_id}"
+
+
+def _timestamp(value: datetime) -> float:
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+# ------------------------ 🧱 Revocation List (Bloom filter) ------------------------ #
+
+class RevocationList:
+    """
+    In-memory Bloom filter of revoked access-token jtis and user-level revocations.
+    A negative answer is final; only a positive is confirmed against revoked_tokens.
+    """
+
+    def __init__(self, capacity: int = REVOCATION_BLOOM_CAPACITY, error_rate: float = REVOCATION_BLOOM_ERROR_RATE):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._filter = BloomFilter(capacity, error_rate)
+        self._last_id = 0
+        self._pruned_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def add(self, key: str):
+        self._filter.add(key)
+
+    def might_be_revoked(self, jti: Optional[str], user_id) -> bool:
+        bloom = self._filter
+        return (jti is not None and jti in bloom) or _user_key(user_id) in bloom
+
+    def sync(self, db: Session) -> int:
+        """
+        Adds revocations written since the last sync (e.g. by other worker processes).
+        """
+        with self._lock:
+            rows = db.query(RevokedToken.id, RevokedToken.jti).filter(RevokedToken.id > self._last_id).order_by(RevokedToken.id).all()
+            for row in rows:
+                self._filter.add(row.jti)
+            if rows:
+                self._last_id = rows[-1].id
+            return len(rows)
+
+    def rebuild(self, db: Session) -> int:
+        """
+        Builds a fresh filter from the unexpired revocations and swaps it in
+        (Bloom filters can't forget, so expired entries are dropped this way).
+        """
+        with self._lock:
+            rows = db.query(RevokedToken.id, RevokedToken.jti).filter(RevokedToken.expires_at > datetime.utcnow()).all()
+            fresh = BloomFilter(max(self.capacity, len(rows) * 2), self.error_rate)
+            for row in rows:
+                fresh.add(row.jti)
+            self._filter = fresh
+            self._last_id = max((row.id for row in rows), default=self._last_id)
+            self._pruned_at = time.monotonic()
+            return len(rows)
+
+    def prune_due(self) -> bool:
+        return time.monotonic() - self._pruned_at >= REVOCATION_PRUNE_INTERVAL
+
+
+# ✅ Uygulama genelinde tek iptal listesi
+revocation_list = RevocationList()
+
+
+def is_revoked(db: Session, payload: dict) -> bool:
+    """
+    Checks an access-token payload against the revocation list. The DB is only
+    queried when the Bloom filter reports a (possibly false) positive.
+    """
+    jti = payload.get("jti")
+    user_id = payload.get("sub")
+    if not revocation_list.might_be_revoked(jti, user_id):
+        return False
+
+    keys = [_user_key(user_id)] + ([jti] if jti else [])
+    for row in db.query(RevokedToken).filter(RevokedToken.jti.in_(keys)):
+        if row.jti == jti:
+            return True
+        # Kullanıcı bazlı iptal: o andan önce üretilmiş tüm access token'lar geçersiz
+        if float(payload.get("iat", 0)) < _timestamp(row.revoked_at):
+            return True
+    return False
+
+
+def revoke_access_token(db: Session, jti: str, user_id: int, expires_at: datetime):
+    """
+    Revokes a single access token (logout). Commits.
+    """
+    db.add(RevokedToken(jti=jti, user_id=user_id, revoked_at=datetime.utcnow(), expires_at=expires_at))
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()  # Zaten iptal edilmiş
+    revocation_list.add(jti)
+
+
+def revoke_user_tokens(db: Session, user_id: int):
+    """
+    Revokes every refresh token of the user and every access token issued until now
+    (ban, password change, account deletion). Doesn't commit; the caller does.
+    """
+    now = datetime.utcnow()
+    db.query(RefreshToken).filter(RefreshToken.user_id == user_id, RefreshToken.revoked_at.is_(None)).update(
+        {RefreshToken.revoked_at: now}, synchronize_session=False
+    )
+
+    key = _user_key(user_id)
+    expires_at = now + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    updated = db.query(RevokedToken).filter(RevokedToken.jti == key).update(
+        {RevokedToken.revoked_at: now, RevokedToken.expires_at: expires_at}, synchronize_session=False
+    )
+    if not updated:
+        db.add(RevokedToken(jti=key, user_id=user_id, revoked_at=now, expires_at=expires_at))
+    revocation_list.add(key)
+
+
+# ------------------------ 🔄 Refresh Tokens (rotation) ------------------------ #
+
+def issue_refresh_token(db: Session, user_id: int, family_id: Optional[str] = None) -> Tuple[str, RefreshToken]:
+    """
+    Creates a refresh token. Only its hash is stored; the raw value is returned once.
+    Doesn't commit.
+    """
+    raw_token = secrets.token_urlsafe(32)
+    refresh_token = RefreshToken(
+        user_id=user_id,
+        token_hash=_hash_token(raw_token),
+        family_id=family_id or uuid.uuid4().hex,
+        issued_at=datetime.utcnow(),
+        expires_at=datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+    )
+    db.add(refresh_token)
+    db.flush()
+    return raw_token, refresh_token
+
+
+def _revoke_family(db: Session, family_id: str):
+    db.query(RefreshToken).filter(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None)).update(
+        {RefreshToken.revoked_at: datetime.utcnow()}, synchronize_session=False
+    )
+
+
+def rotate_refresh_token(db: Session, raw_token: str) -> Tuple[int, str]:
+    """
+    Exchanges a refresh token for a new one of the same family. Presenting an already
+    rotated token means it leaked, so the whole family is revoked.
+
+    Returns:
+        (int, str): The user id and the new raw refresh token.
+    """
+    invalid = HTTPException(status_code=401, detail="Invalid refresh token")
+    token = db.query(RefreshToken).filter(RefreshToken.token_hash == _hash_token(raw_token)).first()
+    if not token or token.expires_at <= datetime.utcnow():
+        raise invalid
+
+    # ✅ Koşullu güncelleme: aynı token'ı eşzamanlı iki istek kullanamaz
+    claimed = db.query(RefreshToken).filter(RefreshToken.id == token.id, RefreshToken.revoked_at.is_(None)).update(
+        {RefreshToken.revoked_at: datetime.utcnow()}, synchronize_session=False
+    )
+    if not claimed:
+        _revoke_family(db, token.family_id)  # Yeniden kullanım => çalıntı varsay
+        db.commit()
+        raise invalid
+
+    user = db.query(User.is_banned).filter(User.id == token.user_id).first()
+    if not user or user.is_banned:
+        db.commit()
+        raise HTTPException(status_code=403, detail="User is banned or no longer exists")
+
+    new_raw, new_token = issue_refresh_token(db, token.user_id, token.family_id)
+    db.query(RefreshToken).filter(RefreshToken.id == token.id).update(
+        {RefreshToken.replaced_by_id: new_token.id}, synchronize_session=False
+    )
+    db.commit()
+    return token.user_id, new_raw
+
+
+def revoke_refresh_token(db: Session, raw_token: str, user_id: int):
+    """
+    Revokes the refresh-token family of one login (logout). Commits.
+    """
+    token = db.query(RefreshToken).filter(RefreshToken.token_hash == _hash_token(raw_token), RefreshToken.user_id == user_id).first()
+    if token:
+        _revoke_family(db, token.family_id)
+        db.commit()
+
+
+# ------------------------ ⏱️ Background sync ------------------------ #
+
+def prune_expired(db: Session) -> int:
+    """
+    Deletes expired revocations and refresh tokens. Commits.
+    """
+    now = datetime.utcnow()
+    removed = db.query(RevokedToken).filter(RevokedToken.expires_at <= now).delete(synchronize_session=False)
+    removed += db.query(RefreshToken).filter(RefreshToken.expires_at <= now).delete(synchronize_session=False)
+    db.commit()
+    return removed
+
+
+def load_revocation_list():
+    """
+    Builds the in-memory filter at startup.
+    """
+    db = SessionLocal()
+    try:
+        revocation_list.rebuild(db)
+    finally:
+        db.close()
+
+
+def run_revocation_sync():
+    """
+    Picks up revocations from other processes; periodically prunes and rebuilds the filter.
+    """
+    db = SessionLocal()
+    try:
+        if revocation_list.prune_due():
+            prune_expired(db)
+            revocation_list.rebuild(db)
+        else:
+            revocation_list.sync(db)
+    finally:
+        db.close()
+
+
+# ✅ Periyodik iptal listesi senkronizasyonu (uygulama başlarken başlatılır)
+revocation_job = PeriodicJob("token-revocation-sync", REVOCATION_SYNC_INTERVAL, run_revocation_sync)
@@ -165,6 +165,8 @@ from schemas import UserBase, UserUpdate
 from utils.hashing import hash_password  # Secure password hashing
 from fastapi import HTTPException, Depends
 from utils.auth import get_current_user  # Authorization for user actions
+from utils.principal_cache import invalidate_principal
+from db import db_token
 
 # def create_user(db: Session, user_data: UserBase):
 #     """
@@ -238,6 +240,7 @@ def update_user(db: Session, user_id: int, user_update_data: UserUpdate, current
         setattr(user, key, value)
 
     db.commit()
+    invalidate_principal(user_id)
     db.refresh(user)
     return user
 
@@ -253,8 +256,10 @@ def delete_user(db: Session, user_id: int, current_user: User = Depends(get_curr
     if current_user.id != user_id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this user")
 
+    db_token.revoke_user_tokens(db, user_id)
     db.delete(user)
     db.commit()
+    invalidate_principal(user_id)
     return {"message": "User deleted successfully"}
 
 
@@ -304,6 +309,8 @@ def change_password(db: Session, user_id: int, new_password: str, current_user:
         raise HTTPException(status_code=404, detail="User not found")
 
     user.password = hash_password(new_password)
+    db_token.revoke_user_tokens(db, user_id)  # ✅ Eski oturumlar kapanır
     db.commit()
+    invalidate_principal(user_id)
 
     return {"message": "Password updated successfully"}
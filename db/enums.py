@@ -27,6 +27,19 @@ class ReviewCategory(str, Enum):
     CAR = "car"
     SERVICE = "service"
 
+# ✅ İnceleme (Review) Moderasyon Durumları
+class ReviewStatus(str, Enum):
+    PENDING = "pending"
+    PUBLISHED = "published"
+    REJECTED = "rejected"
+
+# ✅ Yorum akışı sıralama seçenekleri
+class ReviewSort(str, Enum):
+    NEWEST = "newest"
+    MOST_HELPFUL = "most_helpful"
+    HIGHEST_RATING = "highest_rating"
+    LOWEST_RATING = "lowest_rating"
+
 # ✅ İnceleme Oy Türleri (Like/Dislike)  
 # 🔹 'ReviewVoteType' yerine daha açıklayıcı olması için 'ReviewReviewVoteType' olarak değiştirildi
 class ReviewVoteType(str, Enum):
@@ -57,3 +70,31 @@ class NumberOfSeats(int, Enum):
 class RideStatus(str, Enum):
     past = "past"  
     upcoming = "upcoming"
+
+# ✅ Ekstre export formatları
+class ExportFormat(str, Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+# ✅ Admin tam metin arama kapsamları
+class SearchScope(str, Enum):
+    REVIEWS = "reviews"
+    COMPLAINTS = "complaints"
+
+# ✅ Bildirim özeti sıklığı (kullanıcı tercihi)
+class DigestFrequency(str, Enum):
+    INSTANT = "instant"  # Kısa pencerede birleştirilip hemen gönderilir
+    HOURLY = "hourly"
+    DAILY = "daily"
+
+# ✅ Birleştirilebilen bildirim konuları
+class NotificationTopic(str, Enum):
+    BOOKING_CREATED = "booking_created"
+    BOOKING_CANCELLED = "booking_cancelled"
+
+# ✅ Toplu sistem bildirimi durumu
+class BroadcastStatus(str, Enum):
+    RUNNING = "running"
+    PAUSED = "paused"
+    COMPLETED = "completed"
+    CANCELLED = "cancelled"
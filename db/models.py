@@ -1,9 +1,9 @@
-from sqlalchemy import Column, Integer, Float, String, Boolean, ForeignKey, DateTime, Text
+from sqlalchemy import Column, Integer, Float, String, Boolean, ForeignKey, DateTime, Text, UniqueConstraint, Index, and_, false
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from sqlalchemy import Enum as SQLEnum  # ✅ SQLAlchemy Enum kullanımı düzeltildi
 from db.database import Base
-from db.enums import PaymentStatus, PaymentMethod, BookingStatus, ReviewCategory, ReviewVoteType, ComplaintStatus
+from db.enums import PaymentStatus, PaymentMethod, BookingStatus, ReviewCategory, ReviewVoteType, ComplaintStatus, ReviewStatus, DigestFrequency, NotificationTopic, BroadcastStatus
 
 
 # ✅ User Model
@@ -17,12 +17,17 @@ class User(Base):
     full_name = Column(String, nullable=False)
     is_admin = Column(Boolean, default=False)
     is_banned = Column(Boolean, default=False)
+    is_accountant = Column(Boolean, default=False)  # ✅ Finans ekstrelerine erişim
+    offence_count = Column(Integer, default=0, nullable=False)  # ✅ Triajdan geçen şikayet sayısı
     wallet_balance = Column(Float, default=0.0)
     rating = Column(Float, default=0.0)
     rating_count = Column(Integer, default=0)
+    rating_sum = Column(Float, default=0.0)  # ✅ Artımlı ortalama için toplam puan
     verified_id = Column(Boolean, default=False)
     verified_email = Column(Boolean, default=False)
     agreed_terms = Column(Boolean, default=False)
+    profile_picture = Column(String, nullable=True)  # ✅ Avatar (varsayılan boyut) URL'si, bkz. utils/avatars.py
+    avatar = Column(Text, nullable=True)  # ✅ Avatar manifesti (JSON): tüm boyutların medya anahtarları
     member_since = Column(DateTime, default=func.now())
 
     rides = relationship("Ride", back_populates="driver")
@@ -31,6 +36,19 @@ class User(Base):
     reviews_written = relationship("Review", foreign_keys="[Review.reviewer_id]", back_populates="reviewer")
     reviews_received = relationship("Review", foreign_keys="[Review.reviewee_id]", back_populates="reviewee")
     payments = relationship("Payment", back_populates="user")
+    rating_breakdown = relationship("UserRatingAggregate", back_populates="user", cascade="all, delete-orphan")
+
+
+# ✅ User Rating Aggregate Model (Kategori bazlı puan toplamları)
+class UserRatingAggregate(Base):
+    __tablename__ = "user_rating_aggregates"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    review_category = Column(SQLEnum(ReviewCategory), primary_key=True)
+    rating_sum = Column(Float, default=0.0, nullable=False)
+    rating_count = Column(Integer, default=0, nullable=False)
+
+    user = relationship("User", back_populates="rating_breakdown")
 
 
 # ✅ Ride Model
@@ -86,6 +104,10 @@ class Booking(Base):
     ride = relationship("Ride", back_populates="bookings")
     passenger = relationship("User", back_populates="bookings")
 
+# ✅ Hatırlatıcılar: yaklaşan yolculuklar kalkış zamanı aralığıyla, onaylı rezervasyonlar yolculuğa göre okunur
+Index("ix_rides_departure_time", Ride.departure_time)
+Index("ix_bookings_ride_status", Booking.ride_id, Booking.status)
+
 # ✅ Payment Model
 class Payment(Base):
     __tablename__ = "payments"
@@ -107,9 +129,9 @@ class Review(Base):
     __tablename__ = "reviews"
 
     id = Column(Integer, primary_key=True, index=True)
-    ride_id = Column(Integer, ForeignKey("rides.id"), nullable=False)
-    reviewer_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    reviewee_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    ride_id = Column(Integer, ForeignKey("rides.id"), nullable=False, index=True)
+    reviewer_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    reviewee_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     review_category = Column(SQLEnum(ReviewCategory), nullable=False)
     star_rating = Column(Float, nullable=False)
     review_text = Column(Text, nullable=True)
@@ -118,14 +140,32 @@ class Review(Base):
 
     likes = Column(Integer, default=0)
     dislikes = Column(Integer, default=0)
+    helpfulness = Column(Integer, default=0, nullable=False)  # ✅ likes - dislikes (sıralama için saklanır)
     reported = Column(Boolean, default=False)
     hidden = Column(Boolean, default=False)
+    status = Column(SQLEnum(ReviewStatus), default=ReviewStatus.PUBLISHED, nullable=False)  # ✅ Moderasyon durumu
+    scored_rating = Column(Float, nullable=True)  # ✅ Sürücü skoruna katılmış puan (NULL => skora dahil değil), bkz. db/db_score.py
 
     reviewer = relationship("User", foreign_keys=[reviewer_id], back_populates="reviews_written")
     reviewee = relationship("User", foreign_keys=[reviewee_id], back_populates="reviews_received")
     votes = relationship("ReviewVote", back_populates="review", cascade="all, delete-orphan")
     responses = relationship("ReviewResponse", back_populates="review", cascade="all, delete-orphan")
 
+
+# ✅ Profil sayfası akışları için kısmi (partial) indeksler: gizli / şikayet edilmiş yorumlar indekste yok
+REVIEW_FEED_VISIBLE = and_(Review.hidden == false(), Review.reported == false())
+
+Index("ix_reviews_feed_newest", Review.reviewee_id, Review.created_at, Review.id,
+      sqlite_where=REVIEW_FEED_VISIBLE, postgresql_where=REVIEW_FEED_VISIBLE)
+Index("ix_reviews_feed_helpful", Review.reviewee_id, Review.helpfulness, Review.id,
+      sqlite_where=REVIEW_FEED_VISIBLE, postgresql_where=REVIEW_FEED_VISIBLE)
+Index("ix_reviews_feed_rating", Review.reviewee_id, Review.star_rating, Review.id,
+      sqlite_where=REVIEW_FEED_VISIBLE, postgresql_where=REVIEW_FEED_VISIBLE)
+
+# ✅ Skor işi: görünür ama henüz skora katılmamış yorumlar
+REVIEW_UNSCORED = and_(Review.scored_rating.is_(None), Review.hidden == false())
+Index("ix_reviews_unscored", Review.id, sqlite_where=REVIEW_UNSCORED, postgresql_where=REVIEW_UNSCORED)
+
 # ✅ Review Response Model
 class ReviewResponse(Base):
     __tablename__ = "review_responses"
@@ -142,6 +182,9 @@ class ReviewResponse(Base):
 # ✅ Review Vote Model
 class ReviewVote(Base):
     __tablename__ = "review_votes"
+    __table_args__ = (
+        UniqueConstraint("review_id", "voter_id", name="uq_review_votes_review_voter"),  # ✅ Kullanıcı başına tek oy
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     review_id = Column(Integer, ForeignKey("reviews.id"), nullable=False)
@@ -162,8 +205,140 @@ class Complaint(Base):
     reason = Column(Text, nullable=False)
     status = Column(SQLEnum(ComplaintStatus), default=ComplaintStatus.PENDING, nullable=False)
     created_at = Column(DateTime, default=func.now(), nullable=False)
+    priority = Column(Float, nullable=True)  # ✅ Triaj skoru (NULL => henüz triaj yapılmadı)
+    triaged_at = Column(DateTime, nullable=True)
+    counts_offence = Column(Boolean, default=False, nullable=False)  # ✅ offence_count'a katkı verdi mi (raportör başına en fazla bir)
 
     reported_user = relationship("User", foreign_keys=[reported_user_id])
     reporter_user = relationship("User", foreign_keys=[reporter_user_id])
     review = relationship("Review", foreign_keys=[review_id])
 
+
+# ✅ Admin şikayet kuyruğu: durum + öncelik sırasına göre indeks, triaj bekleyenler için kısmi indeks
+Index("ix_complaints_queue", Complaint.status, Complaint.priority, Complaint.id)
+Index("ix_complaints_untriaged", Complaint.id,
+      sqlite_where=Complaint.priority.is_(None), postgresql_where=Complaint.priority.is_(None))
+Index("ix_complaints_reporter_pair", Complaint.reporter_user_id, Complaint.reported_user_id)
+
+
+# ✅ User Score Model (Bayesian + zamanla azalan sürücü puanı, arama sıralaması için)
+class UserScore(Base):
+    __tablename__ = "user_scores"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    score = Column(Float, nullable=False, index=True)
+    decay_sum = Column(Float, default=0.0, nullable=False)  # Σ w_i * star_i  (w_i = e^{λ(t_i - t0)})
+    decay_weight = Column(Float, default=0.0, nullable=False)  # Σ w_i
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+# ✅ Score Job State (Artımlı skor işinin kaldığı yer)
+class ScoreJobState(Base):
+    __tablename__ = "score_job_state"
+
+    id = Column(Integer, primary_key=True)
+    last_review_id = Column(Integer, default=0, nullable=False)  # En son skora katılan yorum id'si (bilgi amaçlı)
+    reference_time = Column(DateTime, nullable=False)  # t0: ağırlıkların referans zamanı
+    prior_mean = Column(Float, nullable=True)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+# ✅ Score Adjustment Model (Skordan çıkarılan yorum katkıları; bir sonraki skor işi tüketir)
+class ScoreAdjustment(Base):
+    __tablename__ = "score_adjustments"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)  # Yorumu alan kullanıcı
+    review_created_at = Column(DateTime, nullable=False)  # Ağırlık w_i bundan hesaplanır
+    scored_rating = Column(Float, nullable=False)  # Skora katılmış olan puan
+    created_at = Column(DateTime, default=func.now(), nullable=False)
+
+
+# ✅ Refresh Token Model (Rotasyonlu; sadece SHA-256 hash'i saklanır)
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    token_hash = Column(String(64), unique=True, nullable=False)
+    family_id = Column(String(32), nullable=False, index=True)  # Aynı girişten türeyen token zinciri
+    issued_at = Column(DateTime, default=func.now(), nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    revoked_at = Column(DateTime, nullable=True)  # Rotasyon, çıkış veya ban ile iptal
+    replaced_by_id = Column(Integer, ForeignKey("refresh_tokens.id"), nullable=True)
+
+# ✅ Revoked Token Model (İptal edilen access token jti'leri ve kullanıcı bazlı iptaller)
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)  # Artımlı senkronizasyon için
+    jti = Column(String(64), unique=True, nullable=False)  # Token jti'si veya "user:<id>"
+    user_id = Column(Integer, nullable=True, index=True)
+    revoked_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)  # Bu tarihten sonra satır silinebilir
+
+# ✅ Ride Reminder Model (Gönderilen kalkış hatırlatmaları; tekrar / çok işlemli gönderimi engeller)
+class RideReminder(Base):
+    __tablename__ = "ride_reminders"
+    __table_args__ = (
+        UniqueConstraint("ride_id", "offset_minutes", "departure_time", name="uq_ride_reminders_ride_offset_departure"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    ride_id = Column(Integer, ForeignKey("rides.id", ondelete="CASCADE"), nullable=False)
+    offset_minutes = Column(Integer, nullable=False)  # Kalkıştan kaç dakika önce (1440, 60)
+    departure_time = Column(DateTime, nullable=False)  # Saat değişirse yeni hatırlatma gider
+    sent_at = Column(DateTime, default=func.now(), nullable=False)
+
+# ✅ Notification Preference Model (Kanal ve özet tercihleri; satır yoksa varsayılanlar geçerli)
+class NotificationPreference(Base):
+    __tablename__ = "notification_preferences"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    email_enabled = Column(Boolean, default=True, nullable=False)
+    sms_enabled = Column(Boolean, default=False, nullable=False)
+    phone_number = Column(String, nullable=True)  # SMS için
+    digest = Column(SQLEnum(DigestFrequency), default=DigestFrequency.INSTANT, nullable=False)
+    locale = Column(String(5), default="en", nullable=False)  # Bildirim dili (bkz. utils/templates.py)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+# ✅ Notification Event Model (Birleştirilmeyi / özeti bekleyen bildirimler)
+class NotificationEvent(Base):
+    __tablename__ = "notification_events"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    topic = Column(SQLEnum(NotificationTopic), nullable=False)
+    topic_key = Column(String, nullable=False)  # Aynı konu + anahtar => tek mesaj (örn. "ride:42")
+    title = Column(String, nullable=False)  # "your Friday ride Amsterdam → Utrecht"
+    line = Column(String, nullable=False)  # Tekil olay metni
+    created_at = Column(DateTime, default=func.now(), nullable=False)
+    batch_id = Column(String(32), nullable=True)  # Gönderen flush'ın sahiplenme anahtarı
+
+# ✅ Bekleyen olaylar: kullanıcı + konu bazında, gönderilmişler indekste yok
+Index("ix_notification_events_pending", NotificationEvent.user_id, NotificationEvent.topic_key, NotificationEvent.id,
+      sqlite_where=NotificationEvent.batch_id.is_(None), postgresql_where=NotificationEvent.batch_id.is_(None))
+
+# ✅ Broadcast Model (Tüm kullanıcılara sistem bildirimi; ilerleme kaydedilir, kaldığı yerden devam eder)
+class Broadcast(Base):
+    __tablename__ = "broadcasts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    created_by = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    message = Column(Text, nullable=False)
+    status = Column(SQLEnum(BroadcastStatus), default=BroadcastStatus.RUNNING, nullable=False)
+    cursor = Column(Integer, default=0, nullable=False)  # Son işlenen users.id (keyset sayfalama)
+    total = Column(Integer, default=0, nullable=False)  # Başlangıçtaki aday alıcı sayısı (yasaklılar hariç)
+    processed = Column(Integer, default=0, nullable=False)  # İşlenen kullanıcı
+    skipped = Column(Integer, default=0, nullable=False)  # Tüm kanalları kapalı olan kullanıcı
+    queued = Column(Integer, default=0, nullable=False)  # Göndericiye verilen mesaj (e-posta + SMS)
+    sent = Column(Integer, default=0, nullable=False)
+    failed = Column(Integer, default=0, nullable=False)
+    owner = Column(String(32), nullable=True)  # Yayını yürüten işlem
+    lease_until = Column(DateTime, nullable=True)  # Süresi dolarsa başka bir işlem devralır
+    created_at = Column(DateTime, default=func.now(), nullable=False)
+    finished_at = Column(DateTime, nullable=True)
+
+    @property
+    def progress(self) -> float:
+        if self.status == BroadcastStatus.COMPLETED:
+            return 1.0
+        return min(self.processed / self.total, 1.0) if self.total else 0.0
@@ -14,8 +14,10 @@
 
 import sys
 import os
+import logging
+import threading
 from dotenv import load_dotenv
-from fastapi import FastAPI, BackgroundTasks
+from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 
@@ -25,30 +27,25 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 # ✅ Load environment variables (.env)
 load_dotenv()
 
-# ✅ Retrieve environment variables (Ensure they are set)
-TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
-TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
-TWILIO_PHONE_NUMBER = os.getenv("TWILIO_PHONE_NUMBER")
-SENDGRID_API_KEY = os.getenv("SENDGRID_API_KEY")
-SENDER_EMAIL = os.getenv("SENDER_EMAIL")
+# ✅ Provider env vars (Twilio, SendGrid, Stripe) are optional: missing ones only disable
+#    that provider (degraded mode), clients are created on first use (utils/providers.py)
+from utils.providers import providers
 
-# ✅ Ensure required environment variables are set
-missing_env_vars = []
-if not TWILIO_ACCOUNT_SID: missing_env_vars.append("TWILIO_ACCOUNT_SID")
-if not TWILIO_AUTH_TOKEN: missing_env_vars.append("TWILIO_AUTH_TOKEN")
-if not SENDGRID_API_KEY: missing_env_vars.append("SENDGRID_API_KEY")
-if not SENDER_EMAIL: missing_env_vars.append("SENDER_EMAIL")
-
-if missing_env_vars:
-    raise RuntimeError(f"Missing required environment variables: {', '.join(missing_env_vars)}")
+for provider_name, provider_status in providers.status().items():
+    if provider_status.startswith("missing"):
+        logging.getLogger(__name__).warning("Provider %s disabled: %s", provider_name, provider_status)
 
 # ✅ Database Imports
 from db import models
 from db.database import engine, Base
+from db.db_search import setup_search
 
 # ✅ Initialize database (Ensure tables exist before the app starts)
 Base.metadata.create_all(engine)
 
+# ✅ Full-text search indexes (SQLite FTS5 + sync triggers)
+setup_search(engine)
+
 # ✅ FastAPI application setup
 app = FastAPI(
     title="goCARgo API",
@@ -66,8 +63,23 @@ app.add_middleware(
 )
 
 # ✅ Import & Include Routes (Ensure no duplicate imports)
-from routes import tokens, user, car, ride, booking, review, payment
+from routes import tokens, user, car, ride, booking, review, payment, admin, complaint, media
 from utils.notifications import send_email, send_system_notifications
+from utils import avatars, sentiment_analysis, moderation_queue
+from utils.vote_buffer import VOTE_BUFFER_ENABLED, vote_buffer
+from db.db_score import score_job
+from db.db_complaint import triage_job
+from db.db_token import load_revocation_list, revocation_job
+from utils.keyring import keyring
+from utils.notification_dispatcher import dispatcher
+from db.db_reminder import reminder_scheduler
+from db.db_notification import coalescer
+from utils.ride_events import ride_events
+from utils.near_duplicates import review_index_status
+from db.db_broadcast import broadcast_runner
+from db.db_media import media_gc_job
+from routes.admin import admin_required
+from utils.principal_cache import Principal
 
 app.include_router(tokens.router)  # User management
 app.include_router(user.router)  # User management
@@ -76,6 +88,87 @@ app.include_router(ride.router)  # Ride management
 app.include_router(booking.router)  # Booking & payments
 app.include_router(review.router)  # Reviews & ratings
 app.include_router(payment.router)  # Payment processing
+app.include_router(complaint.router)  # Complaints
+app.include_router(admin.router)  # Admin panel
+app.include_router(media.router)  # Content-addressed media (avatars)
+
+# ✅ Startup: Sentiment modelini arka planda önceden yükle (ilk yorum yavaş olmasın, açılış beklemesin)
+@app.on_event("startup")
+def warm_up_models():
+    threading.Thread(target=sentiment_analysis.warm_up, name="sentiment-warm-up", daemon=True).start()
+
+# ✅ Startup: Yorum moderasyon işçilerini başlat (bekleyen yorumlar tekrar kuyruğa alınır)
+@app.on_event("startup")
+def start_moderation_workers():
+    moderation_queue.start_pipeline()
+
+# ✅ Startup: Write-behind oy tamponu (VOTE_BUFFER_ENABLED=true ise)
+@app.on_event("startup")
+def start_vote_buffer():
+    if VOTE_BUFFER_ENABLED:
+        vote_buffer.start()
+
+# ✅ Startup: Sürücü skorlarını periyodik olarak artımlı güncelle
+@app.on_event("startup")
+def start_score_job():
+    score_job.start()
+
+# ✅ Startup: Şikayet triaj işçisi
+@app.on_event("startup")
+def start_triage_job():
+    triage_job.start()
+
+# ✅ Startup: JWT imza anahtarı (yoksa oluşturulur, süresi dolduysa rotasyon)
+@app.on_event("startup")
+def load_signing_keys():
+    keyring.ensure_signing_key()
+
+# ✅ Startup: Token iptal listesi (Bloom filter) + diğer işlemlerle senkronizasyon
+@app.on_event("startup")
+def start_revocation_sync():
+    load_revocation_list()
+    revocation_job.start()
+
+# ✅ Startup: Kalkış hatırlatmaları (yaklaşan onaylı rezervasyonlar zamanlayıcıya yüklenir)
+@app.on_event("startup")
+def start_reminder_scheduler():
+    reminder_scheduler.start()
+
+# ✅ Startup: Bildirim birleştirici (bekleyen olaylar / özetler yeniden planlanır)
+@app.on_event("startup")
+def start_notification_coalescer():
+    coalescer.start()
+
+# ✅ Startup: Yarım kalan toplu bildirimler (sahibi kapanmış yayınlar devralınır)
+@app.on_event("startup")
+def start_broadcast_runner():
+    broadcast_runner.start()
+
+# ✅ Startup: Yetim medya dosyalarının periyodik temizliği
+@app.on_event("startup")
+def start_media_gc_job():
+    media_gc_job.start()
+
+# ✅ Startup: Canlı koltuk bildirimleri (event loop'a bağlanır, opsiyonel Redis köprüsü)
+@app.on_event("startup")
+async def start_ride_events():
+    ride_events.start()
+
+# ✅ Shutdown: Arka plan işçilerini, process pool'u ve oy tamponunu kapat
+@app.on_event("shutdown")
+def shutdown_workers():
+    moderation_queue.stop_pipeline()
+    sentiment_analysis.shutdown_pool()
+    avatars.shutdown_pool()
+    vote_buffer.stop()
+    score_job.stop()
+    triage_job.stop()
+    revocation_job.stop()
+    reminder_scheduler.stop()
+    coalescer.stop()
+    broadcast_runner.stop()
+    media_gc_job.stop()
+    dispatcher.stop()
 
 # ✅ Health Check Endpoint
 @app.get("/health", tags=["System"])
@@ -83,16 +176,25 @@ def health_check():
     """
     🚀 Simple health-check endpoint to verify if the API is running.
     """
-    return {"status": "ok", "message": "API is running smoothly"}
+    return {"status": "ok", "message": "API is running smoothly", "providers": providers.status(), "live": ride_events.stats(), "review_index": review_index_status()}
+
+# ✅ JWKS Endpoint (Diğer node'lar token'ları gizli anahtar olmadan doğrular)
+@app.get("/.well-known/jwks.json", tags=["System"])
+def jwks():
+    """
+    🔑 Public keys of the JWT key ring (JWK Set).
+    """
+    return keyring.jwks()
 
 # ✅ Send Notifications in Background
 @app.post("/send_notifications")
-def send_notifications(background_tasks: BackgroundTasks):
+def send_notifications(admin: Principal = Depends(admin_required)):
     """
-    📩 Triggers background email & SMS notifications for users.
+    📩 Triggers background email & SMS notifications for users (Admins only).
+    Progress: GET /admin/broadcasts/{broadcast_id}
     """
-    background_tasks.add_task(send_system_notifications)
-    return {"message": "Notifications are being processed in the background"}
+    broadcast = send_system_notifications(created_by=admin.id)
+    return {"message": "Notifications are being processed in the background", "broadcast_id": broadcast.id}
 
 # ✅ Run Application
 if __name__ == "__main__":
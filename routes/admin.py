@@ -1,9 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from db.database import get_db
+from db.database import get_db, SessionLocal
+from db import db_broadcast, db_complaint, db_review, db_score, db_search, db_token
+from db.enums import BroadcastStatus, ComplaintStatus, SearchScope
 from db.models import User, Booking, Payment, Review
-from schemas import UserDisplay, ReviewDisplay, BookingDisplay, PaymentDisplay
-from typing import List
+from schemas import UserDisplay, ReviewDisplay, BookingDisplay, PaymentDisplay, SearchPage, ComplaintPage, ComplaintDisplay, BroadcastCreate, BroadcastDisplay
+from utils.auth import get_current_principal
+from utils.principal_cache import Principal, invalidate_principal
+from utils import word_filter
+from utils.keyring import keyring
+from typing import List, Optional
 
 router = APIRouter(
     prefix="/admin",
@@ -11,14 +17,14 @@ router = APIRouter(
 )
 
 # ✅ Admin Authorization - Only Admin Users Can Access
-def admin_required(user: User):
+def admin_required(user: Principal = Depends(get_current_principal)):
     if not user.is_admin:
         raise HTTPException(status_code=403, detail="You do not have admin permissions.")
     return user
 
 # ✅ 1️⃣ Get All Users
 @router.get("/users", response_model=List[UserDisplay])
-def get_all_users(db: Session = Depends(get_db), admin: User = Depends(admin_required)):
+def get_all_users(db: Session = Depends(get_db), admin: Principal = Depends(admin_required)):
     """
     Retrieve all users (Admins only).
     """
@@ -27,7 +33,7 @@ def get_all_users(db: Session = Depends(get_db), admin: User = Depends(admin_req
 
 # ✅ 2️⃣ Delete User
 @router.delete("/users/{user_id}")
-def delete_user(user_id: int, db: Session = Depends(get_db), admin: User = Depends(admin_required)):
+def delete_user(user_id: int, db: Session = Depends(get_db), admin: Principal = Depends(admin_required)):
     """
     Delete a user by ID (Admins only).
     """
@@ -35,13 +41,15 @@ def delete_user(user_id: int, db: Session = Depends(get_db), admin: User = Depen
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
+    db_token.revoke_user_tokens(db, user_id)
     db.delete(user)
     db.commit()
+    invalidate_principal(user_id)
     return {"message": "User deleted successfully"}
 
 # ✅ 3️⃣ Ban / Unban User
 @router.put("/users/{user_id}/ban")
-def ban_user(user_id: int, ban_status: bool, db: Session = Depends(get_db), admin: User = Depends(admin_required)):
+def ban_user(user_id: int, ban_status: bool, db: Session = Depends(get_db), admin: Principal = Depends(admin_required)):
     """
     Ban or Unban a user (Admins only).
     """
@@ -50,12 +58,15 @@ def ban_user(user_id: int, ban_status: bool, db: Session = Depends(get_db), admi
         raise HTTPException(status_code=404, detail="User not found")
 
     user.is_banned = ban_status
+    if ban_status:
+        db_token.revoke_user_tokens(db, user_id)  # ✅ Ban anında etkili (access + refresh token'lar)
     db.commit()
+    invalidate_principal(user_id)
     return {"message": f"User {'banned' if ban_status else 'unbanned'} successfully"}
 
 # ✅ 4️⃣ Get All Bookings
 @router.get("/bookings", response_model=List[BookingDisplay])
-def get_all_bookings(db: Session = Depends(get_db), admin: User = Depends(admin_required)):
+def get_all_bookings(db: Session = Depends(get_db), admin: Principal = Depends(admin_required)):
     """
     Retrieve all bookings (Admins only).
     """
@@ -64,7 +75,7 @@ def get_all_bookings(db: Session = Depends(get_db), admin: User = Depends(admin_
 
 # ✅ 5️⃣ Cancel a Booking
 @router.put("/bookings/{booking_id}/cancel")
-def cancel_booking(booking_id: int, db: Session = Depends(get_db), admin: User = Depends(admin_required)):
+def cancel_booking(booking_id: int, db: Session = Depends(get_db), admin: Principal = Depends(admin_required)):
     """
     Cancel a booking and issue a refund (Admins only).
     """
@@ -78,7 +89,7 @@ def cancel_booking(booking_id: int, db: Session = Depends(get_db), admin: User =
 
 # ✅ 6️⃣ Get All Reviews
 @router.get("/reviews", response_model=List[ReviewDisplay])
-def get_all_reviews(db: Session = Depends(get_db), admin: User = Depends(admin_required)):
+def get_all_reviews(db: Session = Depends(get_db), admin: Principal = Depends(admin_required)):
     """
     Retrieve all reviews (Admins only).
     """
@@ -87,14 +98,141 @@ def get_all_reviews(db: Session = Depends(get_db), admin: User = Depends(admin_r
 
 # ✅ 7️⃣ Delete a Review
 @router.delete("/reviews/{review_id}")
-def delete_review(review_id: int, db: Session = Depends(get_db), admin: User = Depends(admin_required)):
+def delete_review(review_id: int, db: Session = Depends(get_db), admin: Principal = Depends(admin_required)):
     """
     Delete a review by ID (Admins only).
     """
-    review = db.query(Review).filter(Review.id == review_id).first()
-    if not review:
-        raise HTTPException(status_code=404, detail="Review not found")
+    return db_review.delete_review(db, review_id)
 
-    db.delete(review)
-    db.commit()
-    return {"message": "Review deleted successfully"}
+# ✅ 8️⃣ Hide / Unhide a Review
+@router.put("/reviews/{review_id}/hide")
+def hide_review(review_id: int, hidden: bool = True, db: Session = Depends(get_db), admin: Principal = Depends(admin_required)):
+    """
+    Hide or publish a review again (Admins only). Hidden reviews don't count towards ratings.
+    """
+    db_review.set_review_hidden(db, review_id, hidden)
+    return {"message": f"Review {'hidden' if hidden else 'published'} successfully"}
+
+# ✅ 9️⃣ Rebuild Rating Aggregates (Backfill / Repair)
+def _rebuild_ratings_job():
+    db = SessionLocal()
+    try:
+        db_review.rebuild_user_ratings(db)
+    finally:
+        db.close()
+
+@router.post("/ratings/rebuild")
+def rebuild_ratings(background_tasks: BackgroundTasks, admin: Principal = Depends(admin_required)):
+    """
+    Recomputes every user's rating aggregates from the reviews table in the background (Admins only).
+    """
+    background_tasks.add_task(_rebuild_ratings_job)
+    return {"message": "Rating rebuild started in the background"}
+
+# ✅ 🔟 Re-moderate All Reviews (Bulk, process pool)
+def _remoderate_reviews_job():
+    db = SessionLocal()
+    try:
+        db_review.remoderate_reviews(db)
+    finally:
+        db.close()
+
+@router.post("/reviews/remoderate")
+def remoderate_reviews(background_tasks: BackgroundTasks, admin: Principal = Depends(admin_required)):
+    """
+    Re-runs sentiment moderation over all visible reviews in the background (Admins only).
+    """
+    background_tasks.add_task(_remoderate_reviews_job)
+    return {"message": "Review re-moderation started in the background"}
+
+# ✅ Reload Blocked-Word List (without waiting for the file watcher)
+@router.post("/word-filter/reload")
+def reload_word_filter(admin: Principal = Depends(admin_required)):
+    """
+    Rebuilds the blocked-word automaton from the word list file (Admins only).
+    """
+    return {"message": "Word filter reloaded", "terms": word_filter.reload_word_filter()}
+
+# ✅ Rotate JWT Signing Key
+@router.post("/keys/rotate")
+def rotate_signing_key(admin: Principal = Depends(admin_required)):
+    """
+    Creates a new JWT signing key; older keys keep verifying until they are pruned (Admins only).
+    """
+    kid = keyring.rotate()
+    keyring.prune()
+    return {"message": "Signing key rotated", "kid": kid}
+
+# ✅ Full-Text Search (Reviews & Complaints, SQLite FTS5)
+@router.get("/search", response_model=SearchPage)
+def search(
+    q: str = Query(..., min_length=1, description="Keywords"),
+    scope: SearchScope = SearchScope.REVIEWS,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    admin: Principal = Depends(admin_required)
+):
+    """
+    Ranked keyword search over review texts or complaint reasons with highlighted snippets (Admins only).
+    """
+    return db_search.search(db, q, scope, page, page_size)
+
+# ✅ Refresh Driver Scores (Bayesian + time-decayed ranking signal)
+@router.post("/scores/refresh")
+def refresh_scores(background_tasks: BackgroundTasks, full: bool = False, admin: Principal = Depends(admin_required)):
+    """
+    Recomputes driver ranking scores in the background; `full=true` rebuilds from the first review (Admins only).
+    """
+    background_tasks.add_task(db_score.run_score_job, full)
+    return {"message": "Score refresh started in the background"}
+
+# ✅ Complaint Queue (Priority-ordered, paginated)
+@router.get("/complaints", response_model=ComplaintPage)
+def get_complaint_queue(
+    status: ComplaintStatus = ComplaintStatus.PENDING,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+    admin: Principal = Depends(admin_required)
+):
+    """
+    Triaged complaints, highest priority first (Admins only). Pass `next_cursor` to continue.
+    """
+    return db_complaint.get_complaint_queue(db, status, limit, cursor)
+
+# ✅ Resolve / Dismiss a Complaint
+@router.put("/complaints/{complaint_id}", response_model=ComplaintDisplay)
+def update_complaint(complaint_id: int, status: ComplaintStatus, db: Session = Depends(get_db), admin: Principal = Depends(admin_required)):
+    """
+    Resolve or dismiss a complaint (Admins only). Dismissing takes the offence back.
+    """
+    return db_complaint.update_complaint_status(db, complaint_id, status)
+
+# ✅ Toplu Sistem Bildirimi (Broadcast)
+@router.post("/broadcasts", response_model=BroadcastDisplay)
+def create_broadcast(request: BroadcastCreate, db: Session = Depends(get_db), admin: Principal = Depends(admin_required)):
+    """
+    Sends a system notification to every user that isn't banned, over the channels
+    each user enabled (Admins only). Sending runs in the background.
+    """
+    return db_broadcast.create_broadcast(db, request.message, admin.id)
+
+@router.get("/broadcasts/{broadcast_id}", response_model=BroadcastDisplay)
+def get_broadcast(broadcast_id: int, db: Session = Depends(get_db), admin: Principal = Depends(admin_required)):
+    """
+    Progress of a broadcast (Admins only).
+    """
+    return db_broadcast.get_broadcast(db, broadcast_id)
+
+@router.post("/broadcasts/{broadcast_id}/pause", response_model=BroadcastDisplay)
+def pause_broadcast(broadcast_id: int, db: Session = Depends(get_db), admin: Principal = Depends(admin_required)):
+    return db_broadcast.set_broadcast_status(db, broadcast_id, BroadcastStatus.PAUSED)
+
+@router.post("/broadcasts/{broadcast_id}/resume", response_model=BroadcastDisplay)
+def resume_broadcast(broadcast_id: int, db: Session = Depends(get_db), admin: Principal = Depends(admin_required)):
+    return db_broadcast.set_broadcast_status(db, broadcast_id, BroadcastStatus.RUNNING)
+
+@router.post("/broadcasts/{broadcast_id}/cancel", response_model=BroadcastDisplay)
+def cancel_broadcast(broadcast_id: int, db: Session = Depends(get_db), admin: Principal = Depends(admin_required)):
+    return db_broadcast.set_broadcast_status(db, broadcast_id, BroadcastStatus.CANCELLED)
@@ -565,7 +565,11 @@ from db.database import get_db
 from db.models import User, Ride, Booking, Payment
 from db.enums import PaymentMethod
 from utils.auth import get_current_user  # ✅ Kullanıcı kimliği doğrulama fonksiyonunu içe aktar
-from utils.notifications import send_notifications
+from utils.notifications import send_notification, send_notifications
+from db.db_reminder import reminder_scheduler
+from db.db_notification import notify_ride_driver
+from utils.ride_events import publish_ride
+from db.enums import NotificationTopic
 from datetime import datetime, timedelta
 from db.enums import PaymentMethod
 
@@ -622,6 +626,9 @@ def book_ride(
     )
     db.add(booking)
     db.commit()
+    publish_ride(ride)  # ✅ Canlı koltuk sayısı (SSE / WebSocket aboneleri)
+    reminder_scheduler.schedule_ride(ride.id, ride.departure_time)  # ✅ 24s / 1s kalkış hatırlatmaları
+    notify_ride_driver(db, ride, NotificationTopic.BOOKING_CREATED, f"{current_user.full_name} booked {seats_booked} seat(s)")  # ✅ Sürücüye birleştirilmiş bildirim
 
     # ✅ Arka planda SMS & E-posta bildirimi gönder
     background_tasks.add_task(send_notifications, current_user.phone, current_user.email)
@@ -660,6 +667,9 @@ def offline_booking(
     )
     db.add(booking)
     db.commit()
+    publish_ride(ride)
+    reminder_scheduler.schedule_ride(ride.id, ride.departure_time)
+    notify_ride_driver(db, ride, NotificationTopic.BOOKING_CREATED, f"{seats_booked} seat(s) booked by phone")
 
     # ✅ SMS bildirimi gönder
     background_tasks.add_task(send_notifications, phone_number, None)
@@ -703,11 +713,15 @@ def cancel_booking(booking_id: int, db: Session = Depends(get_db), current_user:
     elif payment.payment_method == PaymentMethod.CREDIT_CARD.value:
         db_payment.refund_payment(db, payment.id)
     elif payment.payment_method in [PaymentMethod.IDEAL.value, PaymentMethod.PAYPAL.value]:
-        send_notifications(current_user.id, "Your refund is being processed.")
+        send_notification(current_user.id, "Your refund is being processed.")
 
     booking.status = "cancelled"
     booking.refund_amount = refund_amount
+    ride.available_seats += booking.seats_booked  # ✅ Koltuklar yeniden satışa açılır
     db.commit()
+    publish_ride(ride)
+    reminder_scheduler.refresh_ride(db, booking.ride_id)  # Son onaylı rezervasyonsa hatırlatmalar kalkar
+    notify_ride_driver(db, ride, NotificationTopic.BOOKING_CANCELLED, f"{current_user.full_name} cancelled {booking.seats_booked} seat(s)")
 
     return {"message": "Booking cancelled", "refund": refund_amount}
 
@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends, status
+from sqlalchemy.orm import Session
+from db.database import get_db
+from db import db_complaint
+from db.models import User
+from schemas import ComplaintCreate, ComplaintDisplay
+from utils.auth import get_current_user
+from utils.rate_limit import limit_complaints
+
+router = APIRouter(
+    prefix="/complaints",
+    tags=["Complaints"]
+)
+
+# 📌 Şikayet oluşturma (Triaj ve otomatik aksiyonlar arka planda)
+@router.post("/", response_model=ComplaintDisplay, status_code=status.HTTP_201_CREATED, dependencies=[Depends(limit_complaints)])
+def create_complaint(
+    complaint: ComplaintCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Files a complaint against a user (optionally about one of their reviews).
+    The triage worker scores it and may hide the review or ban the user automatically.
+    - One open complaint per reported user / review, throttled per reporter (429)
+    """
+    return db_complaint.create_complaint(db, current_user, complaint)
@@ -0,0 +1,41 @@
+import os
+
+import anyio
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import FileResponse
+from utils import media
+
+router = APIRouter(
+    prefix=media.MEDIA_URL_PREFIX,
+    tags=["Media"]
+)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags  # Weak karşılaştırma (RFC 9110)
+
+
+# 📌 İçerik adresli medya (avatarlar, araç görselleri)
+@router.api_route("/{key}", methods=["GET", "HEAD"])
+async def get_media(key: str, request: Request):
+    """
+    Serves a stored file by its content key.
+    - The URL never changes content: strong ETag (the hash) + `Cache-Control: immutable`
+    - `If-None-Match` => 304, `Range` / `If-Range` => 206 partial content
+    - Zero-copy `sendfile` when the ASGI server supports the pathsend extension
+    """
+    match = media.parse_key(key)
+    if not match:
+        raise HTTPException(status_code=404, detail="Media not found")
+    path = media.path_for(key)
+    try:
+        stat_result = await anyio.to_thread.run_sync(os.stat, path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Media not found")
+
+    headers = {"ETag": f'"{match.group(1)}"', "Cache-Control": media.MEDIA_CACHE_CONTROL}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, headers=headers, media_type=media.CONTENT_TYPES[match.group(2)], stat_result=stat_result)
@@ -64,23 +64,28 @@
 #     return payment
 
 
-import stripe
-from fastapi import APIRouter, Depends, HTTPException, Form
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Form, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from db.database import get_db
+from db.database import get_db, SessionLocal
 from db import db_payment
+from db.enums import ExportFormat
 from db.models import User, PaymentStatus
 from schemas import PaymentCreate, PaymentDisplay, PaymentRequest
-from utils.auth import get_current_user
-from utils.notifications import send_payment_receipt, send_system_notifications
+from utils.auth import get_current_user, get_current_principal
+from utils.principal_cache import Principal
+from utils.exports import EXPORT_MEDIA_TYPES, GZIP_MEDIA_TYPE, build_export_stream
+from utils.notifications import send_notification, send_payment_receipt
+from utils.providers import providers
 
 router = APIRouter(
     prefix="/payments",
     tags=["Payments"]
 )
 
-# ✅ Stripe API Anahtarı
-stripe.api_key = "STRIPE_SECRET_KEY"
+# ✅ Stripe istemcisi ilk kart ödemesinde kurulur (STRIPE_SECRET_KEY, bkz. utils/providers.py)
 
 # ✅ Desteklenen ödeme yöntemleri (Dropdown için)
 SUPPORTED_PAYMENT_METHODS = ["wallet", "credit_card", "ideal", "paypal"]
@@ -120,6 +125,7 @@ def make_payment(
     elif payment_method == "credit_card":
         if not token:
             raise HTTPException(status_code=400, detail="Credit card token required for this payment method")
+        stripe = providers.get("stripe")
         try:
             charge = stripe.Charge.create(
                 amount=int(amount * 100),  # Stripe, kuruş bazında çalışır
@@ -136,18 +142,90 @@ def make_payment(
     # ✅ iDEAL ile ödeme
     elif payment_method == "ideal":
         payment = db_payment.create_payment(db, user_id=current_user.id, ride_id=ride_id, amount=amount, status="pending")
-        send_system_notifications(current_user.id, "Your iDEAL payment is being processed.")
+        send_notification(current_user.id, "Your iDEAL payment is being processed.")
         return {"message": "iDEAL payment initiated", "payment_id": payment.id}
 
     # ✅ PayPal ile ödeme
     elif payment_method == "paypal":
         payment = db_payment.create_payment(db, user_id=current_user.id, ride_id=ride_id, amount=amount, status="pending")
-        send_system_notifications(current_user.id, "Your PayPal payment is being processed.")
+        send_notification(current_user.id, "Your PayPal payment is being processed.")
         return {"message": "PayPal payment initiated", "payment_id": payment.id}
 
     else:
         raise HTTPException(status_code=400, detail="Unsupported payment method")
 
+# ✅ Finans yetkisi (Sadece admin ve muhasebeciler ekstre alabilir)
+def finance_required(current_user: Principal = Depends(get_current_principal)) -> Principal:
+    if not (current_user.is_admin or current_user.is_accountant):
+        raise HTTPException(status_code=403, detail="Only admins and accountants can export statements.")
+    return current_user
+
+def _statement_response(
+    user_id: Optional[int],
+    start_date: Optional[date],
+    end_date: Optional[date],
+    export_format: ExportFormat,
+    gzip: bool,
+) -> StreamingResponse:
+    """
+    Builds a streaming statement response. The generator owns its own DB session so the
+    cursor stays open while the body is being sent.
+    """
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date must be before end_date")
+
+    start = datetime.combine(start_date, time.min) if start_date else None
+    end = datetime.combine(end_date + timedelta(days=1), time.min) if end_date else None  # bitiş günü dahil
+
+    def rows():
+        db = SessionLocal()
+        try:
+            yield from db_payment.iter_payments(db, user_id=user_id, start=start, end=end)
+        finally:
+            db.close()
+
+    scope = f"user_{user_id}" if user_id is not None else "all"
+    period = f"{start_date or 'begin'}_{end_date or 'now'}"
+    filename = f"statement_{scope}_{period}.{export_format.value}" + (".gz" if gzip else "")
+
+    # ✅ gzip=true => sıkıştırılmış dosyanın kendisi: Content-Encoding olsaydı istemci açar, .gz adıyla düz metin kaydederdi
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+
+    return StreamingResponse(
+        build_export_stream(rows(), db_payment.STATEMENT_COLUMNS, export_format.value, gzip=gzip),
+        media_type=GZIP_MEDIA_TYPE if gzip else EXPORT_MEDIA_TYPES[export_format.value],
+        headers=headers,
+    )
+
+# ✅ Tüm kullanıcılar için tarih aralığına göre ekstre (CSV / NDJSON, stream)
+@router.get("/statements")
+def export_statements(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    export_format: ExportFormat = Query(ExportFormat.CSV, alias="format"),
+    gzip: bool = False,
+    current_user: Principal = Depends(finance_required)
+):
+    """
+    Streams the payment statement of all users for the given date range (admins & accountants).
+    """
+    return _statement_response(None, start_date, end_date, export_format, gzip)
+
+# ✅ Tek kullanıcı için ekstre (CSV / NDJSON, stream)
+@router.get("/{user_id}/statement")
+def export_user_statement(
+    user_id: int,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    export_format: ExportFormat = Query(ExportFormat.CSV, alias="format"),
+    gzip: bool = False,
+    current_user: Principal = Depends(finance_required)
+):
+    """
+    Streams the payment statement of a single user for the given date range (admins & accountants).
+    """
+    return _statement_response(user_id, start_date, end_date, export_format, gzip)
+
 # ✅ Kullanıcının ödeme geçmişini getir
 @router.get("/{user_id}", response_model=list[PaymentDisplay])
 def get_user_payments(user_id: int, db: Session = Depends(get_db)):
@@ -186,6 +264,7 @@ def refund_payment(payment_id: int, db: Session = Depends(get_db), current_user:
 
     # ✅ Stripe (Kredi Kartı) üzerinden ödeme iadesi
     elif payment.payment_method == "credit_card":
+        stripe = providers.get("stripe")
         try:
             stripe.Refund.create(charge=payment.charge_id)
         except stripe.error.StripeError:
@@ -193,7 +272,7 @@ def refund_payment(payment_id: int, db: Session = Depends(get_db), current_user:
 
     # ✅ iDEAL ve PayPal ödemelerinde iade
     elif payment.payment_method in ["ideal", "paypal"]:
-        send_system_notifications(payment.user_id, "Your refund is being processed.")
+        send_notification(payment.user_id, "Your refund is being processed.")
 
     # ✅ Ödeme durumu güncelleme
     payment = db_payment.update_payment_status(db, payment.id, "refunded")
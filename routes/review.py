@@ -1,13 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from db.database import get_db
+from db import db_review
 from db.models import Review, ReviewVote, User, Ride, ReviewResponse  
-from schemas import ReviewCreate, ReviewDisplay, ReviewVoteCreate, ReviewResponseCreate
-from utils.notifications import moderate_text  # ✅ AI-based text moderation
+from schemas import ReviewCreate, ReviewDisplay, ReviewPage, ReviewVoteCreate, ReviewResponseCreate, UserRatingDisplay
 from utils.notifications import send_system_notifications
 from typing import List, Optional
 from utils.notifications import send_email
-from utils.sentiment_analysis import moderate_text
+from utils.moderation_queue import enqueue_review
+from db.enums import ReviewStatus, ReviewSort
 
 
 
@@ -20,10 +21,11 @@ router = APIRouter(
 )
 
 # 📌 Yorum oluşturma (Sadece ilgili yolculuğa katılan kullanıcılar yorum yapabilir)
-@router.post("/", response_model=ReviewDisplay)
+@router.post("/", response_model=ReviewDisplay, status_code=status.HTTP_202_ACCEPTED)
 def create_review(review: ReviewCreate, db: Session = Depends(get_db)):
     """
     Allows passengers to leave reviews about the ride, driver, or service.
+    The review is stored as `pending` and published (or rejected) by the moderation workers.
     """
 
     # ✅ Yolculuk ve kullanıcı kontrolü
@@ -43,11 +45,7 @@ def create_review(review: ReviewCreate, db: Session = Depends(get_db)):
     if not booking_exists:
         raise HTTPException(status_code=403, detail="You can only review people from your ride.")
 
-    # ✅ Spam veya kötüye kullanım içeren yorumları engelle
-    if moderate_text(review.review_text):
-        raise HTTPException(status_code=400, detail="Your review contains inappropriate content.")
-
-    # ✅ Yeni yorumu veritabanına ekle
+    # ✅ Yeni yorumu "pending" olarak ekle (moderasyon kuyruğu yayınlar veya reddeder)
     new_review = Review(
         ride_id=review.ride_id,
         reviewer_id=review.reviewer_id,
@@ -55,49 +53,45 @@ def create_review(review: ReviewCreate, db: Session = Depends(get_db)):
         review_category=review.review_category,
         star_rating=review.star_rating,
         review_text=review.review_text,
-        anonymous_review=review.anonymous_review
+        anonymous_review=review.anonymous_review,
+        status=ReviewStatus.PENDING,
+        hidden=True  # Yayınlanana kadar görünmez ve ortalamaya dahil değil
     )
 
     db.add(new_review)
     db.commit()
     db.refresh(new_review)
 
-    # ✅ Ortalama puanı güncelle
-    reviews = db.query(Review).filter(Review.reviewee_id == review.reviewee_id).all()
-    total_score = sum(r.star_rating for r in reviews)
-    average_rating = total_score / len(reviews)
-    reviewee.rating = round(average_rating, 2)  # Kullanıcının ortalama puanını güncelle
-
-    db.commit()
+    # ✅ Moderasyon (sentiment, kelime filtresi, kopya kontrolü) arka planda; ortalama yayınlanınca güncellenir
+    enqueue_review(new_review.id)
 
     return new_review
 
-# 📌 Yorumları listeleme (Filtrelenebilir)
-@router.get("/", response_model=List[ReviewDisplay])
+# 📌 Yorumları listeleme (Filtrelenebilir, sıralanabilir, sayfalı)
+@router.get("/", response_model=ReviewPage)
 def get_reviews(
     ride_id: Optional[int] = None,
     reviewee_id: Optional[int] = None,
     reviewer_id: Optional[int] = None,
+    sort: ReviewSort = ReviewSort.NEWEST,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     """
-    Retrieves reviews based on optional filters (ride, reviewer, or reviewee).
+    Retrieves visible reviews based on optional filters (ride, reviewer, or reviewee).
+    - **sort**: newest, most_helpful, highest_rating, lowest_rating
+    - **cursor**: pass `next_cursor` of the previous page to continue
     """
-    query = db.query(Review)
-
-    if ride_id:
-        query = query.filter(Review.ride_id == ride_id)
-    if reviewee_id:
-        query = query.filter(Review.reviewee_id == reviewee_id)
-    if reviewer_id:
-        query = query.filter(Review.reviewer_id == reviewer_id)
-
-    reviews = query.all()
+    return db_review.get_review_feed(db, ride_id, reviewee_id, reviewer_id, sort, limit, cursor)
 
-    if not reviews:
-        raise HTTPException(status_code=404, detail="No reviews found.")
-
-    return reviews
+# 📌 Kullanıcının puan özeti (Genel + kategori bazlı)
+@router.get("/ratings/{user_id}", response_model=UserRatingDisplay)
+def get_user_rating(user_id: int, db: Session = Depends(get_db)):
+    """
+    Returns the precomputed rating of a user with a per-category breakdown.
+    """
+    return db_review.get_user_rating(db, user_id)
 
 # 📌 Yorum güncelleme (Sadece yorumu yazan kişi değiştirebilir)
 @router.put("/{review_id}", response_model=ReviewDisplay)
@@ -114,6 +108,9 @@ def update_review(review_id: int, updated_review: ReviewCreate, db: Session = De
     if updated_review.reviewer_id != review.reviewer_id:
         raise HTTPException(status_code=403, detail="You can only edit your own review.")
 
+    # ✅ Puan değiştiyse sadece farkı ortalamaya yansıt
+    db_review.change_review_rating(db, review, updated_review.star_rating)
+
     review.star_rating = updated_review.star_rating
     review.review_text = updated_review.review_text
     review.anonymous_review = updated_review.anonymous_review
@@ -137,11 +134,10 @@ def delete_review(review_id: int, user_id: int, db: Session = Depends(get_db)):
     # ✅ Yalnızca yorumu yazan kişi veya admin silebilir
     user = db.query(User).filter(User.id == user_id).first()
 
-    if not user or (user.id != review.reviewer_id and user.role != "admin"):
+    if not user or (user.id != review.reviewer_id and not user.is_admin):
         raise HTTPException(status_code=403, detail="You don't have permission to delete this review.")
 
-    db.delete(review)
-    db.commit()
+    db_review.delete_review(db, review_id)  # Puan, skor ve near-duplicate indeksinden de çıkarır
 
     return {"message": "Review deleted successfully."}
 
@@ -151,39 +147,13 @@ def vote_review(vote: ReviewVoteCreate, db: Session = Depends(get_db)):
     """
     Allows users to like or dislike a review.
     """
-    review = db.query(Review).filter(Review.id == vote.review_id).first()
-    user = db.query(User).filter(User.id == vote.voter_id).first()
+    user = db.query(User.id).filter(User.id == vote.voter_id).first()
 
-    if not review or not user:
+    if not user:
         raise HTTPException(status_code=404, detail="Review or user not found.")
 
-    # ✅ Kullanıcı zaten oy vermiş mi kontrol et
-    existing_vote = db.query(ReviewVote).filter(
-        ReviewVote.review_id == vote.review_id,
-        ReviewVote.voter_id == vote.voter_id
-    ).first()
-
-    if existing_vote:
-        raise HTTPException(status_code=400, detail="You have already voted on this review.")
-
-    # ✅ Yeni oy ekle
-    new_vote = ReviewVote(
-        review_id=vote.review_id,
-        voter_id=vote.voter_id,
-        vote_type=vote.vote_type
-    )
-
-    db.add(new_vote)
-    
-    # ✅ Beğeni/Beğenmeme sayısını güncelle
-    if vote.vote_type == "like":
-        review.likes += 1
-    elif vote.vote_type == "dislike":
-        review.dislikes += 1
-
-    db.commit()
-
-    return {"message": "Vote recorded successfully."}
+    # ✅ Tekrar oy kontrolü unique constraint ile, sayaçlar SQL tarafında (veya tamponda) artırılır
+    return db_review.vote_review(db, vote.review_id, vote.voter_id, vote.vote_type)
 
 # 📌 Yorumlara yanıt verme
 @router.post("/{review_id}/response")
@@ -1,12 +1,20 @@
+import asyncio
+import json
 from enum import Enum
 from typing import Optional
 from sqlalchemy.orm import Session            
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from datetime import date
 from db import db_ride
-from db.database import get_db
+from db.database import SessionLocal, get_db
 from db.enums import NumberOfSeats, RideStatus
+from db.models import Ride
 from schemas import RideBase, RideDisplay
+from utils.ride_events import (
+    RIDE_EVENTS_HEARTBEAT, RIDE_EVENTS_MAX_TOPICS, RIDE_EVENTS_SEND_TIMEOUT, ride_events, ride_snapshot,
+)
 
 
 router = APIRouter(
@@ -61,3 +69,116 @@ def update_ride(id: int, request: RideBase, db: Session=Depends(get_db)):
 def delete_ride(driver_id: int, id: int, db: Session = Depends(get_db)):
     return db_ride.delete_ride(db, driver_id, id)
 
+
+# ------------------------ 📡 Live seat availability ------------------------ #
+
+def _load_snapshots(ride_ids: list[int]) -> dict:
+    db = SessionLocal()
+    try:
+        return {ride.id: ride_snapshot(ride) for ride in db.query(Ride).filter(Ride.id.in_(ride_ids))}
+    finally:
+        db.close()
+
+
+def _ride_exists(ride_id: int) -> bool:
+    db = SessionLocal()
+    try:
+        return db.query(Ride.id).filter(Ride.id == ride_id).first() is not None
+    finally:
+        db.close()
+
+
+# ✅ Server-Sent Events: tek yolculuğun koltuk / durum değişiklikleri
+@router.get('/{id}/events')
+async def ride_events_stream(id: int):
+    """
+    Streams `available_seats` / status changes of a ride. The current state is sent
+    first; a slow client only receives the latest state (no unbounded buffering).
+    """
+    ride_events.check_capacity()
+    if not await run_in_threadpool(_ride_exists, id):
+        raise HTTPException(status_code=404, detail="Ride not found")
+
+    async def stream():
+        # ✅ Abonelik üreteç içinde açılır: istemci akış başlamadan koparsa abone sızmaz
+        try:
+            subscription = ride_events.open()
+        except HTTPException:
+            return  # Kontrolden sonra kapasite doldu
+        try:
+            ride_events.subscribe(subscription, id)
+            snapshot = (await run_in_threadpool(_load_snapshots, [id])).get(id)  # Abonelikten sonra: arada olay kaçmaz
+            if snapshot is not None:
+                data = json.dumps(snapshot, default=str, separators=(",", ":"))
+                subscription.offer(id, (data, f"event: ride\ndata: {data}\n\n"), replace=False)  # Arada gelen olay daha yeni
+            while True:
+                messages = await subscription.next(RIDE_EVENTS_HEARTBEAT)
+                if not messages:
+                    yield ": heartbeat\n\n"
+                for _, frame in messages:
+                    yield frame
+        finally:
+            ride_events.close(subscription)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},  # Nginx tamponlamasın
+    )
+
+
+# ✅ WebSocket: tek bağlantıda birden fazla yolculuk
+@router.websocket('/ws')
+async def ride_events_socket(websocket: WebSocket):
+    """
+    Client messages: {"subscribe": [ride ids]} / {"unsubscribe": [ride ids]}.
+    Server messages: ride snapshots ({"type": "ride", ...}) and {"type": "heartbeat"}.
+    Clients that can't take a message within RIDE_EVENTS_SEND_TIMEOUT are disconnected.
+    """
+    subscription = ride_events.open()
+    await websocket.accept()
+
+    async def send(text: str):
+        await asyncio.wait_for(websocket.send_text(text), RIDE_EVENTS_SEND_TIMEOUT)
+
+    async def writer():
+        while True:
+            messages = await subscription.next(RIDE_EVENTS_HEARTBEAT)
+            if not messages:
+                await send('{"type":"heartbeat"}')
+            for data, _ in messages:
+                await send(data)
+
+    writer_task = asyncio.create_task(writer())
+    try:
+        while True:
+            reader = asyncio.create_task(websocket.receive_json())
+            done, _ = await asyncio.wait({reader, writer_task}, return_when=asyncio.FIRST_COMPLETED)
+            if writer_task in done:
+                reader.cancel()
+                writer_task.result()  # Yavaş istemci: zaman aşımı bağlantıyı kapatır
+            message = reader.result()
+
+            for ride_id in message.get("unsubscribe", []):
+                ride_events.unsubscribe(subscription, int(ride_id))
+            new_ids = [int(ride_id) for ride_id in message.get("subscribe", []) if int(ride_id) not in subscription.topics]
+            if len(subscription.topics) + len(new_ids) > RIDE_EVENTS_MAX_TOPICS:
+                await send(json.dumps({"type": "error", "detail": f"At most {RIDE_EVENTS_MAX_TOPICS} rides per connection"}))
+                continue
+            for ride_id in new_ids:
+                ride_events.subscribe(subscription, ride_id)
+            snapshots = await run_in_threadpool(_load_snapshots, new_ids) if new_ids else {}
+            for ride_id in new_ids:  # Abonelikten hemen sonra mevcut durum
+                if ride_id in snapshots:
+                    data = json.dumps(snapshots[ride_id], default=str, separators=(",", ":"))
+                    subscription.offer(ride_id, (data, ""), replace=False)  # Arada gelen olay daha yeni
+                else:
+                    ride_events.unsubscribe(subscription, ride_id)
+                    await send(json.dumps({"type": "error", "ride_id": ride_id, "detail": "Ride not found"}))
+    except (WebSocketDisconnect, asyncio.TimeoutError, RuntimeError):
+        pass
+    except (ValueError, TypeError, AttributeError):
+        await websocket.close(code=1003)  # Anlaşılmayan mesaj
+    finally:
+        writer_task.cancel()
+        ride_events.close(subscription)
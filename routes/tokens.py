@@ -2,8 +2,14 @@ from fastapi import APIRouter, Depends, HTTPException, status, Form, UploadFile,
 from sqlalchemy.orm import Session
 from db.database import get_db
 from db.models import User
-from schemas import UserDisplay, UserUpdate, UserDeleteResponse
-from utils.auth import hash_password, verify_password, create_access_token, get_current_user
+from db import db_token
+from schemas import UserDisplay, UserUpdate, UserDeleteResponse, TokenResponse, RefreshTokenRequest, LogoutRequest
+from datetime import datetime
+from fastapi.concurrency import run_in_threadpool
+from typing import Optional
+from utils.auth import hash_password, verify_password, create_access_token, get_current_user, decode_access_token, oauth2_scheme, ACCESS_TOKEN_EXPIRE_MINUTES
+from utils.hashing import verify_and_update_async
+from utils.rate_limit import limit_login
 from utils.notifications import send_email
 import shutil
 import os
@@ -14,19 +20,78 @@ router = APIRouter(
 )
 
 # ----------------------- 📌 User Token (JWT Authentication) ----------------------- #
-@router.post("/")
-def token(
+def _find_user(db: Session, username: str) -> Optional[User]:
+    return db.query(User).filter(User.username == username).first()
+
+def _save_password_hash(db: Session, user: User, new_hash: str):
+    user.password = new_hash
+    db.commit()
+
+def _issue_tokens(db: Session, user_id: int, refresh_token: Optional[str] = None) -> TokenResponse:
+    """
+    Returns a new access token plus a refresh token (a fresh family unless one is given).
+    """
+    if refresh_token is None:
+        refresh_token, _ = db_token.issue_refresh_token(db, user_id)
+        db.commit()
+    return TokenResponse(
+        access_token=create_access_token(user_id),
+        refresh_token=refresh_token,
+        expires_in=ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    )
+
+@router.post("/", response_model=TokenResponse, dependencies=[Depends(limit_login)])
+async def token(
     username: str = Form(...), 
     password: str = Form(...), 
     db: Session = Depends(get_db)
 ):
     """
-    **User logs in and receives a JWT token.**
+    **User logs in and receives a JWT access token and a refresh token.**
+    - Throttled per IP and per username (429 + Retry-After) before any DB or bcrypt work.
+    - bcrypt runs on the dedicated hashing pool, so the event loop and request workers stay free.
+    - Hashes created with outdated parameters (e.g. BCRYPT_ROUNDS changed) are upgraded transparently.
     """
-    db_user = db.query(User).filter(User.username == username).first()
-    if not db_user or not verify_password(password, db_user.password):
+    db_user = await run_in_threadpool(_find_user, db, username)
+    if not db_user:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+
+    valid, new_hash = await verify_and_update_async(password, db_user.password)
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
-    access_token = create_access_token(db_user.id)
-    return {"access_token": access_token, "token_type": "bearer"}
+    if db_user.is_banned:
+        raise HTTPException(status_code=403, detail="User is banned")
+
+    # ✅ Rehash-on-login
+    if new_hash:
+        await run_in_threadpool(_save_password_hash, db, db_user, new_hash)
 
+    return await run_in_threadpool(_issue_tokens, db, db_user.id)
+
+# ----------------------- 📌 Refresh (Rotation) ----------------------- #
+@router.post("/refresh", response_model=TokenResponse)
+def refresh(request: RefreshTokenRequest, db: Session = Depends(get_db)):
+    """
+    **Exchanges a refresh token for a new access token and a new refresh token.**
+    - Every refresh token can be used once; reusing an old one revokes the whole login.
+    """
+    user_id, new_refresh_token = db_token.rotate_refresh_token(db, request.refresh_token)
+    return _issue_tokens(db, user_id, new_refresh_token)
+
+# ----------------------- 📌 Logout ----------------------- #
+@router.post("/logout")
+def logout(
+    request: Optional[LogoutRequest] = None,
+    db: Session = Depends(get_db),
+    token: str = Depends(oauth2_scheme)
+):
+    """
+    **Revokes the current access token (and the refresh token, if given) immediately.**
+    """
+    payload = decode_access_token(token, db)
+    if payload.get("jti"):
+        db_token.revoke_access_token(db, payload["jti"], payload["sub"], datetime.utcfromtimestamp(payload["exp"]))
+    if request and request.refresh_token:
+        db_token.revoke_refresh_token(db, request.refresh_token, payload["sub"])
+    return {"message": "Logged out successfully"}
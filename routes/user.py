@@ -1,12 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Form, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, Form, Request
 from sqlalchemy.orm import Session
 from db.database import get_db
 from db.models import User
-from schemas import UserDisplay, UserUpdate, UserDeleteResponse, UserBase
+from db import db_token
+from schemas import UserDisplay, UserUpdate, UserDeleteResponse, UserBase, NotificationPreferenceDisplay, NotificationPreferenceUpdate
+from db import db_notification
 from utils.auth import hash_password, verify_password, create_access_token, get_current_user
+from fastapi.concurrency import run_in_threadpool
+from utils.hashing import hash_password_async
+from utils.rate_limit import limit_registration
 from utils.notifications import send_email
-import shutil
-import os
+from utils.principal_cache import invalidate_principal
+from utils import avatars
 
 router = APIRouter(
     prefix="/users",
@@ -14,26 +19,35 @@ router = APIRouter(
 )
 
 # ----------------------- 📌 User Registration (Form + JWT) ----------------------- #
-@router.post("/register", response_model=UserDisplay)
-def register_user(
+def _find_existing_user(db: Session, username: str, email: str):
+    return db.query(User).filter(
+        (User.username == username) | (User.email == email)
+    ).first()
+
+def _save_new_user(db: Session, user: User):
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+
+@router.post("/register", response_model=UserDisplay, dependencies=[Depends(limit_registration)])
+async def register_user(
     request: UserBase,
     db: Session = Depends(get_db)
     ):
     """
     **Creates a new user registration and returns a JWT access token.**
-    - Password is hashed using bcrypt.
+    - Password is hashed using bcrypt (on the hashing pool, off the event loop).
+    - Throttled per IP (429 + Retry-After).
     """
 
     # ✅ Check if username or email is already registered
-    existing_user = db.query(User).filter(
-        (User.username == request.username) | (User.email == request.email)
-    ).first()
+    existing_user = await run_in_threadpool(_find_existing_user, db, request.username, request.email)
 
     if existing_user:
         raise HTTPException(status_code=400, detail="Username or Email already registered")
 
     # ✅ Hash the password
-    hashed_pw = hash_password(request.password)
+    hashed_pw = await hash_password_async(request.password)
 
     new_user = User(
         username=request.username,
@@ -43,9 +57,7 @@ def register_user(
         agreed_terms=request.agreed_terms
     )
 
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await run_in_threadpool(_save_new_user, db, new_user)
 
     # ✅ Generate JWT Token
     access_token = create_access_token(new_user.id)
@@ -56,6 +68,27 @@ def register_user(
     # return {"user": new_user, "access_token": access_token}
     return new_user
 
+# ----------------------- 📌 Notification Preferences ----------------------- #
+@router.get("/me/notification-preferences", response_model=NotificationPreferenceDisplay)
+def get_notification_preferences(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    """
+    **Channels (email / SMS) and digest frequency of the current user.**
+    """
+    return db_notification.get_preferences(db, current_user.id)
+
+@router.put("/me/notification-preferences", response_model=NotificationPreferenceDisplay)
+def update_notification_preferences(
+    request: NotificationPreferenceUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    **Update notification preferences.**
+    - `digest`: `instant` (grouped within a short window), `hourly` or `daily`.
+    - SMS needs a phone number in E.164 format.
+    """
+    return db_notification.update_preferences(db, current_user.id, request)
+
 # ----------------------- 📌 Retrieve User Profile ----------------------- #
 @router.get("/{user_id}", response_model=UserDisplay)
 def get_user(user_id: int, db: Session = Depends(get_db)):
@@ -83,6 +116,7 @@ def update_user(user_id: int, user_update: UserUpdate, db: Session = Depends(get
         setattr(user, key, value)
 
     db.commit()
+    invalidate_principal(user_id)
     db.refresh(user)
     return user
 
@@ -97,29 +131,51 @@ def delete_user(user_id: int, db: Session = Depends(get_db)):
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
+    db_token.revoke_user_tokens(db, user_id)
     db.delete(user)
     db.commit()
+    invalidate_principal(user_id)
     return UserDeleteResponse(message="User deleted successfully")
 
 # ----------------------- 📌 Upload Profile Picture ----------------------- #
-@router.post("/{user_id}/upload-avatar")
-def upload_avatar(user_id: int, file: UploadFile = File(...), db: Session = Depends(get_db)):
-    """
-    **User uploads their profile picture.**
-    """
+def _get_user(db: Session, user_id: int) -> User:
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    return user
 
-    upload_dir = os.path.join("uploads", "avatars")
-    os.makedirs(upload_dir, exist_ok=True)
+def _save_avatar(db: Session, user: User, manifest: dict, url: str):
+    user.avatar = avatars.dump_manifest(manifest)
+    user.profile_picture = url
+    db.commit()
 
-    file_path = os.path.join(upload_dir, f"{user_id}_{file.filename}")
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+# ✅ Gövde endpoint içinde akış olarak okunur (boyut sınırı), Swagger için form şeması elle verilir
+_AVATAR_FORM = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object", "required": ["file"],
+            "properties": {"file": {"type": "string", "format": "binary"}},
+        }}},
+    }
+}
+
+@router.post("/{user_id}/upload-avatar", openapi_extra=_AVATAR_FORM)
+async def upload_avatar(user_id: int, request: Request, db: Session = Depends(get_db)):
+    """
+    **User uploads their profile picture.**
+    - JPEG, PNG, GIF or WebP (detected from the content), at most AVATAR_MAX_BYTES
+    - Thumbnails (512 / 256 / 64 px by default) are generated as WebP and JPEG
+    - Files are content-addressed and served from /media/{key} (immutable URLs)
+    """
+    user = await run_in_threadpool(_get_user, db, user_id)  # Gövde okunmadan 404
+    file = await avatars.read_avatar_form(request)
+    try:
+        manifest = await avatars.store_avatar(file, current=avatars.load_manifest(user.avatar))
+    finally:
+        await file.close()
 
-    user.avatar_url = f"/{file_path}"
-    db.commit()
-    db.refresh(user)
+    urls = avatars.manifest_urls(manifest)
+    await run_in_threadpool(_save_avatar, db, user, manifest, urls["url"])  # Eski dosyalar: media GC
 
-    return {"message": "Avatar uploaded successfully", "avatar_url": user.avatar_url}
+    return {"message": "Avatar uploaded successfully", "avatar_url": urls["url"], "sizes": urls["sizes"]}
@@ -7,7 +7,10 @@ from db.enums import (
     PaymentStatus,
     PaymentMethod,
     BookingStatus,
-    ComplaintStatus
+    ComplaintStatus,
+    ReviewStatus,
+    DigestFrequency,
+    BroadcastStatus
 )
 
 
@@ -28,6 +31,7 @@ class UserDisplay(BaseModel):
     full_name: str
     is_admin: bool
     is_banned: bool
+    is_accountant: bool = False
     rating: float
     rating_count: int
     verified_id: bool
@@ -42,6 +46,18 @@ class UserToken(BaseModel):
     email: EmailStr
     password: str
 
+class TokenResponse(BaseModel):
+    access_token: str
+    refresh_token: str
+    token_type: str = "bearer"
+    expires_in: int  # saniye (access token)
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
+
+class LogoutRequest(BaseModel):
+    refresh_token: Optional[str] = None  # Verilirse bu girişin refresh token zinciri de iptal edilir
+
 class UserUpdate(BaseModel):
     username: Optional[str] = None
     email: Optional[EmailStr] = None
@@ -141,8 +157,8 @@ class BookingCancel(BaseModel):
 # ✅ Review Schemas
 class ReviewBase(BaseModel):
     ride_id: int
-    author_id: int  # User who wrote the review
-    target_id: int  # User being reviewed
+    reviewer_id: int  # User who wrote the review
+    reviewee_id: int  # User being reviewed
     review_category: ReviewCategory  # Enum for review type
     star_rating: float = Field(..., ge=1.0, le=5.0, description="Rating must be between 1 and 5")
     review_text: Optional[str] = None
@@ -152,16 +168,40 @@ class ReviewBase(BaseModel):
 class ReviewCreate(ReviewBase):
     pass  # No additional fields
 
+class ReviewUpdate(BaseModel):
+    star_rating: Optional[float] = Field(None, ge=1.0, le=5.0)
+    review_text: Optional[str] = None
+    anonymous_review: Optional[bool] = None
+
 class ReviewDisplay(ReviewBase):
     id: int
     created_at: datetime
     likes: int
     dislikes: int
-    average_rating: float  # Dynamically updated average rating
+    status: ReviewStatus  # pending -> published / rejected
+    average_rating: Optional[float] = None  # Dynamically updated average rating
+
+    class Config:
+        from_attributes = True
+
+class ReviewPage(BaseModel):
+    items: List[ReviewDisplay]
+    next_cursor: Optional[str] = None  # Sonraki sayfa için opak imleç (keyset)
+
+class RatingBreakdown(BaseModel):
+    review_category: ReviewCategory
+    rating_sum: float
+    rating_count: int
 
     class Config:
         from_attributes = True
 
+class UserRatingDisplay(BaseModel):
+    user_id: int
+    rating: float
+    rating_count: int
+    breakdown: List[RatingBreakdown] = []
+
 class ReviewVoteCreate(BaseModel):
     review_id: int
     voter_id: int
@@ -224,6 +264,51 @@ class RefundPolicy(BaseModel):
     refund_percentage_12h: float = 0.5  # 50% refund if canceled 12-24 hours before
     refund_percentage_last_min: float = 0.0  # No refund if canceled less than 12 hours before
 
+# ✅ Complaint Schemas
+class ComplaintCreate(BaseModel):
+    reported_user_id: int
+    review_id: Optional[int] = None
+    reason: str = Field(..., min_length=3)
+
+class ComplaintDisplay(BaseModel):
+    id: int
+    reported_user_id: int
+    reporter_user_id: int
+    review_id: Optional[int] = None
+    reason: str
+    status: ComplaintStatus
+    priority: Optional[float] = None
+    created_at: datetime
+    triaged_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class ComplaintPage(BaseModel):
+    items: List[ComplaintDisplay]
+    next_cursor: Optional[str] = None
+
+# ✅ Admin Search Schemas
+class SearchHit(BaseModel):
+    id: int
+    created_at: datetime
+    rank: float  # bm25 (küçük = daha alakalı)
+    snippet: str
+    reviewer_id: Optional[int] = None
+    reviewee_id: Optional[int] = None
+    hidden: Optional[bool] = None
+    reported: Optional[bool] = None
+    reporter_user_id: Optional[int] = None
+    reported_user_id: Optional[int] = None
+    review_id: Optional[int] = None
+    status: Optional[ComplaintStatus] = None
+
+class SearchPage(BaseModel):
+    items: List[SearchHit]
+    page: int
+    page_size: int
+    has_more: bool
+
 # ✅ Authentication Schemas
 class AuthRequest(BaseModel):
     email: EmailStr
@@ -237,3 +322,42 @@ class AuthResponse(BaseModel):
 # ✅ User Agreement Schema
 class Agreement(BaseModel):
     agreed: bool  # Must be true to proceed with signup
+
+# ✅ Notification Preference Schemas
+class NotificationPreferenceUpdate(BaseModel):
+    email_enabled: Optional[bool] = None
+    sms_enabled: Optional[bool] = None
+    phone_number: Optional[str] = Field(None, pattern=r"^\+[1-9]\d{6,14}$")  # E.164
+    digest: Optional[DigestFrequency] = None
+    locale: Optional[str] = Field(None, pattern=r"^[a-z]{2}$")
+
+class NotificationPreferenceDisplay(BaseModel):
+    email_enabled: bool
+    sms_enabled: bool
+    phone_number: Optional[str] = None
+    digest: DigestFrequency
+    locale: str
+
+    class Config:
+        from_attributes = True
+
+# ✅ Broadcast Schemas
+class BroadcastCreate(BaseModel):
+    message: str = Field(..., min_length=1, max_length=1000)
+
+class BroadcastDisplay(BaseModel):
+    id: int
+    message: str
+    status: BroadcastStatus
+    total: int
+    processed: int
+    skipped: int
+    queued: int
+    sent: int
+    failed: int
+    progress: float
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,61 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from db.database import Base
+from db.db_review import get_review_feed
+from db.enums import ReviewSort
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _insert_reviews(db, created_at_values):
+    for created_at in created_at_values:
+        db.execute(text(
+            "INSERT INTO reviews (ride_id, reviewer_id, reviewee_id, review_category, star_rating, created_at,"
+            " likes, dislikes, helpfulness, reported, hidden, status)"
+            " VALUES (1, 2, 1, 'DRIVER', 4.0, :created_at, 0, 0, 0, 0, 0, 'PUBLISHED')"
+        ), {"created_at": created_at})
+    db.commit()
+
+
+def _walk(db, sort, limit):
+    ids, cursor = [], None
+    for _ in range(100):  # Döngüye giren imleç testi sonsuza kadar çalıştırmasın
+        page = get_review_feed(db, reviewee_id=1, sort=sort, limit=limit, cursor=cursor)
+        ids.extend(review.id for review in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return ids
+    pytest.fail(f"feed did not terminate, ids so far: {ids}")
+
+
+def test_newest_feed_pages_through_rows_of_the_same_second(db):
+    # func.now() satırları: kesirsiz saniye
+    _insert_reviews(db, ["2026-10-19 10:00:05"] * 10)
+
+    assert _walk(db, ReviewSort.NEWEST, limit=3) == list(range(10, 0, -1))
+
+
+def test_newest_feed_mixes_server_and_python_timestamps(db):
+    # create_review datetime.utcnow() ile mikrosaniyeli yazar, func.now() kesirsiz
+    _insert_reviews(db, ["2026-10-19 10:00:05", "2026-10-19 10:00:05.250000", "2026-10-19 10:00:05"] * 3)
+
+    ids = _walk(db, ReviewSort.NEWEST, limit=2)
+    assert sorted(ids) == list(range(1, 10))
+    assert len(ids) == len(set(ids))
+
+
+def test_rating_feed_pages_through_ties(db):
+    _insert_reviews(db, ["2026-10-19 10:00:05"] * 7)
+
+    assert _walk(db, ReviewSort.HIGHEST_RATING, limit=3) == list(range(7, 0, -1))
@@ -1,24 +1,25 @@
 import os
-from passlib.context import CryptContext
+import time
+import uuid
 from datetime import datetime, timedelta
 from typing import Optional
-from jose import JWTError, jwt
+from jose import JWTError
 from fastapi.security import OAuth2PasswordBearer
 from fastapi import Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from db.database import get_db
 from db.models import User
+from db.db_token import is_revoked
 from dotenv import load_dotenv
+from utils import hashing  # ✅ Bcrypt, ayrı hash havuzunda
+from utils.keyring import keyring
+from utils.principal_cache import Principal, principal_cache
 
 # ✅ Ortam değişkenlerini yükle (.env dosyasından)
 load_dotenv()
 
-# ✅ Parola Hashleme (Bcrypt kullanarak güvenli şifreleme)
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-# ✅ JWT Token Konfigürasyonu
-SECRET_KEY = os.getenv("SECRET_KEY", "default-secret-key")  # 📌 .env içinde olmalı!
-ALGORITHM = "HS256"
+# ✅ JWT Token Konfigürasyonu (Asimetrik imza, anahtarlar utils/keyring.py'de)
+ALGORITHM = keyring.algorithm
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
 
 # ✅ OAuth2 Şeması (JWT ile kimlik doğrulama)
@@ -28,27 +29,28 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/tokens")
 
 def hash_password(password: str) -> str:
     """
-    Girilen parolayı bcrypt ile hashler.
+    Girilen parolayı bcrypt ile hashler (hash havuzunda).
     """
-    return pwd_context.hash(password)
+    return hashing.hash_password(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
-    Girilen parolanın, hashlenmiş parola ile eşleşip eşleşmediğini kontrol eder.
+    Girilen parolanın, hashlenmiş parola ile eşleşip eşleşmediğini kontrol eder (hash havuzunda).
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    return hashing.verify_password(plain_password, hashed_password)
 
 # ------------------------ 🔑 JWT Token Yönetimi ------------------------ #
 
 def create_access_token(user_id: int, expires_delta: Optional[timedelta] = None) -> str:
-    payload = {"sub": str(user_id)}
+    # jti => tek token iptali (logout), iat => kullanıcı bazlı iptal (ban, parola değişikliği)
+    payload = {"sub": str(user_id), "jti": uuid.uuid4().hex, "iat": time.time()}
     expire = datetime.utcnow() + (expires_delta if expires_delta else timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     payload.update({"exp": expire})
-    return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
+    return keyring.sign(payload)
 
 def verify_token(token: str, credentials_exception, db: Session) -> User:
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = keyring.decode(token)
         user_id: str = payload.get("sub")
         if not user_id:
             raise credentials_exception
@@ -59,27 +61,61 @@ def verify_token(token: str, credentials_exception, db: Session) -> User:
     except JWTError:
         raise credentials_exception
 
-def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)) -> User:
-    """
-    Retrieves the currently authenticated user based on the JWT token provided.
-    """
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
+
+def decode_access_token(token: str, db: Session) -> dict:
+    """
+    Decodes and validates an access token, including the revocation check
+    (Bloom filter first; the DB is only consulted on a positive).
+    """
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-        user = db.query(User).filter(User.id == int(user_id)).first()
-        if not user:
-            raise credentials_exception
-        return user
-    except JWTError:
-        raise credentials_exception
+        payload = keyring.decode(token)
+        payload["sub"] = int(payload["sub"])
+    except (JWTError, KeyError, TypeError, ValueError):
+        raise _credentials_exception()
+
+    if is_revoked(db, payload):
+        raise _credentials_exception()
+    return payload
+
+def _user_id_from_token(token: str, db: Session) -> int:
+    return decode_access_token(token, db)["sub"]
+
+def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)) -> User:
+    """
+    Retrieves the currently authenticated user based on the JWT token provided.
+    Use this when the endpoint needs the ORM object (e.g. to modify the user).
+    """
+    user_id = _user_id_from_token(token, db)
+    generation = principal_cache.generation()
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise _credentials_exception()
+    principal_cache.put(Principal.from_user(user), generation)
+    return user
+
+def get_current_principal(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)) -> Principal:
+    """
+    Returns the authenticated user's principal (id, username, email, role flags).
+    Served from the principal cache; the DB is only queried on a miss.
+    """
+    user_id = _user_id_from_token(token, db)
+    principal = principal_cache.get(user_id)
+    if principal is not None:
+        return principal
+
+    generation = principal_cache.generation()
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise _credentials_exception()
+    principal = Principal.from_user(user)
+    principal_cache.put(principal, generation)
+    return principal
 
 def get_current_user_or_404(db: Session = Depends(get_db), user_id: int = Depends(get_current_user)) -> User:
     """
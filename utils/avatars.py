@@ -0,0 +1,251 @@
+# utils/avatars.py
+
+import asyncio
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+import anyio
+from fastapi import HTTPException, Request
+from starlette.datastructures import UploadFile as StarletteUploadFile
+from starlette.formparsers import MultiPartException, MultiPartParser
+
+from utils import media
+
+# ✅ Avatar ayarları (Çevre değişkenlerinden)
+AVATAR_MAX_BYTES = int(os.getenv("AVATAR_MAX_BYTES", 10 * 1024 * 1024))  # Yüklenen dosya üst sınırı
+AVATAR_MAX_PIXELS = int(os.getenv("AVATAR_MAX_PIXELS", 40_000_000))  # Sıkıştırma bombası koruması (40 MP)
+AVATAR_SIZES = tuple(int(size) for size in os.getenv("AVATAR_SIZES", "512,256,64").split(",") if size.strip())
+AVATAR_DEFAULT_SIZE = int(os.getenv("AVATAR_DEFAULT_SIZE", 256))  # profile_picture bu boyutu gösterir
+AVATAR_WORKERS = int(os.getenv("AVATAR_WORKERS", 2))  # Küçük resim process sayısı
+AVATAR_CHUNK_SIZE = 64 * 1024
+_FORM_OVERHEAD = 16 * 1024  # multipart sınırları ve başlıkları için pay
+
+# ✅ Çıktı biçimleri: uzantı => (Pillow biçimi, kayıt ayarları)
+_OUTPUTS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpg": ("JPEG", {"quality": 85, "optimize": True, "progressive": True}),
+}
+
+# ✅ İçerik koklama: dosya adı / Content-Type yerine ilk baytlar
+_SIGNATURES: List[Tuple[bytes, int, str]] = [
+    (b"\xff\xd8\xff", 0, "jpg"),
+    (b"\x89PNG\r\n\x1a\n", 0, "png"),
+    (b"GIF87a", 0, "gif"),
+    (b"GIF89a", 0, "gif"),
+    (b"WEBP", 8, "webp"),  # RIFF....WEBP
+]
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = Lock()
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    for signature, offset, extension in _SIGNATURES:
+        if head[offset:offset + len(signature)] == signature:
+            if extension == "webp" and not head.startswith(b"RIFF"):
+                continue
+            return extension
+    return None
+
+
+# ------------------------ 📥 Streaming upload ------------------------ #
+
+def _too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Avatar must be at most {max_bytes // (1024 * 1024)} MB")
+
+
+async def read_avatar_form(request: Request, field: str = "file", max_bytes: int = AVATAR_MAX_BYTES) -> StarletteUploadFile:
+    """
+    Parses the multipart body while it streams in and aborts with 413 as soon as it
+    grows past the limit (FastAPI's File() parameters would spool the whole body
+    to disk before the endpoint runs).
+    """
+    limit = max_bytes + _FORM_OVERHEAD
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > limit:
+        raise _too_large(max_bytes)  # Gövde hiç okunmaz
+
+    async def limited_stream():
+        received = 0
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > limit:  # Content-Length yok / yanlış (chunked)
+                raise _too_large(max_bytes)
+            yield chunk
+
+    if not request.headers.get("content-type", "").startswith("multipart/form-data"):
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data upload")
+    try:
+        form = await MultiPartParser(request.headers, limited_stream(), max_files=1, max_fields=10).parse()
+    except MultiPartException as error:
+        raise HTTPException(status_code=400, detail=error.message) from error
+    upload = form.get(field)
+    if not isinstance(upload, StarletteUploadFile):
+        await form.close()
+        raise HTTPException(status_code=422, detail=f"Missing file field '{field}'")
+    return upload
+
+
+async def receive_upload(file: StarletteUploadFile, max_bytes: int = AVATAR_MAX_BYTES) -> Tuple[str, str, str]:
+    """
+    Copies an upload to a staging file of the media store in chunks (async writes),
+    hashing it on the way, and rejects it as soon as it exceeds `max_bytes` (413) or
+    when its first bytes aren't a supported image (415).
+    Returns (staging path, sniffed extension, content key).
+    """
+    if file.size is not None and file.size > max_bytes:
+        raise _too_large(max_bytes)
+
+    path = media.temp_path("upload-")
+    hasher = media.new_hasher()
+    received = 0
+    extension = None
+    try:
+        async with await anyio.open_file(path, "wb") as target:
+            while chunk := await file.read(AVATAR_CHUNK_SIZE):
+                if extension is None:
+                    extension = sniff_image_type(chunk[:16])
+                    if extension is None:
+                        raise HTTPException(status_code=415, detail="Avatar must be a JPEG, PNG, GIF or WebP image")
+                received += len(chunk)
+                if received > max_bytes:
+                    raise _too_large(max_bytes)
+                hasher.update(chunk)
+                await target.write(chunk)
+        if extension is None:
+            raise HTTPException(status_code=400, detail="Empty file")
+    except BaseException:
+        _remove(path)
+        raise
+    return path, extension, media.key_for(hasher, extension)
+
+
+# ------------------------ 🖼️ Thumbnails (process pool) ------------------------ #
+
+def _render_thumbnails(source: str, target_dir: str, sizes: Tuple[int, ...], max_pixels: int) -> Dict[int, List[str]]:
+    """
+    Runs in a worker process: decodes the image once, crops it to a centred square
+    and writes every size in every output format into `target_dir`.
+    """
+    import warnings
+    from PIL import Image, ImageOps
+
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    warnings.simplefilter("error", Image.DecompressionBombWarning)
+
+    with Image.open(source) as image:
+        image.draft("RGB", (max(sizes), max(sizes)))  # JPEG: tam çözünürlüğü hiç açma (DCT ölçekleme)
+        image = ImageOps.exif_transpose(image)  # Telefon fotoğrafları: EXIF yönü
+        has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+        image = image.convert("RGBA" if has_alpha else "RGB")
+
+        side = min(min(image.size), max(sizes))  # Ortalanmış kare kırpma + ilk küçültme tek adımda
+        image = ImageOps.fit(image, (side, side), method=Image.Resampling.LANCZOS)
+
+        written: Dict[int, List[str]] = {}
+        for size in sorted(sizes, reverse=True):  # Büyükten küçüğe: her adım bir öncekinden küçültülür
+            image = image.resize((size, size), Image.Resampling.LANCZOS, reducing_gap=3.0) if image.width > size else image
+            for extension, (image_format, options) in _OUTPUTS.items():
+                frame = image
+                if image_format == "JPEG" and frame.mode == "RGBA":  # JPEG saydamlık desteklemez: beyaz zemin
+                    background = Image.new("RGB", frame.size, (255, 255, 255))
+                    background.paste(frame, mask=frame.getchannel("A"))
+                    frame = background
+                frame.save(os.path.join(target_dir, f"{size}.{extension}"), image_format, **options)
+                written.setdefault(size, []).append(extension)
+        return written
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=AVATAR_WORKERS)
+        return _pool
+
+
+def shutdown_pool():
+    """
+    Stops the thumbnail process pool (called on application shutdown).
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _publish_thumbnails(staging: str, written: Dict[int, List[str]]) -> Dict[str, Dict[str, str]]:
+    return {
+        str(size): {extension: media.put_file(os.path.join(staging, f"{size}.{extension}"), extension=extension) for extension in extensions}
+        for size, extensions in written.items()
+    }
+
+
+async def store_avatar(file: StarletteUploadFile, current: Optional[dict] = None) -> dict:
+    """
+    Streams the upload into the media store, renders the thumbnails in the process
+    pool and stores every file under its content hash. Returns the avatar manifest
+    ({"original": key, "sizes": {size: {format: key}}}); re-uploading the current
+    original returns `current` without rendering again.
+    """
+    upload_path, extension, key = await receive_upload(file)
+    if current and current.get("original") == key:
+        _remove(upload_path)
+        return current
+
+    staging = media.temp_path("avatar-")
+    try:
+        os.makedirs(staging)
+        loop = asyncio.get_running_loop()
+        try:
+            written = await loop.run_in_executor(_get_pool(), _render_thumbnails, upload_path, staging, AVATAR_SIZES, AVATAR_MAX_PIXELS)
+        except Exception as error:  # Bozuk / çok büyük görüntü (Pillow hataları)
+            raise HTTPException(status_code=422, detail="Avatar could not be read as an image") from error
+        sizes = await anyio.to_thread.run_sync(_publish_thumbnails, staging, written)
+        await anyio.to_thread.run_sync(media.put_file, upload_path, key)
+    finally:
+        _remove(upload_path)
+        shutil.rmtree(staging, ignore_errors=True)
+    return {"original": key, "sizes": sizes}
+
+
+# ------------------------ 📋 Manifest (users.avatar) ------------------------ #
+
+def load_manifest(value: Optional[str]) -> Optional[dict]:
+    return json.loads(value) if value else None
+
+
+def dump_manifest(manifest: dict) -> str:
+    return json.dumps(manifest, separators=(",", ":"), sort_keys=True)
+
+
+def manifest_keys(manifest: Optional[dict]) -> List[str]:
+    if not manifest:
+        return []
+    keys = [manifest["original"]]
+    for formats in manifest["sizes"].values():
+        keys.extend(formats.values())
+    return keys
+
+
+def manifest_urls(manifest: dict) -> Dict[str, object]:
+    """
+    Public URLs of an avatar: `url` is the default size as WebP (profile_picture).
+    """
+    return {
+        "url": media.url_for(manifest["sizes"][str(AVATAR_DEFAULT_SIZE)]["webp"]),
+        "original": media.url_for(manifest["original"]),
+        "sizes": {int(size): {ext: media.url_for(key) for ext, key in formats.items()} for size, formats in manifest["sizes"].items()},
+    }
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
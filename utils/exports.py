@@ -0,0 +1,94 @@
+# utils/exports.py
+
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+from enum import Enum
+from typing import Iterable, Iterator, Sequence
+
+# ✅ Desteklenen export formatları ve HTTP içerik tipleri
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+GZIP_MEDIA_TYPE = "application/gzip"  # .gz dosyası olarak indirilir (Content-Encoding değil)
+
+# ✅ Kaç satırda bir tampon boşaltılacak (chunk boyutu)
+ROWS_PER_CHUNK = 500
+
+
+def _plain(value):
+    """
+    Converts enum/datetime values into JSON/CSV friendly primitives.
+    """
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def stream_csv(rows: Iterable[Sequence], fieldnames: Sequence[str]) -> Iterator[bytes]:
+    """
+    Writes rows as CSV incrementally, yielding one encoded chunk every ROWS_PER_CHUNK rows.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fieldnames)
+
+    pending = 0
+    for row in rows:
+        writer.writerow([_plain(value) for value in row])
+        pending += 1
+        if pending >= ROWS_PER_CHUNK:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate(0)
+            pending = 0
+
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def stream_ndjson(rows: Iterable[Sequence], fieldnames: Sequence[str]) -> Iterator[bytes]:
+    """
+    Writes rows as newline-delimited JSON objects, yielding one chunk every ROWS_PER_CHUNK rows.
+    """
+    lines = []
+    for row in rows:
+        record = {name: _plain(value) for name, value in zip(fieldnames, row)}
+        lines.append(json.dumps(record, separators=(",", ":")))
+        if len(lines) >= ROWS_PER_CHUNK:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+            lines = []
+
+    if lines:
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def gzip_stream(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """
+    Compresses a byte stream on the fly into a single gzip member.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31 => gzip header + trailer
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def build_export_stream(rows: Iterable[Sequence], fieldnames: Sequence[str], fmt: str, gzip: bool = False) -> Iterator[bytes]:
+    """
+    Returns the byte stream for the requested export format (csv / ndjson), optionally gzipped.
+    """
+    if fmt == "csv":
+        chunks = stream_csv(rows, fieldnames)
+    elif fmt == "ndjson":
+        chunks = stream_ndjson(rows, fieldnames)
+    else:
+        raise ValueError(f"Unsupported export format: {fmt}")
+
+    return gzip_stream(chunks) if gzip else chunks
@@ -0,0 +1,99 @@
+# utils/fake_providers.py
+#
+# Local stand-ins for the Twilio and SendGrid REST endpoints used by the notification
+# dispatcher. Either run them as a server and point the dispatcher at it:
+#
+#   uvicorn utils.fake_providers:app --port 8099
+#   TWILIO_API_URL=http://127.0.0.1:8099 SENDGRID_API_URL=http://127.0.0.1:8099 uvicorn main:app
+#
+# or mount them in-process: NotificationDispatcher(transport=httpx.ASGITransport(app=app)).
+
+import asyncio
+import uuid
+from typing import List
+
+from fastapi import FastAPI, Form, Request
+from fastapi.responses import JSONResponse, Response
+
+
+class FakeProviderState:
+    """
+    Recorded requests plus failure injection (`fail_next` answers the next N requests
+    with the given status, e.g. 429 or 503 to exercise retries).
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.sms: List[dict] = []
+        self.email_requests: List[dict] = []
+        self.failures: List[int] = []
+        self.latency = 0.0
+        self.active = 0
+        self.max_active = 0
+
+    def fail_next(self, count: int, status_code: int = 503):
+        self.failures.extend([status_code] * count)
+
+    @property
+    def emails(self) -> List[str]:
+        return [to["email"] for request in self.email_requests for item in request["personalizations"] for to in item["to"]]
+
+
+state = FakeProviderState()
+app = FastAPI(title="Fake notification providers")
+
+
+async def _simulate():
+    state.active += 1
+    state.max_active = max(state.max_active, state.active)
+    try:
+        if state.latency:
+            await asyncio.sleep(state.latency)
+        if state.failures:
+            status_code = state.failures.pop(0)
+            headers = {"Retry-After": "0"} if status_code == 429 else {}
+            return JSONResponse({"message": "injected failure"}, status_code=status_code, headers=headers)
+        return None
+    finally:
+        state.active -= 1
+
+
+@app.post("/2010-04-01/Accounts/{account_sid}/Messages.json")
+async def twilio_message(account_sid: str, To: str = Form(...), From: str = Form(...), Body: str = Form(...)):
+    failure = await _simulate()
+    if failure:
+        return failure
+    sid = f"SM{uuid.uuid4().hex}"
+    state.sms.append({"account_sid": account_sid, "to": To, "from": From, "body": Body, "sid": sid})
+    return JSONResponse({"sid": sid, "status": "queued"}, status_code=201)
+
+
+@app.post("/v3/mail/send")
+async def sendgrid_mail(request: Request):
+    failure = await _simulate()
+    if failure:
+        return failure
+    payload = await request.json()
+    if not payload.get("personalizations") or len(payload["personalizations"]) > 1000:
+        return JSONResponse({"errors": [{"message": "invalid personalizations"}]}, status_code=400)
+    state.email_requests.append(payload)
+    return Response(status_code=202)
+
+
+@app.get("/_messages")
+def recorded_messages():
+    return {"sms": state.sms, "email_requests": state.email_requests, "max_active": state.max_active}
+
+
+@app.post("/_fail")
+def inject_failures(count: int = 1, status_code: int = 503):
+    state.fail_next(count, status_code)
+    return {"pending_failures": len(state.failures)}
+
+
+@app.post("/_reset")
+def reset_state():
+    state.reset()
+    return {"message": "reset"}
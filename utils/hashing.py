@@ -1,13 +1,69 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
 from passlib.context import CryptContext
 
+# ✅ Hash maliyeti ve havuz ayarları (Çevre değişkenlerinden)
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))  # Değişirse eski hashler girişte yeniden hashlenir
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", os.cpu_count() or 1))
+HASH_MAX_PENDING = int(os.getenv("HASH_MAX_PENDING", HASH_WORKERS * 16))  # Kuyrukta bekleyebilecek en fazla iş
+
 # ✅ BCrypt ile şifreleme için yapılandırma
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# min/max_desired_rounds => farklı maliyetle üretilmiş hashler needs_update() ile yakalanır
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_desired_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_desired_rounds=BCRYPT_ROUNDS,
+)
+
+# ✅ bcrypt GIL'i bırakır: ayrı bir thread havuzu CPU işini istek işçilerinden ayırır
+_pool = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="password-hash")
+_slots = threading.BoundedSemaphore(HASH_MAX_PENDING)
+
+
+def _submit(func, *args):
+    """
+    Queues a hashing job on the bounded pool. When the queue is full the request is
+    shed with 503 instead of piling up behind a login storm.
+    """
+    if not _slots.acquire(blocking=False):
+        raise HTTPException(status_code=503, detail="Server is busy, please retry.", headers={"Retry-After": "1"})
+    try:
+        future = _pool.submit(func, *args)
+    except Exception:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    return future
+
 
 def hash_password(password: str) -> str:
     """Hashes the password before storing it in the database."""
-    return pwd_context.hash(password)
+    return _submit(pwd_context.hash, password).result()
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verifies the provided password against the stored hash."""
-    return pwd_context.verify(plain_password, hashed_password)
+    return _submit(pwd_context.verify, plain_password, hashed_password).result()
+
+
+async def hash_password_async(password: str) -> str:
+    """Hashes the password on the hashing pool without blocking the event loop."""
+    return await asyncio.wrap_future(_submit(pwd_context.hash, password))
+
+
+async def verify_and_update_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verifies the password without blocking the event loop.
 
+    Returns:
+        (bool, str | None): Whether it matched, and a new hash if the stored one was
+        created with outdated parameters (the caller should save it).
+    """
+    return await asyncio.wrap_future(_submit(pwd_context.verify_and_update, plain_password, hashed_password))
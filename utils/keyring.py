@@ -0,0 +1,237 @@
+# utils/keyring.py
+
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, Optional
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+from jose import JWTError, jwk, jwt
+
+logger = logging.getLogger(__name__)
+
+# ✅ JWT imza anahtarları (Çevre değişkenlerinden)
+JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "RS256")  # RS256 | ES256
+JWT_KEYS_DIR = os.getenv("JWT_KEYS_DIR", "keys")  # <kid>.pem (özel) + <kid>.pub.pem (açık)
+JWT_JWKS_URL = os.getenv("JWT_JWKS_URL")  # Sadece doğrulayan node'lar: imzalayanın JWKS adresi
+JWT_KEY_ROTATION_DAYS = float(os.getenv("JWT_KEY_ROTATION_DAYS", 30))  # 0 => sadece elle rotasyon
+JWT_KEY_RETENTION_MINUTES = float(os.getenv("JWT_KEY_RETENTION_MINUTES", 90))  # Eski anahtar, yenisinden bu kadar sonra silinir
+KEYRING_RELOAD_INTERVAL = float(os.getenv("KEYRING_RELOAD_INTERVAL", 30))  # saniye
+
+_SUPPORTED_ALGORITHMS = ("RS256", "ES256")
+
+
+def _generate_private_key(algorithm: str):
+    if algorithm == "ES256":
+        return ec.generate_private_key(ec.SECP256R1())
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+class KeyRing:
+    """
+    Asymmetric JWT key ring. The newest private key signs (its id goes into the `kid`
+    header); every key still in the ring verifies. Parsed key objects are cached per kid,
+    so verification never re-parses PEM.
+    """
+
+    def __init__(self, keys_dir: str = JWT_KEYS_DIR, algorithm: str = JWT_ALGORITHM, jwks_url: Optional[str] = JWT_JWKS_URL):
+        if algorithm not in _SUPPORTED_ALGORITHMS:
+            raise ValueError(f"Unsupported JWT algorithm: {algorithm}")
+        self.keys_dir = keys_dir
+        self.algorithm = algorithm
+        self.jwks_url = jwks_url
+        self._signing_kid: Optional[str] = None
+        self._signing_key = None
+        self._public_keys: Dict[str, object] = {}
+        self._created: Dict[str, float] = {}
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    # ------------------------ 📂 Loading ------------------------ #
+
+    def load(self):
+        """
+        (Re)reads the key directory. Already parsed keys are kept as they are.
+        """
+        with self._lock:
+            self._load_locked()
+
+    def _load_locked(self):
+        self._loaded_at = time.monotonic()
+        if not os.path.isdir(self.keys_dir):
+            return
+
+        newest = None
+        seen = set()
+        for name in os.listdir(self.keys_dir):
+            if not name.endswith(".pem"):
+                continue
+            is_public = name.endswith(".pub.pem")
+            kid = name[:-len(".pub.pem")] if is_public else name[:-len(".pem")]
+            path = os.path.join(self.keys_dir, name)
+
+            if kid not in self._public_keys:
+                try:
+                    with open(path, "rb") as file:
+                        key = jwk.construct(file.read(), self.algorithm)
+                except Exception:
+                    logger.exception("Skipping unreadable JWT key %s", path)
+                    continue
+                self._public_keys[kid] = key.public_key() if not is_public else key
+                self._created[kid] = os.path.getmtime(path)
+            seen.add(kid)
+
+            if not is_public and (newest is None or self._created[kid] > self._created[newest]):
+                newest = kid
+
+        # Diskten silinen (emekli) anahtarlar artık doğrulamaz
+        for kid in list(self._public_keys):
+            if kid not in seen:
+                self._public_keys.pop(kid, None)
+                self._created.pop(kid, None)
+
+        if newest and newest != self._signing_kid:
+            with open(os.path.join(self.keys_dir, f"{newest}.pem"), "rb") as file:
+                self._signing_key = jwk.construct(file.read(), self.algorithm)
+            self._signing_kid = newest
+
+    def _load_jwks_locked(self):
+        """
+        Verifier-only mode: pulls public keys from the signer's JWKS endpoint.
+        """
+        import requests  # Sadece doğrulayıcı node'larda gerekli
+
+        try:
+            response = requests.get(self.jwks_url, timeout=5)
+            response.raise_for_status()
+            for entry in response.json().get("keys", []):
+                if entry.get("kid") and entry["kid"] not in self._public_keys:
+                    self._public_keys[entry["kid"]] = jwk.construct(entry, entry.get("alg", self.algorithm))
+        except Exception:
+            logger.exception("Fetching JWKS from %s failed", self.jwks_url)
+        self._loaded_at = time.monotonic()
+
+    def _maybe_reload(self, force: bool = False):
+        """
+        Picks up keys rotated by other processes. `force` (unknown kid) still obeys a
+        short cooldown so garbage kids can't trigger a reload per request.
+        """
+        elapsed = time.monotonic() - self._loaded_at
+        if elapsed < (1.0 if force else KEYRING_RELOAD_INTERVAL):
+            return
+        with self._lock:
+            if self.jwks_url:
+                self._load_jwks_locked()
+            else:
+                self._load_locked()
+
+    # ------------------------ 🔄 Rotation ------------------------ #
+
+    def rotate(self) -> str:
+        """
+        Generates a new signing key and makes it active. Returns its kid.
+        """
+        os.makedirs(self.keys_dir, exist_ok=True)
+        private_key = _generate_private_key(self.algorithm)
+        kid = f"{datetime.utcnow():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}"
+
+        private_pem = private_key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        )
+        public_pem = private_key.public_key().public_bytes(
+            serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+        )
+
+        # ✅ Önce açık anahtar: diğer işlemler yeni kid'i imzadan önce doğrulayabilsin
+        self._write_atomic(os.path.join(self.keys_dir, f"{kid}.pub.pem"), public_pem, 0o644)
+        self._write_atomic(os.path.join(self.keys_dir, f"{kid}.pem"), private_pem, 0o600)
+
+        self.load()
+        return kid
+
+    @staticmethod
+    def _write_atomic(path: str, data: bytes, mode: int):
+        temp_path = f"{path}.tmp"
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode)
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+        os.replace(temp_path, path)
+
+    def prune(self) -> int:
+        """
+        Deletes retired keys once the key that replaced them has been active longer than
+        JWT_KEY_RETENTION_MINUTES (no unexpired token can still reference them).
+        """
+        with self._lock:
+            ordered = sorted(self._created, key=self._created.get)
+            cutoff = time.time() - JWT_KEY_RETENTION_MINUTES * 60
+            removed = 0
+            for kid, successor in zip(ordered, ordered[1:]):
+                if kid == self._signing_kid or self._created[successor] > cutoff:
+                    continue
+                for suffix in (".pem", ".pub.pem"):
+                    path = os.path.join(self.keys_dir, f"{kid}{suffix}")
+                    if os.path.exists(path):
+                        os.remove(path)
+                removed += 1
+            self._load_locked()
+            return removed
+
+    def ensure_signing_key(self) -> str:
+        """
+        Loads the ring and creates / rotates the signing key when missing or too old.
+        """
+        self.load()
+        if self.jwks_url:
+            return self._signing_kid
+        age_days = (time.time() - self._created.get(self._signing_kid, 0)) / 86400
+        if self._signing_kid is None or (JWT_KEY_ROTATION_DAYS > 0 and age_days >= JWT_KEY_ROTATION_DAYS):
+            self.rotate()
+        self.prune()
+        return self._signing_kid
+
+    # ------------------------ 🔑 Sign / verify ------------------------ #
+
+    def sign(self, payload: dict) -> str:
+        self._maybe_reload()
+        if self._signing_key is None:
+            self.ensure_signing_key()
+        if self._signing_key is None:
+            raise RuntimeError("No JWT signing key available (verifier-only node?)")
+        return jwt.encode(payload, self._signing_key, algorithm=self.algorithm, headers={"kid": self._signing_kid})
+
+    def public_key(self, kid: Optional[str]):
+        key = self._public_keys.get(kid)
+        if key is None and kid:
+            self._maybe_reload(force=True)
+            key = self._public_keys.get(kid)
+        return key
+
+    def decode(self, token: str) -> dict:
+        """
+        Verifies the signature with the key named by the `kid` header and returns the claims.
+        """
+        header = jwt.get_unverified_header(token)
+        key = self.public_key(header.get("kid"))
+        if key is None:
+            raise JWTError("Unknown signing key")
+        return jwt.decode(token, key, algorithms=[self.algorithm])
+
+    def jwks(self) -> dict:
+        """
+        Public keys of the ring as a JWK Set (for verifiers on other nodes).
+        """
+        keys = []
+        for kid, key in sorted(self._public_keys.items()):
+            entry = key.to_dict()
+            entry.update({"kid": kid, "use": "sig", "alg": self.algorithm})
+            keys.append(entry)
+        return {"keys": keys}
+
+
+# ✅ Uygulama genelinde tek anahtar halkası
+keyring = KeyRing()
@@ -0,0 +1,124 @@
+# utils/media.py
+
+import hashlib
+import os
+import re
+import time
+import uuid
+from typing import Iterable, Optional, Set
+
+# ✅ Medya deposu ayarları (Çevre değişkenlerinden)
+MEDIA_DIR = os.getenv("MEDIA_DIR", os.path.join("uploads", "media"))
+MEDIA_URL_PREFIX = "/media"
+MEDIA_GC_GRACE = float(os.getenv("MEDIA_GC_GRACE", 3600))  # saniye: bu süreden yeni dosyalar silinmez
+MEDIA_CACHE_CONTROL = "public, max-age=31536000, immutable"  # İçerik adresli: URL asla değişmez
+
+_DIGEST_LENGTH = 32  # sha256'nın ilk 128 biti (hex)
+_CHUNK_SIZE = 1024 * 1024
+_TMP_DIR = ".tmp"
+
+# ✅ Anahtar = içerik özeti + uzantı, örn. "3f2a...9c.webp"
+CONTENT_TYPES = {
+    "webp": "image/webp",
+    "jpg": "image/jpeg",
+    "png": "image/png",
+    "gif": "image/gif",
+}
+_KEY_PATTERN = re.compile(r"^([0-9a-f]{%d})\.(%s)$" % (_DIGEST_LENGTH, "|".join(CONTENT_TYPES)))
+
+
+def new_hasher():
+    return hashlib.sha256()
+
+
+def key_for(hasher, extension: str) -> str:
+    return f"{hasher.hexdigest()[:_DIGEST_LENGTH]}.{extension}"
+
+
+def parse_key(key: str) -> Optional[re.Match]:
+    return _KEY_PATTERN.match(key)
+
+
+def path_for(key: str) -> str:
+    """
+    Blobs are fanned out by the first two hex digits so no directory grows too large.
+    """
+    return os.path.join(MEDIA_DIR, key[:2], key)
+
+
+def url_for(key: str) -> str:
+    return f"{MEDIA_URL_PREFIX}/{key}"
+
+
+def key_from_url(url: Optional[str]) -> Optional[str]:
+    if not url or not url.startswith(MEDIA_URL_PREFIX + "/"):
+        return None
+    key = url[len(MEDIA_URL_PREFIX) + 1:]
+    return key if parse_key(key) else None
+
+
+def temp_path(prefix: str = "") -> str:
+    """
+    Staging path inside the store (same filesystem, so publishing is a rename).
+    """
+    directory = os.path.join(MEDIA_DIR, _TMP_DIR)
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"{prefix}{uuid.uuid4().hex}")
+
+
+def file_key(path: str, extension: str) -> str:
+    hasher = new_hasher()
+    with open(path, "rb") as source:
+        while chunk := source.read(_CHUNK_SIZE):
+            hasher.update(chunk)
+    return key_for(hasher, extension)
+
+
+def put_file(path: str, key: Optional[str] = None, extension: Optional[str] = None) -> str:
+    """
+    Moves a staged file into the store under its content key and returns the key.
+    If the same content is already stored the staged copy is dropped (dedupe) and
+    the existing blob's mtime is refreshed so the GC grace period covers the new
+    reference until it is committed.
+    """
+    key = key or file_key(path, extension)
+    target = path_for(key)
+    if os.path.exists(target):
+        os.remove(path)
+        os.utime(target)
+        return key
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    os.replace(path, target)  # Atomik: okuyucular yarım dosya görmez
+    return key
+
+
+def collect_garbage(referenced: Set[str], grace: float = MEDIA_GC_GRACE, now: Optional[float] = None) -> int:
+    """
+    Deletes blobs that no row references and abandoned staging files, both only
+    when older than `grace` (uploads publish the blob before committing the row).
+    Returns the number of removed files.
+    """
+    cutoff = (now or time.time()) - grace
+    removed = 0
+    for path in _walk_store():
+        name = os.path.basename(path)
+        if name in referenced:
+            continue
+        try:
+            if os.stat(path).st_mtime < cutoff:  # Silmeden hemen önce: yeni dedupe referansı korunur
+                os.remove(path)
+                removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+def _walk_store() -> Iterable[str]:
+    if not os.path.isdir(MEDIA_DIR):
+        return
+    for shard in os.scandir(MEDIA_DIR):
+        if not shard.is_dir():
+            continue
+        for entry in os.scandir(shard.path):
+            if entry.is_file() and (shard.name == _TMP_DIR or parse_key(entry.name)):
+                yield entry.path
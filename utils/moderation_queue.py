@@ -0,0 +1,193 @@
+# utils/moderation_queue.py
+
+import logging
+import os
+import queue
+import threading
+import time
+from typing import List
+
+from db.database import SessionLocal
+from db.enums import ReviewStatus
+from db.models import Review
+from db import db_review
+from utils.near_duplicates import MinHashLSHIndex, find_near_duplicates, review_index, save_review_index, wait_for_review_index, warm_review_index
+from utils.sentiment_analysis import moderate_many, normalize_text
+from utils.word_filter import passes_word_filter  # True => metin uygun
+
+logger = logging.getLogger(__name__)
+
+# ✅ Moderasyon işçi ayarları (Çevre değişkenlerinden)
+MODERATION_WORKERS = int(os.getenv("MODERATION_WORKERS", 2))
+MODERATION_BATCH_SIZE = int(os.getenv("MODERATION_BATCH_SIZE", 32))
+MODERATION_MAX_WAIT = float(os.getenv("MODERATION_MAX_WAIT", 0.2))  # saniye
+
+
+class ModerationPipeline:
+    """
+    In-process review moderation queue. Workers drain the queue in micro-batches and
+    publish or reject every pending review (sentiment, word filter, exact and near-duplicate check).
+    """
+
+    def __init__(self, workers: int = MODERATION_WORKERS, batch_size: int = MODERATION_BATCH_SIZE, max_wait: float = MODERATION_MAX_WAIT):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self._queue: "queue.Queue[int]" = queue.Queue()
+        self._threads: List[threading.Thread] = []
+        self._stopping = threading.Event()
+
+    def submit(self, review_id: int):
+        """
+        Queues a pending review for moderation.
+        """
+        self._queue.put(review_id)
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def start(self):
+        if self._threads:
+            return
+        self._stopping.clear()
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"review-moderation-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0):
+        self._stopping.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _next_batch(self) -> List[int]:
+        """
+        Blocks for the first review, then keeps collecting until the batch is full or
+        max_wait has passed since the first one arrived.
+        """
+        try:
+            first = self._queue.get(timeout=0.5)
+        except queue.Empty:
+            return []
+
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        # ✅ Near-duplicate indeksi ısınana kadar bekle (yorumlar kuyrukta / pending kalır)
+        while not wait_for_review_index(0.5):
+            if self._stopping.is_set():
+                return
+        while not self._stopping.is_set():
+            batch = self._next_batch()
+            if not batch:
+                continue
+            try:
+                self.process_batch(batch)
+            except Exception:
+                logger.exception("Review moderation batch failed: %s", batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def process_batch(self, review_ids: List[int]):
+        """
+        Moderates one micro-batch of reviews and commits all decisions in one transaction.
+        """
+        db = SessionLocal()
+        try:
+            reviews = (
+                db.query(Review)
+                .filter(Review.id.in_(review_ids), Review.status == ReviewStatus.PENDING)
+                .order_by(Review.id)
+                .all()
+            )
+            if not reviews:
+                return
+
+            texts = [review.review_text or "" for review in reviews]
+            negative = moderate_many(texts)
+            duplicates = _find_duplicates(db, reviews)
+
+            for review, text, is_negative in zip(reviews, texts, negative):
+                # ✅ MinHash LSH: başka yolculuklara kopyalanıp hafifçe değiştirilmiş spam
+                near_duplicates = find_near_duplicates(review.id, text)
+
+                if is_negative or not passes_word_filter(text) or review.id in duplicates or near_duplicates:
+                    db_review.reject_review(db, review)
+                else:
+                    db_review.publish_review(db, review)
+                    if MinHashLSHIndex.is_indexable(text):
+                        review_index.add(review.id, text)  # Sadece yayınlanan yorumlar sonraki kopyaları işaretler
+
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+def _find_duplicates(db, reviews: List[Review]) -> set:
+    """
+    Returns the IDs of reviews that repeat an earlier (published or still pending)
+    review of the same reviewer. The oldest copy wins, so concurrent batches agree.
+    """
+    reviewer_ids = {review.reviewer_id for review in reviews if review.review_text}
+    if not reviewer_ids:
+        return set()
+
+    first_seen = {}
+    for row in db.query(Review.id, Review.reviewer_id, Review.review_text).filter(
+        Review.reviewer_id.in_(reviewer_ids),
+        Review.status != ReviewStatus.REJECTED,
+        Review.review_text.isnot(None)
+    ):
+        key = (row.reviewer_id, normalize_text(row.review_text))
+        first_seen[key] = min(row.id, first_seen.get(key, row.id))
+
+    return {
+        review.id
+        for review in reviews
+        if review.review_text
+        and first_seen.get((review.reviewer_id, normalize_text(review.review_text)), review.id) < review.id
+    }
+
+
+# ✅ Uygulama genelinde tek moderasyon kuyruğu
+pipeline = ModerationPipeline()
+
+
+def enqueue_review(review_id: int):
+    pipeline.submit(review_id)
+
+
+def start_pipeline():
+    """
+    Starts warming the near-duplicate index in the background, re-queues reviews left
+    pending by a previous run and starts the workers (they wait for the index).
+    """
+    warm_review_index()
+
+    db = SessionLocal()
+    try:
+        for review_id in db_review.get_pending_review_ids(db):
+            pipeline.submit(review_id)
+    finally:
+        db.close()
+    pipeline.start()
+
+
+def stop_pipeline():
+    pipeline.stop()
+    save_review_index()
@@ -0,0 +1,263 @@
+# utils/near_duplicates.py
+
+import logging
+import os
+import re
+import threading
+import time
+import zlib
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from utils.sentiment_analysis import normalize_text
+
+logger = logging.getLogger(__name__)
+
+# ✅ MinHash / LSH ayarları (Çevre değişkenlerinden)
+MINHASH_PERMUTATIONS = int(os.getenv("MINHASH_PERMUTATIONS", 128))
+MINHASH_BANDS = int(os.getenv("MINHASH_BANDS", 32))  # 32 bant x 4 satır => 0.6 benzerlikte ~%99 aday yakalama
+MINHASH_THRESHOLD = float(os.getenv("MINHASH_THRESHOLD", 0.6))  # Tahmini Jaccard; benzer ama özgün yorumlar ~0.5 civarında
+MINHASH_SHINGLE_SIZE = int(os.getenv("MINHASH_SHINGLE_SIZE", 5))  # karakter n-gram
+MINHASH_MIN_CHARS = int(os.getenv("MINHASH_MIN_CHARS", 40))  # Kısa metinler ("great driver") doğal olarak benzer
+MINHASH_INDEX_PATH = os.getenv("MINHASH_INDEX_PATH", os.path.join("data", "review_minhash.npz"))
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_NON_WORD = re.compile(r"[^\w ]+", re.UNICODE)
+
+
+class MinHashLSHIndex:
+    """
+    In-memory MinHash signatures with banded LSH buckets. Candidate lookup touches only
+    the buckets of the query's bands, so finding near-duplicates doesn't depend on how
+    many texts are indexed.
+    """
+
+    def __init__(self, num_perm: int = MINHASH_PERMUTATIONS, bands: int = MINHASH_BANDS, threshold: float = MINHASH_THRESHOLD, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+
+        # ✅ Sabit tohumlu permütasyonlar: kalıcı imzalar süreçler arasında uyumlu kalır
+        generator = np.random.RandomState(seed)
+        self._a = generator.randint(1, 1 << 31, size=num_perm, dtype=np.int64).astype(np.uint64)
+        self._b = generator.randint(0, 1 << 31, size=num_perm, dtype=np.int64).astype(np.uint64)
+
+        self._signatures: Dict[int, np.ndarray] = {}
+        self._buckets: List[Dict[bytes, Set[int]]] = [defaultdict(set) for _ in range(bands)]
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def __contains__(self, key: int):
+        return key in self._signatures
+
+    @staticmethod
+    def _shingles(text: str) -> np.ndarray:
+        normalized = _NON_WORD.sub("", normalize_text(text))
+        size = MINHASH_SHINGLE_SIZE
+        if len(normalized) < size:
+            grams = {normalized} if normalized else set()
+        else:
+            grams = {normalized[i:i + size] for i in range(len(normalized) - size + 1)}
+        return np.fromiter((zlib.crc32(gram.encode("utf-8")) for gram in grams), dtype=np.uint64, count=len(grams))
+
+    @staticmethod
+    def is_indexable(text: Optional[str]) -> bool:
+        return bool(text) and len(normalize_text(text)) >= MINHASH_MIN_CHARS
+
+    def signature(self, text: str) -> np.ndarray:
+        """
+        MinHash signature (uint32[num_perm]) of the text's character shingles.
+        """
+        shingles = self._shingles(text)
+        if not shingles.size:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint32)
+        hashed = (np.outer(shingles, self._a) + self._b) % _MERSENNE_PRIME
+        return (hashed & _MAX_HASH).min(axis=0).astype(np.uint32)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+
+    def add(self, key: int, text: Optional[str] = None, signature: Optional[np.ndarray] = None):
+        if signature is None:
+            signature = self.signature(text)
+        with self._lock:
+            if key in self._signatures:
+                return
+            self._signatures[key] = signature
+            for band, band_key in enumerate(self._band_keys(signature)):
+                self._buckets[band][band_key].add(key)
+
+    def remove(self, key: int):
+        with self._lock:
+            signature = self._signatures.pop(key, None)
+            if signature is None:
+                return
+            for band, band_key in enumerate(self._band_keys(signature)):
+                bucket = self._buckets[band].get(band_key)
+                if bucket:
+                    bucket.discard(key)
+                    if not bucket:
+                        del self._buckets[band][band_key]
+
+    def query(self, text: Optional[str] = None, signature: Optional[np.ndarray] = None, exclude: Optional[int] = None) -> List[Tuple[int, float]]:
+        """
+        Returns [(key, estimated Jaccard similarity)] of indexed texts above the threshold,
+        most similar first.
+        """
+        if signature is None:
+            signature = self.signature(text)
+
+        with self._lock:
+            candidates = set()
+            for band, band_key in enumerate(self._band_keys(signature)):
+                candidates |= self._buckets[band].get(band_key, set())
+            candidates.discard(exclude)
+            matches = [(key, float(np.mean(self._signatures[key] == signature))) for key in candidates]
+
+        return sorted(
+            ((key, similarity) for key, similarity in matches if similarity >= self.threshold),
+            key=lambda match: -match[1]
+        )
+
+    def save(self, path: str):
+        """
+        Persists the signatures as two compact arrays (keys + uint32 signature matrix).
+        Buckets are rebuilt on load.
+        """
+        with self._lock:
+            keys = np.fromiter(self._signatures.keys(), dtype=np.int64, count=len(self._signatures))
+            matrix = np.stack(list(self._signatures.values())) if keys.size else np.empty((0, self.num_perm), dtype=np.uint32)
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        temp_path = f"{path}.tmp.npz"
+        np.savez_compressed(temp_path, keys=keys, signatures=matrix, num_perm=self.num_perm)
+        os.replace(temp_path, path)
+
+    def load(self, path: str) -> int:
+        """
+        Loads signatures saved with save(). Returns the number of loaded entries.
+        """
+        if not os.path.exists(path):
+            return 0
+        with np.load(path) as data:
+            if int(data["num_perm"]) != self.num_perm:
+                logger.warning("Ignoring MinHash index %s: built with different permutations", path)
+                return 0
+            for key, signature in zip(data["keys"].tolist(), data["signatures"]):
+                self.add(key, signature=signature)
+        return len(self._signatures)
+
+    def max_key(self) -> int:
+        with self._lock:
+            return max(self._signatures, default=0)
+
+
+# ✅ Yorum metinleri için uygulama genelinde tek indeks (açılışta arka planda ısınır)
+review_index = MinHashLSHIndex()
+_index_state = "warming"
+_index_ready = threading.Event()
+_index_thread_started = threading.Event()
+
+
+def find_near_duplicates(review_id: int, text: Optional[str]) -> List[Tuple[int, float]]:
+    """
+    Near-duplicates of a review among the indexed (older) reviews.
+    """
+    if not MinHashLSHIndex.is_indexable(text):
+        return []
+    return [(key, similarity) for key, similarity in review_index.query(text, exclude=review_id) if key < review_id]
+
+
+def index_reviews(rows: Iterable[Tuple[int, Optional[str]]]):
+    """
+    Adds (review_id, review_text) pairs to the index; short texts are skipped.
+    """
+    for review_id, text in rows:
+        if MinHashLSHIndex.is_indexable(text):
+            review_index.add(review_id, text)
+
+
+def load_review_index(batch_size: int = 5000) -> int:
+    """
+    Loads the persisted signatures and indexes any published review written after the
+    snapshot (rejected and deleted reviews aren't indexed).
+    """
+    from db.database import SessionLocal
+    from db.enums import ReviewStatus
+    from db.models import Review
+
+    review_index.load(MINHASH_INDEX_PATH)
+
+    db = SessionLocal()
+    try:
+        last_id = review_index.max_key()
+        while True:
+            rows = (
+                db.query(Review.id, Review.review_text)
+                .filter(Review.id > last_id, Review.status == ReviewStatus.PUBLISHED, Review.review_text.isnot(None))
+                .order_by(Review.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not rows:
+                break
+            index_reviews((row.id, row.review_text) for row in rows)
+            last_id = rows[-1].id
+    finally:
+        db.close()
+
+    return len(review_index)
+
+
+def _warm_up():
+    global _index_state
+    started = time.monotonic()
+    try:
+        count = load_review_index()
+        _index_state = "ready"
+        logger.info("Review MinHash index ready: %d reviews in %.1fs", count, time.monotonic() - started)
+    except Exception:
+        _index_state = "degraded"  # Moderasyon eksik indeksle devam eder, kalıcı olarak beklemez
+        logger.exception("Review MinHash index warm-up failed")
+    finally:
+        _index_ready.set()
+
+
+def warm_review_index():
+    """
+    Builds the index on a background thread so startup doesn't wait for it (a missing
+    snapshot means signing every review). Status: review_index_status().
+    """
+    if _index_thread_started.is_set():
+        return
+    _index_thread_started.set()
+    threading.Thread(target=_warm_up, name="review-index-warm-up", daemon=True).start()
+
+
+def wait_for_review_index(timeout: Optional[float] = None) -> bool:
+    return _index_ready.wait(timeout)
+
+
+def review_index_status() -> Dict[str, object]:
+    return {"status": _index_state, "reviews": len(review_index)}
+
+
+def remove_review(review_id: int):
+    """
+    Drops a deleted / rejected review so it no longer flags new reviews.
+    """
+    review_index.remove(review_id)
+
+
+def save_review_index():
+    if _index_state != "ready":  # Yarım indeks kaydedilmez: sonraki açılış baştan tamamlar
+        return
+    review_index.save(MINHASH_INDEX_PATH)
@@ -0,0 +1,354 @@
+# utils/notification_dispatcher.py
+
+import asyncio
+import logging
+import os
+import random
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Set
+
+from utils.providers import providers as provider_registry
+
+if TYPE_CHECKING:
+    import httpx  # İlk gönderimde import edilir (açılış süresi)
+
+logger = logging.getLogger(__name__)
+
+# ✅ Gönderici ayarları (Çevre değişkenlerinden)
+NOTIFY_QUEUE_SIZE = int(os.getenv("NOTIFY_QUEUE_SIZE", 10000))  # Kanal başına bekleyen mesaj üst sınırı
+NOTIFY_BATCH_WAIT = float(os.getenv("NOTIFY_BATCH_WAIT", 0.05))  # saniye, e-posta toplama penceresi
+NOTIFY_SUBMIT_TIMEOUT = float(os.getenv("NOTIFY_SUBMIT_TIMEOUT", 2.0))  # Kuyruk doluysa en fazla bu kadar beklenir
+NOTIFY_MAX_ATTEMPTS = int(os.getenv("NOTIFY_MAX_ATTEMPTS", 5))
+NOTIFY_BACKOFF_BASE = float(os.getenv("NOTIFY_BACKOFF_BASE", 0.5))  # saniye
+NOTIFY_BACKOFF_MAX = float(os.getenv("NOTIFY_BACKOFF_MAX", 60))  # saniye
+NOTIFY_HTTP_TIMEOUT = float(os.getenv("NOTIFY_HTTP_TIMEOUT", 10))  # saniye
+
+# ✅ Sağlayıcı ayarları (adresler yerel sahte sunuculara yönlendirilebilir, bkz. utils/fake_providers.py)
+TWILIO_API_URL = os.getenv("TWILIO_API_URL", "https://api.twilio.com")
+TWILIO_CONCURRENCY = int(os.getenv("TWILIO_CONCURRENCY", 10))
+SENDGRID_API_URL = os.getenv("SENDGRID_API_URL", "https://api.sendgrid.com")
+SENDGRID_CONCURRENCY = int(os.getenv("SENDGRID_CONCURRENCY", 4))
+SENDGRID_BATCH_SIZE = min(int(os.getenv("SENDGRID_BATCH_SIZE", 500)), 1000)  # SendGrid: istek başına en fazla 1000 personalization
+
+SMS = "sms"
+EMAIL = "email"
+
+
+@dataclass
+class Notification:
+    channel: str  # sms | email
+    to: str
+    body: str
+    subject: Optional[str] = None
+    text: Optional[str] = None  # E-posta: düz metin alternatifi (multipart/alternative)
+    attempts: int = 0
+    on_done: Optional[Callable[[bool], None]] = None  # Gönderildi (True) / kalıcı hata (False), gönderici thread'inde
+
+
+def _finish(group: List[Notification], delivered: bool):
+    for notification in group:
+        if notification.on_done is not None:
+            try:
+                notification.on_done(delivered)
+            except Exception:
+                logger.exception("Notification completion callback failed")
+
+
+class ProviderError(Exception):
+    def __init__(self, message: str, retryable: bool = True, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+def _raise_for_response(response: "httpx.Response"):
+    if response.status_code < 400:
+        return
+    retry_after = response.headers.get("Retry-After")
+    raise ProviderError(
+        f"HTTP {response.status_code}: {response.text[:200]}",
+        # 429 ve 5xx geçici; diğer 4xx (hatalı numara, geçersiz anahtar) tekrar denenmez
+        retryable=response.status_code == 429 or response.status_code >= 500,
+        retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None,
+    )
+
+
+class TwilioSmsProvider:
+    """
+    Twilio Messages REST API. One message per request (no batch endpoint).
+    """
+
+    channel = SMS
+    max_batch = 1
+
+    def __init__(self, account_sid: str = None, auth_token: str = None, from_number: str = None,
+                 base_url: str = TWILIO_API_URL, concurrency: int = TWILIO_CONCURRENCY):
+        self.account_sid = account_sid or os.getenv("TWILIO_ACCOUNT_SID", "YOUR_TWILIO_SID")
+        self.auth_token = auth_token or os.getenv("TWILIO_AUTH_TOKEN", "YOUR_TWILIO_AUTH_TOKEN")
+        self.from_number = from_number or os.getenv("TWILIO_PHONE_NUMBER", "YOUR_TWILIO_PHONE")
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = concurrency
+
+    def create_client(self, transport: Optional["httpx.AsyncBaseTransport"] = None) -> "httpx.AsyncClient":
+        import httpx
+
+        return httpx.AsyncClient(
+            base_url=self.base_url,
+            auth=(self.account_sid, self.auth_token),
+            timeout=NOTIFY_HTTP_TIMEOUT,
+            limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+            transport=transport,
+        )
+
+    async def send(self, client: "httpx.AsyncClient", batch: List[Notification]):
+        notification = batch[0]
+        response = await client.post(
+            f"/2010-04-01/Accounts/{self.account_sid}/Messages.json",
+            data={"To": notification.to, "From": self.from_number, "Body": notification.body},
+        )
+        _raise_for_response(response)
+
+
+class SendGridEmailProvider:
+    """
+    SendGrid v3 mail/send. Messages with the same subject and content go out in one
+    request, one personalization per recipient (recipients don't see each other).
+    """
+
+    channel = EMAIL
+    max_batch = SENDGRID_BATCH_SIZE
+
+    def __init__(self, api_key: str = None, sender: str = None,
+                 base_url: str = SENDGRID_API_URL, concurrency: int = SENDGRID_CONCURRENCY):
+        self.api_key = api_key or os.getenv("SENDGRID_API_KEY", "YOUR_SENDGRID_API_KEY")
+        self.sender = sender or os.getenv("SENDER_EMAIL", "your-email@example.com")
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = concurrency
+
+    def create_client(self, transport: Optional["httpx.AsyncBaseTransport"] = None) -> "httpx.AsyncClient":
+        import httpx
+
+        return httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            timeout=NOTIFY_HTTP_TIMEOUT,
+            limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+            transport=transport,
+        )
+
+    async def send(self, client: "httpx.AsyncClient", batch: List[Notification]):
+        first = batch[0]
+        response = await client.post("/v3/mail/send", json={
+            "personalizations": [{"to": [{"email": notification.to}]} for notification in batch],
+            "from": {"email": self.sender},
+            "subject": first.subject or "",
+            "content": ([{"type": "text/plain", "value": first.text}] if first.text else []) + [{"type": "text/html", "value": first.body}],
+        })
+        _raise_for_response(response)
+
+
+class NotificationDispatcher:
+    """
+    Sends notifications from a dedicated event loop thread, so web workers only enqueue.
+    Each channel has a bounded queue; one batcher per channel collects messages for a
+    short window and starts the send requests, at most `provider.concurrency` at a time.
+    HTTP sessions are kept per provider and failed sends are retried with exponential
+    backoff (full jitter) without holding a request slot.
+    """
+
+    def __init__(self, providers: List = None, queue_size: int = NOTIFY_QUEUE_SIZE,
+                 batch_wait: float = NOTIFY_BATCH_WAIT, max_attempts: int = NOTIFY_MAX_ATTEMPTS,
+                 transport: Optional["httpx.AsyncBaseTransport"] = None):
+        # None => yapılandırılmış sağlayıcılar ilk başlatmada kayıttan alınır (utils/providers.py)
+        self.providers = {provider.channel: provider for provider in providers} if providers else None
+        self.queue_size = queue_size
+        self.batch_wait = batch_wait
+        self.max_attempts = max_attempts
+        self.transport = transport  # Testler: httpx.ASGITransport(app=fake_providers.app)
+        self.counters: Dict[str, int] = defaultdict(int)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._clients: Dict[str, "httpx.AsyncClient"] = {}
+        self._limits: Dict[str, asyncio.Semaphore] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._sending: Set[asyncio.Task] = set()
+        self._in_flight = 0
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+
+    # ------------------------ ▶️ Lifecycle ------------------------ #
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                self._ready.wait()  # Başka bir thread başlatıyor olabilir
+                return
+            if self.providers is None:
+                self.providers = {
+                    channel: provider_registry.get(channel) for channel in (SMS, EMAIL) if provider_registry.configured(channel)
+                }
+                for channel in {SMS, EMAIL} - set(self.providers):
+                    logger.warning("%s notifications are disabled (missing %s)", channel, ", ".join(provider_registry.missing_env(channel)))
+            self._ready.clear()
+            self._thread = threading.Thread(target=self._run_loop, name="notification-dispatcher", daemon=True)
+            self._thread.start()
+        self._ready.wait()
+
+    def _run_loop(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        for channel, provider in self.providers.items():
+            self._queues[channel] = asyncio.Queue(self.queue_size)
+            self._clients[channel] = provider.create_client(self.transport)
+            self._limits[channel] = asyncio.Semaphore(provider.concurrency)
+            self._tasks.append(loop.create_task(self._batcher(channel)))
+        self._ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            loop.run_until_complete(self._close_clients())
+            loop.close()
+
+    async def _close_clients(self):
+        tasks = self._tasks + list(self._sending)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for client in self._clients.values():
+            await client.aclose()
+
+    def stop(self, timeout: float = 5.0):
+        """
+        Waits up to `timeout` for queued messages to go out, then stops the loop.
+        """
+        with self._lock:
+            thread, loop = self._thread, self._loop
+            if thread is None:
+                return
+            try:
+                asyncio.run_coroutine_threadsafe(self._drain(), loop).result(timeout)
+            except Exception:
+                logger.warning("Notification dispatcher stopped with %d message(s) unsent", self.pending())
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout)
+            self._thread = self._loop = None
+            self._ready.clear()
+            self._queues, self._clients, self._limits, self._tasks, self._sending = {}, {}, {}, [], set()
+
+    async def _drain(self):
+        while self.pending():
+            await asyncio.sleep(0.05)
+
+    def pending(self) -> int:
+        return sum(queue.qsize() for queue in self._queues.values()) + self._in_flight
+
+    def stats(self) -> dict:
+        return {"pending": self.pending(), **self.counters}
+
+    # ------------------------ 📥 Enqueue ------------------------ #
+
+    def submit(self, notification: Notification, timeout: float = NOTIFY_SUBMIT_TIMEOUT) -> bool:
+        """
+        Queues a notification (thread-safe). Blocks up to `timeout` while the channel
+        queue is full; returns False if it stays full or the channel is unknown.
+        """
+        if not self._ready.is_set():
+            self.start()  # İlk mesajda başlar (uygulama açılışını yavaşlatmaz)
+        if notification.channel not in self.providers:
+            self.counters["unconfigured"] += 1  # Degraded mod: sağlayıcı yapılandırılmamış
+            return False
+        try:
+            asyncio.run_coroutine_threadsafe(
+                asyncio.wait_for(self._queues[notification.channel].put(notification), timeout), self._loop
+            ).result()
+        except asyncio.TimeoutError:
+            self.counters["dropped"] += 1
+            logger.warning("Notification queue %s is full, dropping message to %s", notification.channel, notification.to)
+            return False
+        return True
+
+    # ------------------------ 📤 Workers ------------------------ #
+
+    async def _next_batch(self, channel: str) -> List[Notification]:
+        queue = self._queues[channel]
+        batch = [await queue.get()]
+        self._in_flight += 1  # Kuyruktan alınan her mesaj hemen sayılır (stop() erken bitmesin)
+        max_batch = self.providers[channel].max_batch
+        if max_batch > 1:
+            deadline = self._loop.time() + self.batch_wait
+            while len(batch) < max_batch:
+                remaining = deadline - self._loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+                self._in_flight += 1
+        return batch
+
+    async def _batcher(self, channel: str):
+        provider = self.providers[channel]
+        limit = self._limits[channel]
+        while True:
+            batch = await self._next_batch(channel)
+            # Aynı konu + içerik => tek istek
+            groups: Dict[tuple, List[Notification]] = defaultdict(list)
+            for notification in batch:
+                groups[(notification.subject, notification.body, notification.text)].append(notification)
+            for group in groups.values():
+                await limit.acquire()  # Sağlayıcı sınırı doluysa yeni batch toplanmaz (geri basınç)
+                task = self._loop.create_task(self._send(provider, group))
+                self._sending.add(task)
+                task.add_done_callback(self._sending.discard)
+
+    async def _send(self, provider, group: List[Notification]):
+        try:
+            try:
+                await provider.send(self._clients[provider.channel], group)
+            finally:
+                self._limits[provider.channel].release()
+            self.counters[f"{provider.channel}_sent"] += len(group)
+            self.counters[f"{provider.channel}_requests"] += 1
+            _finish(group, True)
+        except ProviderError as error:
+            self._retry_or_fail(provider, group, error)
+        except Exception as error:
+            import httpx
+
+            if isinstance(error, httpx.HTTPError):  # Ağ hataları geçici sayılır
+                self._retry_or_fail(provider, group, error)
+                return
+            logger.exception("Unexpected %s provider error", provider.channel)
+            self._retry_or_fail(provider, group, ProviderError("unexpected error", retryable=False))
+        finally:
+            self._in_flight -= len(group)
+
+    def _retry_or_fail(self, provider, group: List[Notification], error: Exception):
+        retryable = getattr(error, "retryable", True)
+        attempts = group[0].attempts + 1
+        if not retryable or attempts >= self.max_attempts:
+            self.counters[f"{provider.channel}_failed"] += len(group)
+            logger.error("🚨 %s sending failed for %d recipient(s) after %d attempt(s): %s",
+                         provider.channel, len(group), attempts, error)
+            _finish(group, False)
+            return
+
+        delay = getattr(error, "retry_after", None) or random.uniform(0, min(NOTIFY_BACKOFF_MAX, NOTIFY_BACKOFF_BASE * 2 ** attempts))
+        self.counters[f"{provider.channel}_retried"] += len(group)
+        self._in_flight += len(group)  # Bekleyen tekrarlar da "pending" sayılır
+        self._loop.call_later(delay, lambda: self._loop.create_task(self._requeue(provider.channel, group, attempts)))
+
+    async def _requeue(self, channel: str, group: List[Notification], attempts: int):
+        for notification in group:
+            notification.attempts = attempts
+            await self._queues[channel].put(notification)
+        self._in_flight -= len(group)
+
+
+# ✅ Uygulama genelinde tek gönderici (ilk mesajda başlatılır)
+dispatcher = NotificationDispatcher()
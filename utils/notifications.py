@@ -1,68 +1,40 @@
 # utils/notifications.py
 
-from twilio.rest import Client
-import os
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
-from fastapi import BackgroundTasks
+from datetime import datetime
+from typing import Iterable, Optional
+from utils.notification_dispatcher import EMAIL, SMS, Notification, dispatcher
+from utils.templates import Rendered, render, render_text
+from utils.word_filter import passes_word_filter
 
-# ✅ Twilio API Credentials (Çevre değişkenlerinden alınmalı)
-TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID", "YOUR_TWILIO_SID")
-TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN", "YOUR_TWILIO_AUTH_TOKEN")
-TWILIO_PHONE_NUMBER = os.getenv("TWILIO_PHONE_NUMBER", "YOUR_TWILIO_PHONE")
+# ✅ Twilio / SendGrid bilgileri artık utils/notification_dispatcher.py'de (sağlayıcılar)
 
-# Twilio client
-client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-
-# ✅ SendGrid API Credentials
-SENDGRID_API_KEY = os.getenv("SENDGRID_API_KEY", "YOUR_SENDGRID_API_KEY")
-SENDER_EMAIL = os.getenv("SENDER_EMAIL", "your-email@example.com")
-
-# ✅ Sistem Admin Bilgileri (Çevre değişkenleri ile alınmalı)
-ADMIN_PHONE = os.getenv("ADMIN_PHONE", "+1234567890")
-ADMIN_EMAIL = os.getenv("ADMIN_EMAIL", "admin@example.com")
-
-def send_notifications(background_tasks: BackgroundTasks, user_phone: str, user_email: str):
+def send_notifications(user_phone: str, user_email: str, locale: Optional[str] = None):
     """
-    Sends both SMS and Email notifications asynchronously using BackgroundTasks.
+    Queues both SMS and Email booking notifications on the dispatcher (returns immediately).
     """
-    background_tasks.add_task(send_sms, user_phone, "Your ride has been confirmed! ✅")
-    background_tasks.add_task(send_email, user_email, "Booking Confirmed ✅", "<h1>Your ride is confirmed!</h1>")
+    message = render("booking_confirmed", locale)
+    if user_phone:
+        send_sms(user_phone, message.text)
+    if user_email:
+        send_rendered_email(user_email, message)
 
 def send_sms(to_number: str, message: str):
     """
-    Sends an SMS notification using Twilio API.
+    Queues an SMS notification (sent by the dispatcher through the Twilio API).
     """
-    try:
-        message = client.messages.create(
-            body=message,
-            from_=TWILIO_PHONE_NUMBER,
-            to=to_number
-        )
-        print(f"✅ SMS Sent to {to_number} | SID: {message.sid}")
-        return True
-    except Exception as e:
-        print(f"🚨 SMS Sending Failed: {e}")
-        return False
+    return dispatcher.submit(Notification(channel=SMS, to=to_number, body=message))
 
-def send_email(to_email: str, subject: str, content: str):
+def send_email(to_email: str, subject: str, content: str, text: Optional[str] = None):
     """
-    Sends an email notification using SendGrid API.
+    Queues an email notification (sent by the dispatcher through the SendGrid API, batched).
     """
-    try:
-        message = Mail(
-            from_email=SENDER_EMAIL,
-            to_emails=to_email,
-            subject=subject,
-            html_content=content
-        )
-        sg = SendGridAPIClient(SENDGRID_API_KEY)
-        response = sg.send(message)
-        print(f"✅ Email Sent to {to_email} | Status Code: {response.status_code}")
-        return True
-    except Exception as e:
-        print(f"🚨 Email Sending Failed: {e}")
-        return False
+    return dispatcher.submit(Notification(channel=EMAIL, to=to_email, subject=subject, body=content, text=text))
+
+def send_rendered_email(to_email: str, message: Rendered):
+    """
+    Queues a rendered template (HTML + plain-text alternative, see utils/templates.py).
+    """
+    return send_email(to_email, message.subject, message.html, message.text)
 
 def send_notification(user_id: int, message: str):
     """
@@ -72,46 +44,45 @@ def send_notification(user_id: int, message: str):
 
 def moderate_text(text: str) -> bool:
     """
-    Metin moderasyonu yapar (örneğin, uygunsuz içerik kontrolü).
+    Metin moderasyonu yapar (uygunsuz kelime kontrolü, bkz. utils/word_filter.py).
     """
-    inappropriate_words = ["badword1", "badword2"]  # Örnek uygunsuz kelimeler
-    for word in inappropriate_words:
-        if word in text.lower():
-            return False  # Uygunsuz içerik bulundu
-    return True  # Metin uygun
+    return passes_word_filter(text)  # True => metin uygun
 
-def send_payment_receipt(email: str, amount: float, ride_id: int):
+def send_payment_receipt(email: str, amount: float, ride_id: int, locale: Optional[str] = None):
     """
     Sends a payment receipt to the user's email.
     """
-    message = Mail(
-        from_email=os.getenv("SENDER_EMAIL"),
-        to_emails=email,
-        subject="Payment Receipt - GoCarGo",
-        html_content=f"""
-        <h3>Payment Receipt</h3>
-        <p>Thank you for your payment of <b>${amount}</b> for Ride ID: {ride_id}.</p>
-        <p>Have a great trip!</p>
-        """
-    )
+    send_rendered_email(email, render("payment_receipt", locale, amount=amount, ride_id=ride_id))
 
-    try:
-        sg = SendGridAPIClient(os.getenv("SENDGRID_API_KEY"))
-        response = sg.send(message)
-        print(f"Email sent! Status code: {response.status_code}")
-    except Exception as e:
-        print(f"Error sending email: {e}")
+def send_departure_reminders(emails: Iterable[str], start_location: str, end_location: str, departure_time: datetime,
+                             offset_minutes: int, locale: Optional[str] = None):
+    """
+    Sends the same departure reminder to every passenger / the driver of a ride
+    (identical content => one batched SendGrid request).
+    """
+    if offset_minutes >= 120:
+        lead = render_text("lead_hours", locale, count=offset_minutes // 60)
+    elif offset_minutes >= 60:
+        lead = render_text("lead_hour", locale)
+    else:
+        lead = render_text("lead_minutes", locale, count=offset_minutes)
+    message = render("departure_reminder", locale, lead=lead, start_location=start_location,
+                     end_location=end_location, departure_time=departure_time)
+    for email in emails:
+        send_rendered_email(email, message)
 
 # ✅ **SİSTEM BİLDİRİMLERİ GÖNDERME FONKSİYONU**
-def send_system_notifications():
+def send_system_notifications(message: Optional[str] = None, created_by: Optional[int] = None):
     """
-    Sends system-wide notifications (example: maintenance alerts).
+    Broadcasts a system notification (example: maintenance alerts) to every user that
+    isn't banned, honouring their email / SMS preferences. Returns the Broadcast
+    record; sending continues in the background (see db/db_broadcast.py).
     """
-    message = "🚀 System update: New features added to goCARgo!"
-    subject = "🔔 goCARgo System Notification"
-
-    # ✅ **Adminlere SMS ve E-Posta Gönder**
-    send_sms(ADMIN_PHONE, message)
-    send_email(ADMIN_EMAIL, subject, message)
+    from db.database import SessionLocal
+    from db.db_broadcast import DEFAULT_BROADCAST_MESSAGE, create_broadcast  # db => utils.notifications döngüsü
 
-    print("✅ System-wide notifications sent!")
+    db = SessionLocal()
+    try:
+        return create_broadcast(db, message or DEFAULT_BROADCAST_MESSAGE, created_by)
+    finally:
+        db.close()
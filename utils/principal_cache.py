@@ -0,0 +1,106 @@
+# utils/principal_cache.py
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+# ✅ Principal cache ayarları (Çevre değişkenlerinden)
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", 10000))
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", 60))  # saniye, 0 => kapalı
+
+
+@dataclass(frozen=True)
+class Principal:
+    """
+    Lightweight, session-independent view of an authenticated user.
+    """
+    id: int
+    username: str
+    email: str
+    is_admin: bool = False
+    is_accountant: bool = False
+    is_banned: bool = False
+
+    @classmethod
+    def from_user(cls, user) -> "Principal":
+        return cls(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            is_admin=bool(user.is_admin),
+            is_accountant=bool(user.is_accountant),
+            is_banned=bool(user.is_banned),
+        )
+
+
+class PrincipalCache:
+    """
+    TTL-bounded LRU of principals keyed by user id. Writers call invalidate() after
+    committing a change; the TTL bounds staleness across worker processes.
+    """
+
+    def __init__(self, max_size: int = PRINCIPAL_CACHE_SIZE, ttl: float = PRINCIPAL_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0  # Her invalidate'te artar; eski okumaların cache'e yazılmasını engeller
+
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, user_id: int) -> Optional[Principal]:
+        if self.ttl <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            principal, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return principal
+
+    def put(self, principal: Principal, generation: Optional[int] = None):
+        """
+        Stores a principal. If `generation` is given and an invalidation happened since it
+        was read, the (possibly stale) principal is dropped.
+        """
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[principal.id] = (principal, time.monotonic() + self.ttl)
+            self._entries.move_to_end(principal.id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# ✅ Uygulama genelinde tek cache
+principal_cache = PrincipalCache()
+
+
+def invalidate_principal(user_id: int):
+    """
+    Drops the cached principal of a user (call after changing or deleting the user).
+    """
+    principal_cache.invalidate(user_id)
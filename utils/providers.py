@@ -0,0 +1,107 @@
+# utils/providers.py
+
+import logging
+import os
+import threading
+from typing import Callable, Dict, Iterable, List
+
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderUnavailable(HTTPException):
+    """
+    Raised when a provider is used without its configuration (degraded mode).
+    """
+
+    def __init__(self, name: str, missing: List[str]):
+        super().__init__(status_code=503, detail=f"{name} is not configured on this server")
+        self.name = name
+        self.missing = missing
+
+
+class ProviderRegistry:
+    """
+    Third-party clients (Twilio, SendGrid, Stripe, TextBlob) are built on first use
+    instead of at import time. Nothing is imported or connected until `get()`, and a
+    provider whose env vars are missing is reported as unavailable instead of failing
+    application startup.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], object]] = {}
+        self._required_env: Dict[str, tuple] = {}
+        self._instances: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, factory: Callable[[], object], required_env: Iterable[str] = ()):
+        self._factories[name] = factory
+        self._required_env[name] = tuple(required_env)
+        self._instances.pop(name, None)
+
+    def missing_env(self, name: str) -> List[str]:
+        return [key for key in self._required_env[name] if not os.getenv(key)]
+
+    def configured(self, name: str) -> bool:
+        return not self.missing_env(name)
+
+    def get(self, name: str):
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        with self._lock:
+            if name not in self._instances:
+                missing = self.missing_env(name)
+                if missing:
+                    raise ProviderUnavailable(name, missing)
+                self._instances[name] = self._factories[name]()
+                logger.info("Provider %s initialized", name)
+            return self._instances[name]
+
+    def reset(self, name: str = None):
+        """
+        Drops built clients (e.g. after the configuration changed in tests).
+        """
+        with self._lock:
+            if name is None:
+                self._instances.clear()
+            else:
+                self._instances.pop(name, None)
+
+    def status(self) -> Dict[str, str]:
+        return {
+            name: "ready" if name in self._instances else "configured" if self.configured(name) else "missing " + ", ".join(self.missing_env(name))
+            for name in self._factories
+        }
+
+
+# ------------------------ 🏭 Factories (import'lar burada, ilk kullanımda) ------------------------ #
+
+def _create_sms_provider():
+    from utils.notification_dispatcher import TwilioSmsProvider
+    return TwilioSmsProvider()
+
+
+def _create_email_provider():
+    from utils.notification_dispatcher import SendGridEmailProvider
+    return SendGridEmailProvider()
+
+
+def _create_stripe():
+    import stripe
+    stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
+    return stripe
+
+
+def _create_textblob():
+    from textblob import TextBlob
+    return TextBlob
+
+
+# ✅ Uygulama genelinde tek sağlayıcı kaydı
+providers = ProviderRegistry()
+providers.register("sms", _create_sms_provider, required_env=("TWILIO_ACCOUNT_SID", "TWILIO_AUTH_TOKEN"))
+providers.register("email", _create_email_provider, required_env=("SENDGRID_API_KEY", "SENDER_EMAIL"))
+providers.register("stripe", _create_stripe, required_env=("STRIPE_SECRET_KEY",))
+providers.register("textblob", _create_textblob)
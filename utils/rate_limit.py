@@ -0,0 +1,244 @@
+# utils/rate_limit.py
+
+import math
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Protocol, Tuple
+
+from fastapi import Depends, Form, HTTPException, Request
+
+from db.models import User
+from utils.auth import get_current_user
+
+# ✅ Limit ayarları (Çevre değişkenlerinden) - "istek/saniye" biçiminde
+LOGIN_RATE_PER_IP = os.getenv("LOGIN_RATE_PER_IP", "20/60")
+LOGIN_RATE_PER_USERNAME = os.getenv("LOGIN_RATE_PER_USERNAME", "10/300")
+REGISTER_RATE_PER_IP = os.getenv("REGISTER_RATE_PER_IP", "10/3600")
+COMPLAINT_RATE_PER_USER = os.getenv("COMPLAINT_RATE_PER_USER", "10/86400")
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")  # memory | redis | local-shared
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0")
+RATE_LIMIT_TRUST_PROXY = os.getenv("RATE_LIMIT_TRUST_PROXY", "false").lower() == "true"  # X-Forwarded-For kullan
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", 100000))  # Bellek backend'i için üst sınır
+
+
+def parse_rate(rate: str) -> Tuple[int, float]:
+    """
+    "20/60" => (20 requests, 60 seconds).
+    """
+    count, seconds = rate.split("/", 1)
+    return int(count), float(seconds)
+
+
+def _sliding_estimate(previous: int, current: int, elapsed_fraction: float) -> float:
+    # Önceki pencerenin kalan kısmı kadar ağırlığı + mevcut pencere
+    return previous * (1.0 - elapsed_fraction) + current
+
+
+def _retry_after(previous: int, current: int, limit: int, window: float, elapsed_fraction: float) -> int:
+    """
+    Seconds until the sliding estimate drops below the limit again.
+    """
+    if current >= limit or not previous:
+        return max(1, math.ceil(window * (1.0 - elapsed_fraction)))
+    needed_fraction = 1.0 - (limit - current) / previous
+    return max(1, math.ceil((needed_fraction - elapsed_fraction) * window))
+
+
+class RateLimitBackend(Protocol):
+    def hit(self, key: str, limit: int, window: float) -> Tuple[bool, int]:
+        """
+        Counts one request for `key` if it's within the limit.
+        Returns (allowed, retry_after_seconds).
+        """
+
+
+class MemoryBackend:
+    """
+    Per-process sliding-window counters (two fixed windows, weighted). O(1) memory per key.
+    """
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._counters: Dict[str, Tuple[int, int, int, float]] = {}  # key => (pencere no, mevcut, önceki, pencere)
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, limit: int, window: float) -> Tuple[bool, int]:
+        now = time.time()
+        window_index = int(now // window)
+        elapsed_fraction = (now % window) / window
+
+        with self._lock:
+            stored_index, current, previous, _ = self._counters.get(key, (window_index, 0, 0, window))
+            if stored_index == window_index - 1:
+                stored_index, current, previous = window_index, 0, current
+            elif stored_index != window_index:
+                stored_index, current, previous = window_index, 0, 0
+
+            if _sliding_estimate(previous, current, elapsed_fraction) >= limit:
+                self._counters[key] = (stored_index, current, previous, window)
+                return False, _retry_after(previous, current, limit, window, elapsed_fraction)
+
+            self._counters[key] = (stored_index, current + 1, previous, window)
+            if len(self._counters) > self.max_keys:
+                self._evict(now)
+            return True, 0
+
+    def _evict(self, now: float):
+        # Sadece bayat (iki pencereden eski) sayaçlar atılır; yetmezse en eskiler
+        stale = [key for key, (index, _, _, window) in self._counters.items() if index < int(now // window) - 1]
+        for key in stale:
+            del self._counters[key]
+        while len(self._counters) > self.max_keys:
+            self._counters.pop(next(iter(self._counters)))
+
+    def reset(self, key: Optional[str] = None):
+        with self._lock:
+            if key is None:
+                self._counters.clear()
+            else:
+                self._counters.pop(key, None)
+
+
+class SharedCounterBackend:
+    """
+    Sliding-window limiter on a shared counter store, so all workers / nodes see the same
+    counts. The store needs the Redis subset `get`, `incr`, `decr` and `expire`; a redis-py
+    client works as is, LocalCounterStore stands in for it locally.
+
+    Increment first, decide on the returned value: INCR is atomic, so N concurrent
+    requests get N distinct counts and only the ones within the limit pass (a check
+    followed by an increment would let all of them through). A rejected request gives
+    its slot back with DECR.
+    """
+
+    def __init__(self, store, prefix: str = "ratelimit"):
+        self.store = store
+        self.prefix = prefix
+
+    def hit(self, key: str, limit: int, window: float) -> Tuple[bool, int]:
+        now = time.time()
+        window_index = int(now // window)
+        elapsed_fraction = (now % window) / window
+        current_key = f"{self.prefix}:{key}:{window_index}"
+
+        current = int(self.store.incr(current_key))
+        if current == 1:
+            self.store.expire(current_key, int(math.ceil(window * 2)))
+        previous = int(self.store.get(f"{self.prefix}:{key}:{window_index - 1}") or 0)
+
+        # Bu istekten önceki sayı (current - 1) ile MemoryBackend'in karşılaştırması aynı
+        if _sliding_estimate(previous, current - 1, elapsed_fraction) >= limit:
+            self.store.decr(current_key)
+            return False, _retry_after(previous, current - 1, limit, window, elapsed_fraction)
+        return True, 0
+
+
+class LocalCounterStore:
+    """
+    In-process stand-in for the Redis counter commands used by SharedCounterBackend
+    (development / tests without a Redis server).
+    """
+
+    def __init__(self):
+        self._values: Dict[str, Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+
+    def _alive(self, key: str):
+        entry = self._values.get(key)
+        if entry and entry[1] and entry[1] < time.time():
+            del self._values[key]
+            return None
+        return entry
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._alive(key)
+            return entry[0] if entry else None
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            entry = self._alive(key)
+            value = (entry[0] if entry else 0) + 1
+            self._values[key] = (value, entry[1] if entry else 0.0)
+            return value
+
+    def decr(self, key: str) -> int:
+        with self._lock:
+            entry = self._alive(key)
+            value = (entry[0] if entry else 0) - 1
+            self._values[key] = (value, entry[1] if entry else 0.0)
+            return value
+
+    def expire(self, key: str, seconds: int):
+        with self._lock:
+            entry = self._alive(key)
+            if entry:
+                self._values[key] = (entry[0], time.time() + seconds)
+
+
+def create_backend(name: str = RATE_LIMIT_BACKEND) -> RateLimitBackend:
+    if name == "redis":
+        try:
+            import redis  # Opsiyonel bağımlılık
+        except ImportError as error:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the 'redis' package") from error
+        return SharedCounterBackend(redis.Redis.from_url(RATE_LIMIT_REDIS_URL))
+    if name == "local-shared":
+        return SharedCounterBackend(LocalCounterStore())
+    return MemoryBackend()
+
+
+class RateLimiter:
+    """
+    Checks a set of (key, rate) rules; the request is rejected with 429 as soon as one
+    of them is over its limit.
+    """
+
+    def __init__(self, backend: RateLimitBackend):
+        self.backend = backend
+
+    def check(self, rules: List[Tuple[str, str]]):
+        for key, rate in rules:
+            limit, window = parse_rate(rate)
+            allowed, retry_after = self.backend.hit(key, limit, window)
+            if not allowed:
+                raise HTTPException(
+                    status_code=429,
+                    detail="Too many attempts, please try again later.",
+                    headers={"Retry-After": str(retry_after)},
+                )
+
+
+# ✅ Uygulama genelinde tek limiter (backend RATE_LIMIT_BACKEND ile seçilir)
+rate_limiter = RateLimiter(create_backend())
+
+
+def client_ip(request: Request) -> str:
+    if RATE_LIMIT_TRUST_PROXY:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+# ------------------------ 🚦 FastAPI dependencies ------------------------ #
+# Endpoint'in DB ve bcrypt işlerinden önce çalışır
+
+def limit_login(request: Request, username: str = Form(...)):
+    rate_limiter.check([
+        (f"login:ip:{client_ip(request)}", LOGIN_RATE_PER_IP),
+        (f"login:user:{username.strip().casefold()}", LOGIN_RATE_PER_USERNAME),
+    ])
+
+
+def limit_registration(request: Request):
+    rate_limiter.check([
+        (f"register:ip:{client_ip(request)}", REGISTER_RATE_PER_IP),
+    ])
+
+
+def limit_complaints(current_user: User = Depends(get_current_user)):
+    rate_limiter.check([
+        (f"complaint:user:{current_user.id}", COMPLAINT_RATE_PER_USER),
+    ])
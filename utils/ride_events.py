@@ -0,0 +1,190 @@
+# utils/ride_events.py
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import uuid
+from typing import Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# ✅ Canlı koltuk bildirimi ayarları (Çevre değişkenlerinden)
+RIDE_EVENTS_MAX_SUBSCRIBERS = int(os.getenv("RIDE_EVENTS_MAX_SUBSCRIBERS", 10000))  # İşlem başına
+RIDE_EVENTS_MAX_TOPICS = int(os.getenv("RIDE_EVENTS_MAX_TOPICS", 50))  # WebSocket bağlantısı başına yolculuk
+RIDE_EVENTS_HEARTBEAT = float(os.getenv("RIDE_EVENTS_HEARTBEAT", 15))  # saniye, proxy'ler bağlantıyı kesmesin
+RIDE_EVENTS_SEND_TIMEOUT = float(os.getenv("RIDE_EVENTS_SEND_TIMEOUT", 10))  # saniye, bunu aşan istemci kopartılır
+RIDE_EVENTS_REDIS_URL = os.getenv("RIDE_EVENTS_REDIS_URL")  # Birden fazla worker / node: Redis pub/sub köprüsü
+_REDIS_CHANNEL = "ride-events"
+
+# (json, SSE çerçevesi) — her olay bir kez serileştirilir, tüm abonelere aynı nesne gider
+Message = Tuple[str, str]
+
+
+class Subscription:
+    """
+    One SSE / WebSocket client. Events are seat snapshots, so only the latest one per
+    ride is kept: a slow consumer skips intermediate states instead of growing a
+    queue (memory stays O(subscribed rides)).
+    """
+
+    def __init__(self):
+        self.topics: Set[int] = set()
+        self.dropped = 0
+        self._pending: Dict[int, Message] = {}
+        self._ready = asyncio.Event()
+
+    def offer(self, ride_id: int, message: Message, replace: bool = True):
+        if ride_id in self._pending:
+            if not replace:
+                return
+            self.dropped += 1  # Okunmamış eski durumun yerine yenisi
+        self._pending[ride_id] = message
+        self._ready.set()
+
+    async def next(self, timeout: float) -> List[Message]:
+        """
+        Waits up to `timeout` for events; an empty list means "send a heartbeat".
+        """
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        self._ready.clear()
+        messages, self._pending = list(self._pending.values()), {}
+        return messages
+
+
+class RideEventHub:
+    """
+    In-process pub/sub for ride seat changes. Publishing is thread-safe (route handlers
+    run in the thread pool); fan-out runs on the event loop and is a dict assignment +
+    Event.set() per subscriber. With RIDE_EVENTS_REDIS_URL set, events are also relayed
+    between processes.
+    """
+
+    def __init__(self, max_subscribers: int = RIDE_EVENTS_MAX_SUBSCRIBERS):
+        self.max_subscribers = max_subscribers
+        self._topics: Dict[int, Set[Subscription]] = {}
+        self._subscribers = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._origin = uuid.uuid4().hex
+        self._redis = None
+        self._listener: Optional[threading.Thread] = None
+
+    # ------------------------ 🔌 Subscriptions ------------------------ #
+
+    def check_capacity(self):
+        if self._subscribers >= self.max_subscribers:
+            from fastapi import HTTPException
+            raise HTTPException(status_code=503, detail="Too many live subscribers, please poll instead", headers={"Retry-After": "30"})
+
+    def open(self) -> Subscription:
+        self.check_capacity()
+        self._loop = self._loop or asyncio.get_running_loop()
+        self._subscribers += 1
+        return Subscription()
+
+    def close(self, subscription: Subscription):
+        for ride_id in list(subscription.topics):
+            self.unsubscribe(subscription, ride_id)
+        self._subscribers -= 1
+
+    def subscribe(self, subscription: Subscription, ride_id: int):
+        self._topics.setdefault(ride_id, set()).add(subscription)
+        subscription.topics.add(ride_id)
+
+    def unsubscribe(self, subscription: Subscription, ride_id: int):
+        subscribers = self._topics.get(ride_id)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._topics[ride_id]
+        subscription.topics.discard(ride_id)
+
+    def stats(self) -> dict:
+        return {"subscribers": self._subscribers, "rides": len(self._topics)}
+
+    # ------------------------ 📣 Publishing ------------------------ #
+
+    def publish(self, ride_id: int, event: dict):
+        """
+        Sends an event to every subscriber of the ride (callable from any thread).
+        """
+        data = json.dumps(event, default=str, separators=(",", ":"))
+        self._deliver(ride_id, data)
+        if self._redis is not None:
+            try:
+                self._redis.publish(_REDIS_CHANNEL, json.dumps({"origin": self._origin, "ride_id": ride_id, "data": data}))
+            except Exception:
+                logger.exception("Relaying ride event to Redis failed")
+
+    def _deliver(self, ride_id: int, data: str):
+        loop = self._loop
+        if loop is None or ride_id not in self._topics:
+            return  # Hiç abone yok: serileştirme dışında maliyet yok
+        message = (data, f"event: ride\ndata: {data}\n\n")
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._fan_out(ride_id, message)
+        else:
+            loop.call_soon_threadsafe(self._fan_out, ride_id, message)
+
+    def _fan_out(self, ride_id: int, message: Message):
+        for subscription in tuple(self._topics.get(ride_id, ())):
+            subscription.offer(ride_id, message)
+
+    # ------------------------ 🌉 Redis relay (opsiyonel) ------------------------ #
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        if not RIDE_EVENTS_REDIS_URL or self._listener is not None:
+            return
+        try:
+            import redis  # Opsiyonel bağımlılık
+        except ImportError as error:
+            raise RuntimeError("RIDE_EVENTS_REDIS_URL requires the 'redis' package") from error
+        self._redis = redis.Redis.from_url(RIDE_EVENTS_REDIS_URL)
+        self._listener = threading.Thread(target=self._listen, name="ride-events-relay", daemon=True)
+        self._listener.start()
+
+    def _listen(self):
+        pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(_REDIS_CHANNEL)
+        for item in pubsub.listen():
+            try:
+                relayed = json.loads(item["data"])
+                if relayed["origin"] != self._origin:  # Kendi olaylarımız zaten yerelde dağıtıldı
+                    self._deliver(int(relayed["ride_id"]), relayed["data"])
+            except Exception:
+                logger.exception("Bad ride event from Redis")
+
+
+# ✅ Uygulama genelinde tek hub
+ride_events = RideEventHub()
+
+
+def ride_snapshot(ride, deleted: bool = False) -> dict:
+    if deleted:
+        status = "deleted"
+    else:
+        status = "full" if ride.available_seats <= 0 else "open"
+    return {
+        "type": "ride",
+        "ride_id": ride.id,
+        "available_seats": max(ride.available_seats, 0),
+        "total_seats": ride.total_seats,
+        "departure_time": ride.departure_time,
+        "status": status,
+    }
+
+
+def publish_ride(ride, deleted: bool = False):
+    """
+    Pushes the ride's current seats / status to live subscribers (call after commit).
+    """
+    ride_events.publish(ride.id, ride_snapshot(ride, deleted))
@@ -0,0 +1,41 @@
+# utils/scheduler.py
+
+import logging
+import threading
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicJob:
+    """
+    Runs a function every `interval` seconds on a daemon thread until stopped.
+    Errors are logged and the job keeps its schedule.
+    """
+
+    def __init__(self, name: str, interval: float, func: Callable[[], object]):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stopping.wait(self.interval):
+            try:
+                self.func()
+            except Exception:
+                logger.exception("Periodic job %s failed", self.name)
+
+    def start(self):
+        if self._thread is not None or self.interval <= 0:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
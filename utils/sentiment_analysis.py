@@ -1,4 +1,85 @@
-from textblob import TextBlob
+import hashlib
+import os
+import re
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from threading import Lock
+from typing import Iterable, List, Optional
+
+from utils.providers import providers
+
+# ✅ Moderasyon eşiği (skor bunun altındaysa yorum engellenir)
+NEGATIVE_THRESHOLD = float(os.getenv("SENTIMENT_NEGATIVE_THRESHOLD", -0.5))
+
+# ✅ Sonuç önbelleği boyutu (normalize edilmiş metin hash'i -> skor)
+SENTIMENT_CACHE_SIZE = int(os.getenv("SENTIMENT_CACHE_SIZE", 10000))
+
+# ✅ Toplu moderasyon için process sayısı (None => CPU sayısı)
+SENTIMENT_WORKERS = int(os.getenv("SENTIMENT_WORKERS", 0)) or None
+
+_WHITESPACE = re.compile(r"\s+")
+
+_cache: "OrderedDict[bytes, float]" = OrderedDict()
+_cache_lock = Lock()
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = Lock()
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """
+    Normalizes text for caching: case-folded, trimmed and with collapsed whitespace.
+    TextBlob's lexicon lookup is case-insensitive, so this doesn't change the score.
+    """
+    if not text:
+        return ""
+    return _WHITESPACE.sub(" ", text).strip().casefold()
+
+
+def _cache_key(normalized: str) -> bytes:
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).digest()
+
+
+def _cache_get(key: bytes) -> Optional[float]:
+    with _cache_lock:
+        score = _cache.get(key)
+        if score is not None:
+            _cache.move_to_end(key)
+        return score
+
+
+def _cache_put(key: bytes, score: float):
+    with _cache_lock:
+        _cache[key] = score
+        _cache.move_to_end(key)
+        while len(_cache) > SENTIMENT_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def _polarity(normalized: str) -> float:
+    """
+    Computes the raw TextBlob polarity (no cache). Also used inside the worker processes.
+    """
+    if not normalized:
+        return 0.0
+    TextBlob = providers.get("textblob")  # İlk kullanımda import edilir (nltk ağır)
+    return TextBlob(normalized).sentiment.polarity
+
+
+def warm_up():
+    """
+    Forces TextBlob to load its lexicon now, so the first review doesn't pay for it.
+    Called once at application startup and in every worker process of the pool.
+    """
+    _polarity("warm up the sentiment model")
+
+
+def clear_cache():
+    """
+    Drops every memoized sentiment score.
+    """
+    with _cache_lock:
+        _cache.clear()
+
 
 def analyze_sentiment(text: str) -> float:
     """
@@ -6,19 +87,87 @@ def analyze_sentiment(text: str) -> float:
     - Positive values indicate positive sentiment.
     - Negative values indicate negative sentiment.
     - Values close to 0 are neutral.
+
+    Scores are memoized by the hash of the normalized text in a bounded LRU.
+    """
+    normalized = normalize_text(text)
+    key = _cache_key(normalized)
+
+    score = _cache_get(key)
+    if score is None:
+        score = _polarity(normalized)
+        _cache_put(key, score)
+    return score  # Returns a value between -1 and 1
+
+
+def is_inappropriate(score: float) -> bool:
+    """
+    Returns True if a sentiment score is below the moderation threshold.
     """
-    blob = TextBlob(text)
-    return blob.sentiment.polarity  # Returns a value between -1 and 1
+    return score < NEGATIVE_THRESHOLD
+
 
 def moderate_text(text: str) -> bool:
     """
     Uses sentiment analysis to check if a review contains offensive or extremely negative content.
-    
+
     Returns:
         - True: If the text is inappropriate (negative sentiment below threshold).
         - False: If the text is acceptable.
     """
-    sentiment_score = analyze_sentiment(text)
-    print(f"Sentiment Score: {sentiment_score} for comment: {text}")  # Debugging log
+    return is_inappropriate(analyze_sentiment(text))
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=SENTIMENT_WORKERS, initializer=warm_up)
+        return _pool
 
-    return sentiment_score < -0.5  # Eğer skor çok negatifse (örneğin -0.5'ten düşükse) engelle
+
+def shutdown_pool():
+    """
+    Stops the moderation process pool (called on application shutdown).
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def analyze_many(texts: Iterable[str], chunksize: int = 64) -> List[float]:
+    """
+    Scores many texts at once. Cached texts are answered locally, the rest is fanned
+    out to a process pool (TextBlob is CPU-bound and holds the GIL).
+    """
+    normalized = [normalize_text(text) for text in texts]
+    keys = [_cache_key(text) for text in normalized]
+    scores: List[Optional[float]] = [_cache_get(key) for key in keys]
+
+    # ✅ Aynı metin birden fazla kez geçiyorsa sadece bir kez hesapla
+    misses = {}
+    for index, score in enumerate(scores):
+        if score is None:
+            misses.setdefault(keys[index], normalized[index])
+
+    if misses:
+        miss_keys = list(misses)
+        results = _get_pool().map(_polarity, [misses[key] for key in miss_keys], chunksize=chunksize)
+        computed = dict(zip(miss_keys, results))
+        for key, score in computed.items():
+            _cache_put(key, score)
+        scores = [computed[key] if score is None else score for key, score in zip(keys, scores)]
+
+    return scores
+
+
+def moderate_many(texts: Iterable[str], chunksize: int = 64) -> List[bool]:
+    """
+    Batch version of moderate_text for bulk re-moderation.
+
+    Returns:
+        List[bool]: True for every text that is inappropriate, in input order.
+    """
+    return [is_inappropriate(score) for score in analyze_many(texts, chunksize=chunksize)]
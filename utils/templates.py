@@ -0,0 +1,233 @@
+# utils/templates.py
+
+import html
+import os
+import re
+from functools import lru_cache
+from string import Formatter
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# ✅ Şablon ayarları (Çevre değişkenlerinden)
+NOTIFY_DEFAULT_LOCALE = os.getenv("NOTIFY_DEFAULT_LOCALE", "en")
+NOTIFY_RENDER_CACHE_SIZE = int(os.getenv("NOTIFY_RENDER_CACHE_SIZE", 2048))  # Önbellekteki en fazla farklı içerik
+
+# ✅ Bildirim metinleri: dil => şablon adı => parçalar (subject / html / text)
+# "text" yazılmazsa html'den türetilir (düz metin alternatifi ve SMS gövdesi).
+# Alanlar str.format sözdizimiyle: {amount:.2f}. html parçasındaki değerler kaçışlanır.
+CATALOG: Dict[str, Dict[str, Dict[str, str]]] = {
+    "en": {
+        "booking_confirmed": {
+            "subject": "Booking Confirmed ✅",
+            "html": "<h1>Your ride is confirmed!</h1>",
+            "text": "Your ride has been confirmed! ✅",
+        },
+        "payment_receipt": {
+            "subject": "Payment Receipt - GoCarGo",
+            "html": "<h3>Payment Receipt</h3>"
+                    "<p>Thank you for your payment of <b>${amount:.2f}</b> for Ride ID: {ride_id}.</p>"
+                    "<p>Have a great trip!</p>",
+        },
+        "system_notification": {
+            "subject": "🔔 goCARgo System Notification",
+            "html": "<p>{message}</p>",
+        },
+        "departure_reminder": {
+            "subject": "⏰ Your ride departs in {lead}",
+            "html": "<h3>Ride reminder</h3>"
+                    "<p>{start_location} → {end_location} departs at <b>{departure_time:%Y-%m-%d %H:%M}</b>.</p>",
+        },
+        "lead_minutes": {"text": "{count} minutes"},
+        "lead_hour": {"text": "1 hour"},
+        "lead_hours": {"text": "{count} hours"},
+        "booking_created_summary": {"text": "New booking on {title}"},
+        "booking_created_summary_plural": {"text": "{count} new bookings on {title}"},
+        "booking_cancelled_summary": {"text": "Booking cancelled on {title}"},
+        "booking_cancelled_summary_plural": {"text": "{count} bookings cancelled on {title}"},
+        "digest": {
+            "subject": "Your goCARgo digest: {count} updates",
+            "html": "{sections}",
+            "text": "{sections_text}",
+        },
+        "digest_section": {
+            "html": "<h3>{summary}</h3><ul>{items}</ul>",
+            "text": "{summary}\n{items_text}",
+        },
+        "digest_item": {
+            "html": "<li>{line}</li>",
+            "text": "- {line}",
+        },
+    },
+    "tr": {
+        "booking_confirmed": {
+            "subject": "Rezervasyon Onaylandı ✅",
+            "html": "<h1>Yolculuğunuz onaylandı!</h1>",
+            "text": "Yolculuğunuz onaylandı! ✅",
+        },
+        "payment_receipt": {
+            "subject": "Ödeme Makbuzu - GoCarGo",
+            "html": "<h3>Ödeme Makbuzu</h3>"
+                    "<p>{ride_id} numaralı yolculuk için yaptığınız <b>${amount:.2f}</b> tutarındaki ödeme için teşekkürler.</p>"
+                    "<p>İyi yolculuklar!</p>",
+        },
+        "system_notification": {
+            "subject": "🔔 goCARgo Sistem Bildirimi",
+            "html": "<p>{message}</p>",
+        },
+        "departure_reminder": {
+            "subject": "⏰ Yolculuğunuz {lead} sonra kalkıyor",
+            "html": "<h3>Yolculuk hatırlatması</h3>"
+                    "<p>{start_location} → {end_location} yolculuğu <b>{departure_time:%d.%m.%Y %H:%M}</b> tarihinde kalkıyor.</p>",
+        },
+        "lead_minutes": {"text": "{count} dakika"},
+        "lead_hour": {"text": "1 saat"},
+        "lead_hours": {"text": "{count} saat"},
+        "booking_created_summary": {"text": "{title}: yeni rezervasyon"},
+        "booking_created_summary_plural": {"text": "{title}: {count} yeni rezervasyon"},
+        "booking_cancelled_summary": {"text": "{title}: rezervasyon iptal edildi"},
+        "booking_cancelled_summary_plural": {"text": "{title}: {count} rezervasyon iptal edildi"},
+        "digest": {
+            "subject": "goCARgo özetiniz: {count} güncelleme",
+            "html": "{sections}",
+            "text": "{sections_text}",
+        },
+    },
+}
+
+SUPPORTED_LOCALES = tuple(CATALOG)
+
+_FORMATTER = Formatter()
+_FIELD_NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+_LIST_ITEM = re.compile(r"<li[^>]*>", re.IGNORECASE)
+_LINE_BREAK = re.compile(r"</(?:p|h[1-6]|li|ul|ol|div|tr)>|<br\s*/?>", re.IGNORECASE)
+_TAG = re.compile(r"<[^>]+>")
+
+
+class SafeHtml(str):
+    """
+    Already-escaped HTML (e.g. a rendered fragment); inserted into html parts as is.
+    """
+
+
+class Rendered(NamedTuple):
+    subject: str
+    html: str
+    text: str
+
+
+class CompiledTemplate:
+    """
+    A template parsed once into literal / field pieces; rendering is a join over them.
+    Only plain field names are allowed ({amount:.2f}, not {user.name} or {items[0]}).
+    """
+
+    __slots__ = ("source", "escape", "fields", "_parts")
+
+    def __init__(self, source: str, escape: bool = False):
+        self.source = source
+        self.escape = escape
+        self._parts: List[Tuple[str, Optional[str], str]] = []
+        for literal, field, spec, conversion in _FORMATTER.parse(source):
+            if field is not None and (not _FIELD_NAME.match(field) or conversion):
+                raise ValueError(f"Unsupported template field {{{field}}} in {source!r}")
+            self._parts.append((literal, field, spec or ""))
+        self.fields = frozenset(field for _, field, _ in self._parts if field is not None)
+
+    def render(self, values: dict) -> str:
+        out = []
+        for literal, field, spec in self._parts:
+            out.append(literal)
+            if field is not None:
+                value = values[field]
+                text = format(value, spec)
+                out.append(html.escape(text) if self.escape and not isinstance(value, SafeHtml) else text)
+        return "".join(out)
+
+
+def _html_to_text(source: str) -> str:
+    # Düz metin alternatifi: blok sonları satır sonu olur, etiketler atılır
+    text = _LINE_BREAK.sub("\n", _LIST_ITEM.sub("- ", source))
+    text = html.unescape(_TAG.sub("", text))
+    return "\n".join(line.strip() for line in text.splitlines() if line.strip())
+
+
+class CompiledMessage(NamedTuple):
+    subject: CompiledTemplate
+    html: CompiledTemplate
+    text: CompiledTemplate
+
+
+def _compile_catalog(catalog: Dict[str, Dict[str, Dict[str, str]]]) -> Dict[Tuple[str, str], CompiledMessage]:
+    compiled = {}
+    default = catalog[NOTIFY_DEFAULT_LOCALE]
+    for locale, entries in catalog.items():
+        for name in default.keys() | entries.keys():
+            parts = entries.get(name) or default[name]  # Çevirisi olmayan şablon varsayılan dilde
+            html_source = parts.get("html", "")
+            text_source = parts["text"] if "text" in parts else _html_to_text(html_source)
+            compiled[(locale, name)] = CompiledMessage(
+                subject=CompiledTemplate(parts.get("subject", "")),
+                html=CompiledTemplate(html_source, escape=True),
+                text=CompiledTemplate(text_source),
+            )
+    return compiled
+
+
+# ✅ Tüm şablonlar modül yüklenirken bir kez derlenir (hatalı şablon => açılışta hata)
+_TEMPLATES = _compile_catalog(CATALOG)
+
+
+def resolve_locale(locale: Optional[str]) -> str:
+    """
+    "tr-TR" / "tr_TR" => "tr"; unsupported or empty => the default locale.
+    """
+    if locale:
+        language = locale.replace("_", "-").split("-")[0].lower()
+        if language in CATALOG:
+            return language
+    return NOTIFY_DEFAULT_LOCALE
+
+
+def _template(name: str, locale: Optional[str]) -> CompiledMessage:
+    try:
+        return _TEMPLATES[(resolve_locale(locale), name)]
+    except KeyError:
+        raise KeyError(f"Unknown notification template {name!r}") from None
+
+
+@lru_cache(maxsize=NOTIFY_RENDER_CACHE_SIZE)
+def _render_cached(name: str, locale: str, key: Tuple[tuple, ...]) -> Rendered:
+    return _render(_template(name, locale), {field: value for field, _, value in key})
+
+
+def _render(template: CompiledMessage, values: dict) -> Rendered:
+    return Rendered(template.subject.render(values), template.html.render(values), template.text.render(values))
+
+
+def render(name: str, locale: Optional[str] = None, **values) -> Rendered:
+    """
+    Renders a notification. Identical (template, locale, values) renders come from an
+    LRU cache, so a broadcast renders once and every message shares the same strings.
+    """
+    locale = resolve_locale(locale)
+    try:
+        # SafeHtml ile str aynı anahtarı vermesin (biri kaçışlanır, diğeri kaçışlanmaz)
+        key = tuple(sorted((field, type(value), value) for field, value in values.items()))
+    except TypeError:
+        key = None
+    if key is None:
+        return _render(_template(name, locale), values)
+    try:
+        return _render_cached(name, locale, key)
+    except TypeError:  # Hash'lenemeyen değer (liste vb.): önbelleksiz
+        return _render(_template(name, locale), values)
+
+
+def render_text(name: str, locale: Optional[str] = None, **values) -> str:
+    """
+    Plain-text fragment (summaries, durations) for composing larger messages.
+    """
+    return render(name, locale, **values).text
+
+
+def cache_info():
+    return _render_cached.cache_info()
@@ -0,0 +1,117 @@
+# utils/timers.py
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_MAX_SLEEP = 60.0  # saniye; duvar saati ileri/geri alınırsa en geç bu kadar sonra fark edilir
+
+
+def local_epoch(value: datetime) -> float:
+    """
+    Epoch seconds of a naive local datetime (the DB stores ride times as local time).
+    """
+    return time.mktime(value.timetuple()) + value.microsecond / 1e6
+
+
+class TimerQueue:
+    """
+    Keyed one-shot timers on a min-heap, served by one daemon thread. Scheduling,
+    rescheduling and cancelling are O(log n) / O(1) (cancelled entries are skipped
+    lazily when they reach the top). Timers that are due together are handed to the
+    callback in one batch as (key, payload) pairs.
+    """
+
+    def __init__(self, name: str, callback: Callable[[List[Tuple[Hashable, object]]], None], max_batch: int = 500):
+        self.name = name
+        self.callback = callback
+        self.max_batch = max_batch
+        self._heap: List[Tuple[float, int, Hashable]] = []
+        self._entries: Dict[Hashable, Tuple[float, int, object]] = {}  # key => (zaman, sıra, payload)
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def schedule(self, key: Hashable, when: float, payload: object = None):
+        """
+        (Re)schedules `key` to fire at epoch seconds `when`.
+        """
+        with self._condition:
+            sequence = next(self._counter)
+            self._entries[key] = (when, sequence, payload)
+            heapq.heappush(self._heap, (when, sequence, key))
+            if self._heap[0][1] == sequence:
+                self._condition.notify()  # Yeni en erken zamanlayıcı: bekleyen thread uyansın
+            self._compact()
+
+    def cancel(self, key: Hashable) -> bool:
+        with self._condition:
+            return self._entries.pop(key, None) is not None
+
+    def _compact(self):
+        # İptal / yeniden planlama artıkları heap'i şişirmesin
+        if len(self._heap) > 2 * len(self._entries) + 1024:
+            self._heap = [(when, sequence, key) for key, (when, sequence, _) in self._entries.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_due(self, now: float) -> List[Tuple[Hashable, object]]:
+        due = []
+        while self._heap and self._heap[0][0] <= now and len(due) < self.max_batch:
+            when, sequence, key = heapq.heappop(self._heap)
+            entry = self._entries.get(key)
+            if entry is None or entry[1] != sequence:
+                continue  # İptal edilmiş veya yeniden planlanmış
+            del self._entries[key]
+            due.append((key, entry[2]))
+        return due
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._stopping:
+                    now = time.time()
+                    due = self._pop_due(now)
+                    if due:
+                        break
+                    timeout = min(self._heap[0][0] - now, _MAX_SLEEP) if self._heap else _MAX_SLEEP
+                    self._condition.wait(timeout)
+                if self._stopping:
+                    return
+            try:
+                self.callback(due)
+            except Exception:
+                logger.exception("Timer callback %s failed for %d timer(s)", self.name, len(due))
+
+    def start(self):
+        if self._thread is not None:
+            return
+        with self._condition:
+            self._stopping = False
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def clear(self):
+        with self._condition:
+            self._heap.clear()
+            self._entries.clear()
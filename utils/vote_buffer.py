@@ -0,0 +1,103 @@
+# utils/vote_buffer.py
+
+import logging
+import os
+import threading
+from collections import defaultdict
+from typing import Dict, List
+
+from db.database import SessionLocal
+from db.models import Review
+
+logger = logging.getLogger(__name__)
+
+# ✅ Write-behind oy tamponu ayarları (Çevre değişkenlerinden)
+VOTE_BUFFER_ENABLED = os.getenv("VOTE_BUFFER_ENABLED", "false").lower() in ("1", "true", "yes")
+VOTE_BUFFER_FLUSH_INTERVAL = float(os.getenv("VOTE_BUFFER_FLUSH_INTERVAL", 2.0))  # saniye
+
+
+class VoteCounterBuffer:
+    """
+    Coalesces like/dislike deltas per review in memory and writes them with one
+    SQL-side increment per review on every flush, so hot reviews don't serialize
+    every voter on the same row.
+    """
+
+    def __init__(self, flush_interval: float = VOTE_BUFFER_FLUSH_INTERVAL):
+        self.flush_interval = flush_interval
+        self._deltas: Dict[int, List[int]] = defaultdict(lambda: [0, 0])  # review_id -> [likes, dislikes]
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def add(self, review_id: int, likes: int = 0, dislikes: int = 0):
+        with self._lock:
+            delta = self._deltas[review_id]
+            delta[0] += likes
+            delta[1] += dislikes
+
+    def pending(self, review_id: int) -> List[int]:
+        """
+        Returns the not yet flushed [likes, dislikes] delta of a review.
+        """
+        with self._lock:
+            delta = self._deltas.get(review_id)
+            return list(delta) if delta else [0, 0]
+
+    def flush(self) -> int:
+        """
+        Writes all buffered deltas in a single transaction. Returns the number of reviews updated.
+        """
+        with self._lock:
+            deltas, self._deltas = self._deltas, defaultdict(lambda: [0, 0])
+
+        if not deltas:
+            return 0
+
+        db = SessionLocal()
+        try:
+            for review_id, (likes, dislikes) in deltas.items():
+                db.query(Review).filter(Review.id == review_id).update(
+                    {
+                        Review.likes: Review.likes + likes,
+                        Review.dislikes: Review.dislikes + dislikes,
+                        Review.helpfulness: Review.helpfulness + (likes - dislikes),
+                    },
+                    synchronize_session=False
+                )
+            db.commit()
+        except Exception:
+            db.rollback()
+            # ✅ Yazılamayan farkları kaybetme, bir sonraki flush'ta tekrar dene
+            for review_id, (likes, dislikes) in deltas.items():
+                self.add(review_id, likes, dislikes)
+            raise
+        finally:
+            db.close()
+
+        return len(deltas)
+
+    def _run(self):
+        while not self._stopping.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Vote buffer flush failed")
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="vote-buffer-flush", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(self.flush_interval + 1)
+            self._thread = None
+        self.flush()  # Kapanırken kalan oyları yaz
+
+
+# ✅ Uygulama genelinde tek oy tamponu (VOTE_BUFFER_ENABLED ile açılır)
+vote_buffer = VoteCounterBuffer()
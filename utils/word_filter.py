@@ -0,0 +1,189 @@
+# utils/word_filter.py
+
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# ✅ Kelime listesi ayarları (Çevre değişkenlerinden)
+WORD_FILTER_PATH = os.getenv("WORD_FILTER_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "blocked_words.txt"))
+WORD_FILTER_RELOAD_INTERVAL = float(os.getenv("WORD_FILTER_RELOAD_INTERVAL", 5))  # saniye, dosya değişikliği kontrolü
+
+# ✅ Leetspeak normalizasyonu (karakter başına birebir)
+_LEET = str.maketrans({
+    "0": "o", "1": "i", "3": "e", "4": "a", "5": "s", "7": "t", "8": "b", "9": "g",
+    "@": "a", "$": "s", "!": "i", "|": "l", "+": "t",
+})
+_LEET_CHARS = frozenset(chr(code) for code in _LEET)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _is_word_char(ch: str) -> bool:
+    # Leet karakterleri sınır sayılır: "j3rk1" ve "jerk!" yine eşleşir
+    return ch.isalnum() and ch not in _LEET_CHARS
+
+
+def _fold(text: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return _WHITESPACE.sub(" ", stripped).strip()
+
+
+def normalize(text: str) -> str:
+    """
+    Casefolds, strips diacritics, collapses whitespace and maps leetspeak characters to
+    letters. Terms and texts go through the same normalization, so "B@dw0rd" matches "badword".
+    """
+    return _fold(text).translate(_LEET)
+
+
+class AhoCorasick:
+    """
+    Multi-pattern automaton: every term is matched in a single pass over the text,
+    so the cost depends on the text length, not on the number of terms.
+    """
+
+    def __init__(self, terms: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[int, ...]] = [()]  # Düğümde biten terimlerin uzunlukları
+        self.size = 0
+
+        for term in terms:
+            self._insert(term)
+        self._build_failure_links()
+
+    def _insert(self, term: str):
+        node = 0
+        for ch in term:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            node = nxt
+        if len(term) not in self._out[node]:
+            self._out[node] += (len(term),)
+            self.size += 1
+
+    def _build_failure_links(self):
+        pending = deque(self._goto[0].values())
+        while pending:
+            node = pending.popleft()
+            for ch, child in self._goto[node].items():
+                pending.append(child)
+                fallback = self._fail[node]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(ch, 0)
+                self._out[child] += self._out[self._fail[child]]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int]]:
+        """
+        Yields (start, end) spans (end exclusive) of every term occurrence.
+        """
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for index, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for length in out[node]:
+                yield index + 1 - length, index + 1
+
+
+class WordFilter:
+    """
+    Blocked-word filter built from a word list file (one term per line, # for comments).
+    Matches respect word boundaries ("class" doesn't match "ass") and the file is
+    reloaded automatically when it changes.
+    """
+
+    def __init__(self, path: str = WORD_FILTER_PATH, reload_interval: float = WORD_FILTER_RELOAD_INTERVAL):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._automaton = AhoCorasick([])
+        self._mtime = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.reload()
+
+    @staticmethod
+    def _read_terms(path: str) -> List[str]:
+        with open(path, encoding="utf-8") as file:
+            lines = (line.split("#", 1)[0] for line in file)
+            return [term for term in (normalize(line) for line in lines) if term]
+
+    def reload(self) -> int:
+        """
+        Rebuilds the automaton from the word list and swaps it in. Returns the term count.
+        """
+        with self._lock:
+            self._checked_at = time.monotonic()
+            try:
+                mtime = os.path.getmtime(self.path)
+                terms = self._read_terms(self.path)
+            except OSError:
+                logger.warning("Word filter list %s not readable, keeping %d terms", self.path, self._automaton.size)
+                return self._automaton.size
+
+            self._automaton = AhoCorasick(terms)  # Okuyucular eski otomatı kullanmaya devam edebilir
+            self._mtime = mtime
+            return self._automaton.size
+
+    def _reload_if_changed(self):
+        if self.reload_interval <= 0 or time.monotonic() - self._checked_at < self.reload_interval:
+            return
+        self._checked_at = time.monotonic()
+        try:
+            changed = os.path.getmtime(self.path) != self._mtime
+        except OSError:
+            return
+        if changed:
+            self.reload()
+
+    def find(self, text: str) -> List[str]:
+        """
+        Returns the blocked terms (normalized) found in the text.
+        """
+        self._reload_if_changed()
+        # ✅ Leet eşlemesi birebir: sınır kontrolü orijinal karakterle yapılır
+        folded = _fold(text or "")
+        normalized = folded.translate(_LEET)
+        found = []
+        for start, end in self._automaton.iter_matches(normalized):
+            if start > 0 and _is_word_char(folded[start - 1]):
+                continue
+            if end < len(folded) and _is_word_char(folded[end]):
+                continue
+            found.append(normalized[start:end])
+        return found
+
+    def is_clean(self, text: str) -> bool:
+        return not self.find(text)
+
+    def __len__(self):
+        return self._automaton.size
+
+
+# ✅ Uygulama genelinde tek filtre
+word_filter = WordFilter()
+
+
+def passes_word_filter(text: str) -> bool:
+    """
+    True if the text contains none of the blocked terms.
+    """
+    return word_filter.is_clean(text)
+
+
+def reload_word_filter() -> int:
+    return word_filter.reload()